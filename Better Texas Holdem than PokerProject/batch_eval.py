@@ -0,0 +1,179 @@
+"""
+NumPy batch evaluator for scoring very large sets of hands at once.
+
+evaluate_batch() takes an (N, 7) integer array of int cards (see cards.py)
+and returns an (N,) array of strengths. The strengths are the same numbers
+handeval.evaluate_strength() gives, so bigger is better and the order matches
+the (category, tiebreakers) order used by evaluate_7card_hand_detailed.
+5 and 6 card hands ((N, 5) and (N, 6) arrays) work the same way.
+
+There is no per-hand Python loop. Every hand goes through the same few array
+operations:
+
+    1) sort each row's ranks and turn the sorted ranks into a dense index
+       (combinatorial number system) into a table of non-flush strengths
+    2) build a 13-bit rank mask for each suit and look it up in FLUSH_TABLE
+    3) take the best of the two
+
+For hundreds of millions of hands, feed chunks through evaluate_chunks() so
+only one chunk is in memory at a time.
+
+shuffled_decks() deals the other side of a simulation: many shuffled decks
+(or just their first few cards) as one array.
+
+combo_strengths() scores all 1326 two-card hands (ALL_COMBOS) against whole
+boards at once, e.g. to rank a hand against every hand an opponent could hold.
+"""
+from typing import Dict, Iterable, Iterator, Optional
+from itertools import combinations, combinations_with_replacement
+from math import comb
+
+import numpy as np
+
+from cards import SUIT_MASK
+from handeval import RANK_KEYS, RANK_TABLE, FLUSH_TABLE
+
+
+# COMB[v, j] = C(v, j), big enough for 7 sorted ranks shifted by up to 6
+COMB = np.array([[comb(v, j) for j in range(8)] for v in range(19)], dtype=np.int32)
+
+FLUSH_ARRAY = np.array(FLUSH_TABLE, dtype=np.int32)
+
+_rank_tables: Dict[int, np.ndarray] = {}
+
+# Every two-card hand, lower card first, and lookups to and from it
+ALL_COMBOS = np.array(list(combinations(range(52), 2)), dtype=np.int8)
+COMBO_MASKS = (np.int64(1) << ALL_COMBOS[:, 0].astype(np.int64)) | (np.int64(1) << ALL_COMBOS[:, 1].astype(np.int64))
+COMBO_INDEX = np.full((52, 52), -1, dtype=np.int32)  # COMBO_INDEX[card1, card2], either order
+COMBO_INDEX[ALL_COMBOS[:, 0], ALL_COMBOS[:, 1]] = np.arange(len(ALL_COMBOS))
+COMBO_INDEX[ALL_COMBOS[:, 1], ALL_COMBOS[:, 0]] = np.arange(len(ALL_COMBOS))
+# Each combo's two ranks as one of the 13 * 13 rank pairs, and its ranks in every suit
+COMBO_RANK_PAIR = (ALL_COMBOS[:, 0] % 13).astype(np.int32) * 13 + ALL_COMBOS[:, 1] % 13
+COMBO_SUIT_RANKS = np.stack([((COMBO_MASKS >> (13 * suit)) & SUIT_MASK) for suit in range(4)], axis=1)
+RANK_PAIRS = np.array([(high, low) for high in range(13) for low in range(13)], dtype=np.int32)
+# CARD_COMBOS[card] = the 51 combos holding that card
+CARD_COMBOS = np.array([np.flatnonzero((COMBO_MASKS >> card) & 1) for card in range(52)])
+
+
+def _dense_rank_table(num_cards: int) -> np.ndarray:
+    """
+    Non-flush strength for every sorted rank multiset of num_cards cards,
+    stored at its combinatorial index. Built the first time it is needed.
+    """
+    if num_cards not in _rank_tables:
+        table = np.zeros(comb(12 + num_cards, num_cards), dtype=np.int32)
+        for ranks in combinations_with_replacement(range(13), num_cards):
+            key = sum(RANK_KEYS[r] for r in ranks)
+            if key in RANK_TABLE:  # skips "five of a kind" and worse
+                index = sum(comb(r + i, i + 1) for i, r in enumerate(ranks))
+                table[index] = RANK_TABLE[key]
+        _rank_tables[num_cards] = table
+    return _rank_tables[num_cards]
+
+
+def evaluate_batch(cards: np.ndarray) -> np.ndarray:
+    """
+    Score every row of an (N, 5), (N, 6) or (N, 7) array of int cards.
+    Returns an (N,) int32 array of strengths (bigger is better).
+    """
+    cards = np.asarray(cards)
+    if cards.ndim != 2 or not 5 <= cards.shape[1] <= 7:
+        raise ValueError(f"expected an (N, 5..7) array of cards, got shape {cards.shape}")
+    ranks = (cards % 13).astype(np.int32)
+    suits = cards // 13
+
+    # 1) Non-flush hands
+    best = rank_strengths(ranks)
+
+    # 2) Flushes: one 13-bit rank mask per suit (cards are distinct, so sum == or)
+    bits = np.left_shift(1, ranks)
+    for suit in range(4):
+        suit_mask = np.where(suits == suit, bits, 0).sum(axis=1)
+        # 3) Quads and full houses beat a flush, so keep the best of both
+        np.maximum(best, FLUSH_ARRAY[suit_mask], out=best)
+    return best
+
+
+def rank_strengths(ranks: np.ndarray) -> np.ndarray:
+    """
+    Strength of every row of an (N, 5..7) array of ranks (0 = '2' .. 12 = 'A')
+    as if none of the cards made a flush: sorted ranks -> dense index -> table.
+    Rows with five or more of one rank get 0.
+    """
+    num_cards = ranks.shape[1]
+    sorted_ranks = np.sort(ranks, axis=1)
+    index = np.zeros(len(ranks), dtype=np.int32)
+    for i in range(num_cards):
+        index += COMB[sorted_ranks[:, i] + i, i + 1]
+    return _dense_rank_table(num_cards)[index]
+
+
+def combo_strengths(boards: np.ndarray) -> np.ndarray:
+    """
+    Strength of every combo in ALL_COMBOS with every board of a (D, 3..5)
+    card array, as a (D, 1326) int32 array. Combos that hold a board card
+    get a meaningless number; mask them out with COMBO_MASKS.
+
+    Without a flush the strength only depends on the two ranks, so only the
+    169 rank pairs go through rank_strengths(); flushes are one FLUSH_ARRAY
+    lookup per suit on top.
+    """
+    num_boards, board_cards = boards.shape
+    board_masks = np.left_shift(np.int64(1), boards.astype(np.int64)).sum(axis=1)
+    board_ranks = (boards % 13).astype(np.int32)
+    rows = np.concatenate([np.broadcast_to(board_ranks[:, None], (num_boards, len(RANK_PAIRS), board_cards)),
+                           np.broadcast_to(RANK_PAIRS[None], (num_boards, len(RANK_PAIRS), 2))], axis=2)
+    by_pair = rank_strengths(rows.reshape(-1, board_cards + 2)).reshape(num_boards, len(RANK_PAIRS))
+    strengths = by_pair[:, COMBO_RANK_PAIR]
+    for suit in range(4):
+        board_suit = (board_masks >> (13 * suit)) & SUIT_MASK
+        np.maximum(strengths, FLUSH_ARRAY[board_suit[:, None] | COMBO_SUIT_RANKS[None, :, suit]], out=strengths)
+    return strengths
+
+
+def evaluate_chunks(chunks: Iterable[np.ndarray]) -> Iterator[np.ndarray]:
+    """
+    Score a stream of card arrays one chunk at a time, e.g. from a generator
+    that reads hands off disk. Yields one strength array per chunk.
+    """
+    for chunk in chunks:
+        yield evaluate_batch(chunk)
+
+
+def iter_chunks(cards: np.ndarray, chunk_size: int = 1_000_000) -> Iterator[np.ndarray]:
+    # Split a big (N, 7) array (or np.memmap) into views of at most chunk_size rows
+    for start in range(0, len(cards), chunk_size):
+        yield cards[start:start + chunk_size]
+
+
+def strength_categories(strengths: np.ndarray) -> np.ndarray:
+    # Category 1 (straight flush) .. 9 (high card) for every strength
+    return 10 - (strengths >> 20)
+
+
+def shuffled_decks(num_decks: int, num_cards: int = 52, rng: Optional[np.random.Generator] = None,
+                   dead: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Shuffle num_decks decks at once and return the first num_cards cards of
+    each as a (num_decks, num_cards) int8 array, every row in random order.
+
+    dead - cards that must not be dealt: a list used for every deck, or an
+           (num_decks, k) array with different cards for each deck (e.g. the
+           hole cards already given out)
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    # Random sort keys; dead cards get a key past every live one so they sort last
+    keys = rng.random((num_decks, 52))
+    if dead is not None:
+        dead = np.asarray(dead)
+        if dead.ndim == 1:
+            keys[:, dead] = 2.0
+        else:
+            keys[np.arange(num_decks)[:, None], dead] = 2.0
+    if num_cards >= 52:
+        return np.argsort(keys, axis=1).astype(np.int8)
+    # Only the smallest num_cards keys are needed, then put those few in key order
+    dealt = np.argpartition(keys, num_cards, axis=1)[:, :num_cards]
+    order = np.argsort(np.take_along_axis(keys, dealt, axis=1), axis=1)
+    return np.take_along_axis(dealt, order, axis=1).astype(np.int8)
@@ -0,0 +1,231 @@
+"""
+Benchmark suite with regression checks.
+
+    python bench.py                                  # run everything and print the rates
+    python bench.py --save bench_baseline.json       # ... and keep them as the baseline
+    python bench.py --compare bench_baseline.json    # fail if anything got slower
+
+What is measured (everything seeded, so every run does exactly the same work):
+
+    eval5_per_s        evaluate_5card_hand_detailed calls per second (random hands,
+                       cache cleared first so it measures the evaluator)
+    eval7_per_s        evaluate_7card_hand_detailed calls per second
+    eval7_mask_per_s   handeval.evaluate_mask calls per second (what Game uses)
+    bet_per_s          Game.bet() calls per second (bets, raises, calls, checks
+                       and a rejected raise, no listener)
+    rounds_per_s_N     full play_one_round() hands per second of RandomBots at N players
+    snapshot_restore_per_s  Game.snapshot() + Game.restore() pairs per second (6 players, flop)
+    bytes_per_idle_table    memory of one 6-player Game between hands (tracemalloc)
+    bytes_per_active_table  the same in the middle of a hand (cards dealt, blinds in, flop out)
+    peak_rss_mb        peak memory of the process (Linux ru_maxrss)
+
+Each benchmark runs --repeats times and keeps the best rate, which is the
+least noisy number on a shared machine. --compare exits with status 1 when a
+rate is more than --threshold (default 10%) below the baseline.
+"""
+import sys
+import json
+import time
+import random
+import platform
+import argparse
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import resource
+
+from handeval import evaluate_mask
+from pokergame import Game, evaluate_5card_hand_detailed, evaluate_7card_hand_detailed
+from providers import RandomBot, CallingBot
+
+
+PLAYER_COUNTS = (2, 6, 10)
+BIG_STACK = 10 ** 9  # no one busts during a benchmark
+
+
+def best_rate(run: Callable[[], int], repeats: int) -> float:
+    # Operations per second of the fastest of 'repeats' runs (run() returns how many it did)
+    best = 0.0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        count = run()
+        best = max(best, count / (time.perf_counter() - start))
+    return best
+
+
+# ----- benchmarks -----
+
+def bench_evaluator(evaluate: Callable, num_cards: int, hands: int, repeats: int, seed: int) -> float:
+    rng = random.Random(seed)
+    deals = [rng.sample(range(52), num_cards) for _ in range(hands)]
+
+    def run() -> int:
+        if hasattr(evaluate, 'cache_clear'):
+            evaluate.cache_clear()
+        for cards in deals:
+            evaluate(cards)
+        return len(deals)
+    return best_rate(run, repeats)
+
+
+def bench_mask_evaluator(hands: int, repeats: int, seed: int) -> float:
+    rng = random.Random(seed)
+    masks = [sum(1 << card for card in rng.sample(range(52), 7)) for _ in range(hands)]
+
+    def run() -> int:
+        for mask in masks:
+            evaluate_mask(mask)
+        return len(masks)
+    return best_rate(run, repeats)
+
+
+def bench_bet(streets: int, repeats: int) -> float:
+    game = Game(2, names=["A", "B"], providers=CallingBot(), rng=random.Random(0))
+    first, second = game.players
+
+    def run() -> int:
+        for player in game.players:
+            player.money = BIG_STACK
+        game.start_new_round()
+        bet = game.bet
+        for _ in range(streets):
+            game.reset_all_players_last_bets()
+            game.reset_current_bet()
+            bet(first, 25)    # bet
+            bet(second, 60)   # raise
+            bet(first, 70)    # raise too small, turned down
+            bet(first, 60)    # call
+            bet(second, 60)   # check
+        return streets * 5
+    return best_rate(run, repeats)
+
+
+def bench_rounds(num_players: int, hands: int, repeats: int, seed: int) -> float:
+    def run() -> int:
+        bots = [RandomBot(seed * 16 + seat, all_in=0) for seat in range(num_players)]
+        game = Game(num_players, names=[f"Bot {seat + 1}" for seat in range(num_players)],
+                    providers=bots, rng=random.Random(seed))
+        for player in game.players:
+            player.money = BIG_STACK
+        return game.play(hands)
+    return best_rate(run, repeats)
+
+
+def bench_snapshot(count: int, repeats: int) -> float:
+    game = Game(6, names=[f"P{seat + 1}" for seat in range(6)], providers=CallingBot(), rng=random.Random(0))
+    game.start_new_round()
+    game.use_small_blind()
+    game.use_big_blind()
+    for player in game.players:
+        game.deal_cards_to_player(player, 2)
+    game.deck.deal_flop()
+    game.run_betting_round(0)
+
+    def run() -> int:
+        snapshot, restore = game.snapshot, game.restore
+        for _ in range(count):
+            restore(snapshot())
+        return count
+    return best_rate(run, repeats)
+
+
+def bytes_per_table(active: bool, tables: int = 1000, num_players: int = 6) -> float:
+    # Tables share one bot, like a server sharing one provider class per seat type
+    bot = CallingBot()
+
+    def make_table() -> Game:
+        game = Game(num_players, names=[f"P{seat + 1}" for seat in range(num_players)], providers=bot)
+        if active:
+            game.start_new_round()
+            game.use_small_blind()
+            game.use_big_blind()
+            for player in game.players:
+                game.deal_cards_to_player(player, 2)
+            game.deck.deal_flop()
+        return game
+
+    make_table()  # anything built once per process (tables, caches) is not counted
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    games = [make_table() for _ in range(tables)]
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del games
+    return used / tables
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_all(scale: float = 1.0, repeats: int = 3, seed: int = 0) -> Dict:
+    hands = max(1, int(20_000 * scale))
+    results = {
+        'eval5_per_s': bench_evaluator(evaluate_5card_hand_detailed, 5, hands, repeats, seed),
+        'eval7_per_s': bench_evaluator(evaluate_7card_hand_detailed, 7, hands, repeats, seed),
+        'eval7_mask_per_s': bench_mask_evaluator(hands * 5, repeats, seed),
+        'bet_per_s': bench_bet(max(1, int(20_000 * scale)), repeats),
+    }
+    for num_players in PLAYER_COUNTS:
+        results[f'rounds_per_s_{num_players}'] = bench_rounds(num_players, max(1, int(2_000 * scale)),
+                                                              repeats, seed)
+    results['snapshot_restore_per_s'] = bench_snapshot(max(1, int(50_000 * scale)), repeats)
+    results['bytes_per_idle_table'] = bytes_per_table(active=False)
+    results['bytes_per_active_table'] = bytes_per_table(active=True)
+    results['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+
+# ----- baselines -----
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[Tuple[str, float, float]]:
+    """
+    Every rate (the *_per_s* numbers) that dropped more than 'threshold'
+    (0.1 = 10%) below the baseline, as (name, baseline, now).
+    """
+    regressions = []
+    for name, before in baseline['results'].items():
+        if '_per_s' in name and name in results and results[name] < before * (1 - threshold):
+            regressions.append((name, before, results[name]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure evaluator, bet() and full-round throughput.")
+    parser.add_argument('--save', help="write the results to this JSON baseline file")
+    parser.add_argument('--compare', help="JSON baseline to check the results against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="allowed slowdown against the baseline (default 0.10 = 10%%)")
+    parser.add_argument('--scale', type=float, default=1.0, help="multiply the amount of work (0.1 for a quick run)")
+    parser.add_argument('--repeats', type=int, default=3, help="runs per benchmark, the best one counts")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    results = run_all(args.scale, args.repeats, args.seed)
+    for name, value in results.items():
+        print(f"{name:<24}{value:>14,.1f}")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'scale': args.scale,
+                'results': results,
+            }, f, indent=2)
+        print(f"Baseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, now in regressions:
+            print(f"REGRESSION {name}: {before:,.1f} -> {now:,.1f} ({now / before - 1:+.1%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No rate more than {args.threshold:.0%} below {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
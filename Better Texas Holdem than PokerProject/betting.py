@@ -0,0 +1,114 @@
+"""
+One street of betting as an explicit state machine.
+
+Seats that can still act (not folded, not all in) sit in a ring of
+next/previous links. The machine keeps:
+
+    seat            whose turn it is
+    to_act          how many more actions are needed before the street is over
+    last_aggressor  the last seat that bet or raised
+    live            seats still in the hand (all-in players count, folded don't)
+
+Every action is O(1). A check or call takes one off to_act. A bet or raise
+sets to_act to everyone else in the ring, since they all have to answer it.
+A fold or all in takes the seat out of the ring. The street is over when
+to_act reaches 0 or only one live seat is left.
+
+Nothing here calls itself or waits on anything, so a street can be played
+one action at a time from anywhere:
+
+    betting = BettingRound(game, first_seat)
+    while (seat := betting.current_seat()) is not None:
+        ... get an amount for game.players[seat] somehow, maybe much later ...
+        betting.act(amount)      # False if bet() turned it down, ask again
+
+Game.play_street() is that loop with the players' providers.
+"""
+from typing import List, Optional
+
+
+class BettingRound:
+    __slots__ = ('game', 'next_seat', 'prev_seat', 'ring_size', 'seat', 'to_act', 'last_aggressor', 'live')
+
+    def __init__(self, game, first_seat: int):
+        """
+        first_seat - the first seat to act (skipped if it can't act); the
+                     blinds, if any, must already be in
+        """
+        self.game = game
+        players = game.players
+        num_seats = len(players)
+        # All-in players are marked folded too, so "not folded" means "can still act"
+        order = [(first_seat + i) % num_seats for i in range(num_seats)]
+        ring = [seat for seat in order if not players[seat].is_folded]
+
+        self.next_seat: List[int] = [0] * num_seats
+        self.prev_seat: List[int] = [0] * num_seats
+        for i, seat in enumerate(ring):
+            self.next_seat[seat] = ring[(i + 1) % len(ring)]
+            self.prev_seat[seat] = ring[i - 1]
+        self.ring_size = len(ring)
+        self.seat = ring[0] if ring else None
+        self.to_act = len(ring)  # everyone acts at least once (the big blind gets its option)
+        self.last_aggressor = None
+        self.live = sum(1 for player in players if not player.is_folded or player.is_all_in)
+
+    def current_seat(self) -> Optional[int]:
+        # Seat that has to act now, or None when this street's betting is over
+        if self.to_act <= 0 or self.live <= 1 or self.ring_size == 0:
+            return None
+        return self.seat
+
+    def act(self, amount: int) -> bool:
+        """
+        Have the current seat bet 'amount' (its total for this street, like
+        Game.bet). Returns False, with nothing changed, if bet() turned it down.
+        """
+        game = self.game
+        current_bet = game.current_bet
+        if not game.bet(game.players[self.seat], amount):
+            return False
+        self.record(current_bet)
+        return True
+
+    def record(self, old_current_bet: int):
+        """
+        Move on after the current seat's action was accepted by Game.bet().
+        old_current_bet is game.current_bet from before that action.
+        """
+        seat = self.seat
+        player = self.game.players[seat]
+        following = self.next_seat[seat]
+        still_in_ring = not player.is_folded
+        if not still_in_ring:
+            self._remove(seat)
+            if not player.is_all_in:
+                self.live -= 1
+        if self.game.current_bet > old_current_bet:
+            # A bet or raise: everyone else left in the ring has to answer it
+            self.last_aggressor = seat
+            self.to_act = self.ring_size - 1 if still_in_ring else self.ring_size
+        else:
+            self.to_act -= 1
+        self.seat = following
+
+    def snapshot(self) -> tuple:
+        # Everything but the game, flat: both rings packed in one bytes, then the counters
+        return (bytes(self.next_seat) + bytes(self.prev_seat), self.ring_size, self.seat,
+                self.to_act, self.last_aggressor, self.live)
+
+    @classmethod
+    def from_snapshot(cls, game, state: tuple) -> 'BettingRound':
+        betting = cls.__new__(cls)
+        betting.game = game
+        rings, betting.ring_size, betting.seat, betting.to_act, betting.last_aggressor, betting.live = state
+        half = len(rings) // 2
+        betting.next_seat = list(rings[:half])
+        betting.prev_seat = list(rings[half:])
+        return betting
+
+    def _remove(self, seat: int):
+        before, after = self.prev_seat[seat], self.next_seat[seat]
+        self.next_seat[before] = after
+        self.prev_seat[after] = before
+        self.ring_size -= 1
@@ -0,0 +1,388 @@
+"""
+Precomputed hand strength buckets for the flop and the turn.
+
+    python buckets.py --workers 8                   # build hand_buckets.bin (takes a while)
+
+    table = load_bucket_table()
+    table.bucket(hand, board)        -> bucket id, 0 = weakest (board of 3 or 4 cards)
+    table.ehs(hand, board)           -> expected hand strength at the river, 0..1
+    table.histogram(3, bucket)       -> the bucket's hand strength distribution
+
+What a hand is worth on the flop or turn depends on how it ends up. For
+every hand on every board the build goes through every runout to the river
+and scores the hand's strength there: the share of all other two-card hands
+it beats (ties count half). Those strengths go into a histogram of 'bins'
+equal steps from 0 to 1. Its mean is the expected hand strength (EHS).
+
+Hands whose histograms look alike go in the same bucket: k-means on the
+cumulative histograms (distance between cumulative histograms is a close
+stand-in for the earth mover's distance between the histograms themselves).
+The centers are fitted on a sample of boards, then every hand on every
+board gets the nearest one. Buckets are numbered by the EHS of their
+center, lowest first.
+
+Only suit-canonical boards are built (1755 flops, 16432 turns, see
+isomorphism.py): every other board plays the same as its canonical one
+once the suits are renamed, hole cards included. Every canonical board
+keeps one byte per two-card hand (1326 of them) for the bucket and one for
+the EHS, so a lookup is: rename the suits, find the board's row, read one byte.
+
+File layout (little endian):
+    header     4s I I I    magic b'HSBK', version, bins, number of streets
+    per street:
+        I I I          board cards (3 or 4), boards, buckets
+        B * boards*k   the canonical boards, in CanonicalIndex order
+        f * buckets*bins   bucket centers as histograms
+        B * boards*1326    bucket of every hand on every board (NO_BUCKET if it uses a board card)
+        B * boards*1326    EHS * 255, rounded
+
+Building uses NumPy and a process pool; reading does not use NumPy at all.
+"""
+import os
+import mmap
+import struct
+import argparse
+from math import comb
+from itertools import combinations
+from typing import Dict, List, Optional, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+from cards import AnyCard, to_card
+from isomorphism import CanonicalIndex, suit_renaming
+
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hand_buckets.bin')
+MAGIC = b'HSBK'
+VERSION = 1
+HEADER = struct.Struct('<4sIII')
+STREET_HEADER = struct.Struct('<III')
+NUM_COMBOS = 1326
+NO_BUCKET = 255
+DEFAULT_BINS = 20
+DEFAULT_BUCKETS = {3: 50, 4: 50}  # per number of board cards
+RIVER_CHUNK = 128  # river boards scored at once
+
+
+def combo_index(card1: int, card2: int) -> int:
+    # Position of a two-card hand in combinations(range(52), 2) (batch_eval.ALL_COMBOS)
+    low, high = (card1, card2) if card1 < card2 else (card2, card1)
+    return 51 * low - low * (low - 1) // 2 + high - low - 1
+
+
+# -----------------------------------------
+# Building (NumPy, one process per chunk of boards)
+# -----------------------------------------
+
+def river_strengths(boards):
+    """
+    Hand strength of every two-card hand on every board of a (D, 5) card
+    array: the share of the other hands (not using the board or its own
+    cards) it beats, ties counting half. Returns a (D, 1326) float array
+    with nan for hands that use a board card.
+
+    All hands are ranked with one sort. Each hand then gives back the
+    hands that share a card with it, which are exactly the 51 hands
+    holding its first card plus the 51 holding its second.
+    """
+    import numpy as np
+    from batch_eval import CARD_COMBOS, COMBO_MASKS, combo_strengths
+
+    num_boards = len(boards)
+    strengths = combo_strengths(boards).astype(np.int64) + 1  # 0 is kept for hands that don't count
+    board_masks = np.left_shift(np.int64(1), boards.astype(np.int64)).sum(axis=1)
+    live = (COMBO_MASKS[None] & board_masks[:, None]) == 0
+
+    # Rank against every live hand on the same board (row * 2**24 keeps the boards apart)
+    offsets = (np.arange(num_boards, dtype=np.int64) << 24)[:, None]
+    ranked = np.sort((np.where(live, strengths, 0) + offsets).ravel())
+    keys = (strengths + offsets).ravel()
+    left = np.searchsorted(ranked, keys, 'left').reshape(num_boards, NUM_COMBOS)
+    right = np.searchsorted(ranked, keys, 'right').reshape(num_boards, NUM_COMBOS)
+    live_count = live.sum(axis=1)[:, None]
+    below = left - (np.arange(num_boards)[:, None] * NUM_COMBOS + NUM_COMBOS - live_count)
+    # The hand itself is in both blocked groups below but only once in 'equal' and 'count'
+    equal = right - left + 1
+    count = np.broadcast_to(live_count + 1, (num_boards, NUM_COMBOS)).copy()
+
+    for card in range(52):
+        group = CARD_COMBOS[card]
+        group_strengths = strengths[:, group]
+        group_live = live[:, group][:, None, :]
+        mine = group_strengths[:, :, None]
+        below[:, group] -= ((group_strengths[:, None, :] < mine) & group_live).sum(axis=2)
+        equal[:, group] -= ((group_strengths[:, None, :] == mine) & group_live).sum(axis=2)
+        count[:, group] -= live[:, group].sum(axis=1)[:, None]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(live, (below + 0.5 * equal) / count, np.nan)
+
+
+def board_histograms(board: Sequence[int], bins: int):
+    """
+    Histogram of river hand strength over every runout of a 3 or 4 card
+    board, for every two-card hand. Returns (histograms, ehs, live):
+    (1326, bins) shares summing to 1, (1326,) expected strength and which
+    hands don't use a board card (the others are all zeros).
+    """
+    import numpy as np
+    from batch_eval import COMBO_MASKS
+
+    board = list(board)
+    board_mask = sum(1 << card for card in board)
+    remaining = [card for card in range(52) if not board_mask >> card & 1]
+    runouts = np.array(list(combinations(remaining, 5 - len(board))), dtype=np.int8)
+    river_boards = np.concatenate([np.broadcast_to(np.array(board, dtype=np.int8), (len(runouts), len(board))),
+                                   runouts], axis=1)
+
+    counts = np.zeros(NUM_COMBOS * bins)
+    strength_sum = np.zeros(NUM_COMBOS)
+    columns = np.arange(NUM_COMBOS) * bins
+    for start in range(0, len(river_boards), RIVER_CHUNK):
+        strengths = river_strengths(river_boards[start:start + RIVER_CHUNK])
+        scored = ~np.isnan(strengths)
+        bin_index = np.minimum((np.nan_to_num(strengths) * bins).astype(np.int64), bins - 1)
+        counts += np.bincount((columns[None] + bin_index)[scored], minlength=NUM_COMBOS * bins)
+        strength_sum += np.nan_to_num(strengths).sum(axis=0)
+
+    live = (COMBO_MASKS & board_mask) == 0
+    # Every live hand sees the same number of runouts: the ones without its two cards
+    runouts_per_hand = comb(len(remaining) - 2, 5 - len(board))
+    return counts.reshape(NUM_COMBOS, bins) / runouts_per_hand, strength_sum / runouts_per_hand, live
+
+
+def _street_chunk(boards: List[Tuple[int, ...]], bins: int, centers=None):
+    """
+    Work for one process. Without centers: (histograms, live) of every
+    board, for fitting. With centers (as cumulative histograms): the
+    (bucket ids, EHS bytes) arrays of every board, (len(boards), 1326) each.
+    """
+    import numpy as np
+
+    histograms, ehs, live = zip(*(board_histograms(board, bins) for board in boards))
+    histograms = np.stack(histograms)
+    live = np.stack(live)
+    if centers is None:
+        return histograms.astype(np.float32), live
+    buckets = nearest_center(np.cumsum(histograms, axis=2).reshape(-1, bins), centers).reshape(live.shape)
+    buckets = np.where(live, buckets, NO_BUCKET).astype(np.uint8)
+    ehs_bytes = np.where(live, np.rint(np.stack(ehs) * 255), 0).astype(np.uint8)
+    return buckets, ehs_bytes
+
+
+def nearest_center(points, centers):
+    # Index of the nearest center (squared distance) for every row of points, a chunk at a time
+    import numpy as np
+    center_norms = (centers ** 2).sum(axis=1)
+    nearest = np.empty(len(points), dtype=np.int64)
+    for start in range(0, len(points), 65536):
+        chunk = points[start:start + 65536]
+        distances = center_norms[None] - 2 * chunk @ centers.T
+        nearest[start:start + len(chunk)] = distances.argmin(axis=1)
+    return nearest
+
+
+def kmeans(points, weights, k: int, rng, iterations: int = 30):
+    """
+    Weighted k-means: k-means++ starting centers, then Lloyd steps until
+    nothing moves or 'iterations' runs out. Returns the (k, dims) centers.
+    """
+    import numpy as np
+
+    probability = weights / weights.sum()
+    centers = [points[rng.choice(len(points), p=probability)]]
+    closest = ((points - centers[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        spread = weights * closest
+        if spread.sum() <= 0:
+            centers.append(centers[-1])  # fewer distinct points than centers
+            continue
+        centers.append(points[rng.choice(len(points), p=spread / spread.sum())])
+        closest = np.minimum(closest, ((points - centers[-1]) ** 2).sum(axis=1))
+    centers = np.array(centers, dtype=np.float64)
+
+    assignment = None
+    for _ in range(iterations):
+        new_assignment = nearest_center(points, centers)
+        if assignment is not None and np.array_equal(assignment, new_assignment):
+            break
+        assignment = new_assignment
+        totals = np.bincount(assignment, weights, minlength=k)
+        for dim in range(points.shape[1]):
+            sums = np.bincount(assignment, weights * points[:, dim], minlength=k)
+            centers[:, dim] = np.where(totals > 0, sums / np.where(totals > 0, totals, 1), centers[:, dim])
+    return centers
+
+
+def build_street(board_cards: int, num_buckets: int, bins: int, fit_boards: int, pool, rng,
+                 chunk: int) -> Tuple[List[Tuple[int, ...]], object, object, object]:
+    """
+    Fit the bucket centers on a sample of the canonical boards, then bucket
+    every hand on every canonical board.
+    Returns (boards, center histograms, bucket ids, EHS bytes).
+    """
+    import numpy as np
+
+    index = CanonicalIndex(0, board_cards)
+    boards = [board for hole, board in index.classes]
+    weights = np.array(index.weights, dtype=np.float64)
+
+    # 1) Fit: histograms of a sample of boards, every live hand weighted by how common its board is
+    sample = sorted(rng.choice(len(boards), size=min(fit_boards, len(boards)), replace=False).tolist())
+    futures = [pool.submit(_street_chunk, [boards[i] for i in sample[start:start + chunk]], bins)
+               for start in range(0, len(sample), chunk)]
+    histograms, live = zip(*(future.result() for future in futures))
+    histograms = np.concatenate(histograms)
+    live = np.concatenate(live)
+    points = np.cumsum(histograms, axis=2)[live]
+    point_weights = np.broadcast_to(weights[sample][:, None], live.shape)[live]
+    centers = kmeans(points, point_weights, num_buckets, rng)
+    # Number buckets from weakest to strongest (a lower cumulative histogram means more strength)
+    centers = centers[np.argsort(-centers.sum(axis=1))]
+
+    # 2) Every board
+    futures = [pool.submit(_street_chunk, boards[start:start + chunk], bins, centers)
+               for start in range(0, len(boards), chunk)]
+    buckets, ehs = zip(*(future.result() for future in futures))
+    center_histograms = np.diff(centers, axis=1, prepend=0.0)
+    return boards, center_histograms, np.concatenate(buckets), np.concatenate(ehs)
+
+
+def build_buckets(path: str = DEFAULT_PATH, buckets: Optional[Dict[int, int]] = None, bins: int = DEFAULT_BINS,
+                  fit_boards: Optional[Dict[int, int]] = None, workers: Optional[int] = None, seed: int = 0,
+                  chunk: int = 4):
+    """
+    Build the flop and turn tables and write the file.
+
+    buckets    - buckets per street, by number of board cards (default DEFAULT_BUCKETS)
+    fit_boards - boards per street the centers are fitted on (default 200 flops, 500 turns)
+    chunk      - boards per task handed to a worker
+    """
+    import numpy as np
+
+    buckets = {**DEFAULT_BUCKETS, **(buckets or {})}
+    fit_boards = {3: 200, 4: 500, **(fit_boards or {})}
+    if max(buckets.values()) >= NO_BUCKET:
+        raise ValueError(f"at most {NO_BUCKET - 1} buckets per street")
+    rng = np.random.default_rng(seed)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        streets = [(board_cards,) + build_street(board_cards, buckets[board_cards], bins, fit_boards[board_cards],
+                                                 pool, rng, chunk)
+                   for board_cards in (3, 4)]
+
+    with open(path + '.tmp', 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, bins, len(streets)))
+        for board_cards, boards, centers, bucket_ids, ehs in streets:
+            f.write(STREET_HEADER.pack(board_cards, len(boards), len(centers)))
+            f.write(bytes(card for board in boards for card in board))
+            f.write(centers.astype('<f4').tobytes())
+            f.write(bucket_ids.tobytes())
+            f.write(ehs.tobytes())
+    os.replace(path + '.tmp', path)
+
+
+# -----------------------------------------
+# Reading the tables (mmap, no NumPy)
+# -----------------------------------------
+
+class _Street:
+    # Where one street's sections start in the file
+    def __init__(self, board_cards: int, board_ids: Dict[Tuple[int, ...], int], num_buckets: int,
+                 centers_offset: int, buckets_offset: int, ehs_offset: int):
+        self.board_cards = board_cards
+        self.board_ids = board_ids
+        self.num_buckets = num_buckets
+        self.centers_offset = centers_offset
+        self.buckets_offset = buckets_offset
+        self.ehs_offset = ehs_offset
+
+
+class BucketTable:
+    def __init__(self, path: str = DEFAULT_PATH):
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.bins, num_streets = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a hand bucket file this version can read")
+        self.streets: Dict[int, _Street] = {}
+        offset = HEADER.size
+        for _ in range(num_streets):
+            board_cards, num_boards, num_buckets = STREET_HEADER.unpack_from(self.mm, offset)
+            offset += STREET_HEADER.size
+            raw = self.mm[offset:offset + num_boards * board_cards]
+            board_ids = {tuple(raw[i:i + board_cards]): n for n, i in enumerate(range(0, len(raw), board_cards))}
+            offset += num_boards * board_cards
+            centers_offset = offset
+            offset += 4 * num_buckets * self.bins
+            buckets_offset = offset
+            offset += num_boards * NUM_COMBOS
+            self.streets[board_cards] = _Street(board_cards, board_ids, num_buckets, centers_offset,
+                                                buckets_offset, offset)
+            offset += num_boards * NUM_COMBOS
+
+    def _position(self, hole: Sequence[AnyCard], board: Sequence[AnyCard]) -> Tuple[_Street, int]:
+        # (street, byte offset of the hand within a per-hand section) after renaming suits
+        board = [to_card(card) for card in board]
+        street = self.streets.get(len(board))
+        if street is None:
+            raise ValueError(f"no buckets for a board of {len(board)} cards")
+        new_suit = suit_renaming([], board)
+        canonical = tuple(sorted(new_suit[card // 13] * 13 + card % 13 for card in board))
+        card1, card2 = (new_suit[card // 13] * 13 + card % 13 for card in map(to_card, hole))
+        return street, street.board_ids[canonical] * NUM_COMBOS + combo_index(card1, card2)
+
+    def bucket(self, hole: Sequence[AnyCard], board: Sequence[AnyCard]) -> int:
+        street, position = self._position(hole, board)
+        bucket = self.mm[street.buckets_offset + position]
+        if bucket == NO_BUCKET:
+            raise ValueError("the hand uses a card that is on the board")
+        return bucket
+
+    def ehs(self, hole: Sequence[AnyCard], board: Sequence[AnyCard]) -> float:
+        # Expected hand strength at the river (stored to 1/255)
+        street, position = self._position(hole, board)
+        return self.mm[street.ehs_offset + position] / 255
+
+    def num_buckets(self, board_cards: int) -> int:
+        return self.streets[board_cards].num_buckets
+
+    def histogram(self, board_cards: int, bucket: int) -> List[float]:
+        # Center of a bucket: share of river hand strength in each of the 'bins' steps
+        street = self.streets[board_cards]
+        offset = street.centers_offset + 4 * bucket * self.bins
+        return list(struct.unpack_from(f'<{self.bins}f', self.mm, offset))
+
+    def close(self):
+        self.mm.close()
+
+
+_open_tables: Dict[str, BucketTable] = {}
+
+
+def load_bucket_table(path: str = DEFAULT_PATH) -> Optional[BucketTable]:
+    # None if the file hasn't been built; one BucketTable (one mmap) per file per process
+    if path not in _open_tables:
+        if not os.path.exists(path):
+            return None
+        _open_tables[path] = BucketTable(path)
+    return _open_tables[path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the flop and turn hand strength bucket file.")
+    parser.add_argument('--out', default=DEFAULT_PATH, help="where to write the bucket file")
+    parser.add_argument('--flop-buckets', type=int, default=DEFAULT_BUCKETS[3])
+    parser.add_argument('--turn-buckets', type=int, default=DEFAULT_BUCKETS[4])
+    parser.add_argument('--bins', type=int, default=DEFAULT_BINS, help="histogram steps from 0 to 1")
+    parser.add_argument('--fit-flops', type=int, default=200, help="flops the bucket centers are fitted on")
+    parser.add_argument('--fit-turns', type=int, default=500, help="turn boards the bucket centers are fitted on")
+    parser.add_argument('--workers', type=int, default=None, help="processes to use (default: all cores)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    build_buckets(args.out, {3: args.flop_buckets, 4: args.turn_buckets}, args.bins,
+                  {3: args.fit_flops, 4: args.fit_turns}, args.workers, args.seed)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
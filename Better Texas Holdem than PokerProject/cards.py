@@ -0,0 +1,79 @@
+"""
+Compact card encoding.
+
+A card is a plain int from 0 to 51:
+
+    card = suit_index * 13 + rank_index
+
+where rank_index is 0 for '2' up to 12 for 'A' and suit_index follows SUITS.
+A set of cards can also be held as one 64-bit "mask" with bit (1 << card)
+set for every card in it. Because each suit gets its own block of 13 bits,
+(mask >> 13 * suit) & 0x1FFF is the ranks held in that suit, and joining a
+hand with the board or checking for dead cards is just | and &.
+
+The old (rank, suit) string tuples are still accepted anywhere a card is
+looked up through CARD_VALUE / CARD_SUIT / CARD_FROM, so both forms work.
+"""
+from typing import Iterable, List, Tuple, Union
+
+
+RANKS = '23456789TJQKA'
+SUITS = 'SCHD'
+
+Card = int
+AnyCard = Union[int, Tuple[str, str]]
+
+FULL_DECK_MASK = (1 << 52) - 1
+SUIT_MASK = 0x1FFF  # 13 bits, one per rank
+
+# Rank value (2..14) and suit index for every card, keyed by the int AND by the old tuple
+CARD_VALUE = {}
+CARD_SUIT = {}
+CARD_FROM = {}
+for _s, _suit in enumerate(SUITS):
+    for _r, _rank in enumerate(RANKS):
+        _card = _s * 13 + _r
+        for _key in (_card, (_rank, _suit)):
+            CARD_VALUE[_key] = _r + 2
+            CARD_SUIT[_key] = _s
+            CARD_FROM[_key] = _card
+
+CARD_TEXT = [RANKS[card % 13] + SUITS[card // 13] for card in range(52)]
+
+
+def make_card(rank: str, suit: str) -> Card:
+    return SUITS.index(suit) * 13 + RANKS.index(rank)
+
+
+def to_card(card: AnyCard) -> Card:
+    # Accept either form and always give back the int
+    return CARD_FROM[card]
+
+
+def card_from_text(text: str) -> Card:
+    # 'AS' -> 38
+    return make_card(text[0].upper(), text[1].upper())
+
+
+def card_to_text(card: AnyCard) -> str:
+    return CARD_TEXT[CARD_FROM[card]]
+
+
+def cards_to_text(cards: Iterable[AnyCard]) -> str:
+    return ', '.join(card_to_text(card) for card in cards)
+
+
+def cards_to_mask(cards: Iterable[AnyCard]) -> int:
+    mask = 0
+    for card in cards:
+        mask |= 1 << CARD_FROM[card]
+    return mask
+
+
+def mask_to_cards(mask: int) -> List[Card]:
+    cards = []
+    while mask:
+        low_bit = mask & -mask
+        cards.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
+    return cards
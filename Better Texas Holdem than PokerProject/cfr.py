@@ -0,0 +1,606 @@
+"""
+Heads-up CFR trainer and the bot that plays its strategy.
+
+    python cfr.py --iterations 200000 --workers 8 --out cfr_strategy.npz
+    python cfr.py --resume cfr_strategy.npz --iterations 100000     # keep training
+    python cfr.py --resume cfr_strategy.npz --iterations 0 --play 5000   # try it out
+
+    game = Game(2, names=["CFR", "You"], providers=[CFRBot('cfr_strategy.npz'), ConsoleProvider()])
+
+The game is heads-up hold'em with the engine's own rules: seat 0 posts the
+small blind and acts first on every street, seat 1 posts the big blind, and
+a raise must at least double the current bet (Game.bet). It is abstracted
+in two ways:
+
+  Betting - at every decision a player may fold (only when facing a bet),
+            check/call, make a small bet (half the pot, or the minimum raise
+            when facing a bet), a pot-sized bet or raise, or go all in. After
+            MAX_RAISES raises on a street only fold and call are left. With
+            both stacks equal, the amounts only depend on the actions, so
+            the whole betting tree is built once (BettingTree).
+
+  Cards   - preflop every one of the 169 starting hand classes is its own
+            bucket. On the flop, turn and river a hand goes into one of
+            'buckets' equal-width buckets of hand strength: the share of all
+            other two-card hands it beats on the board so far.
+
+Training is Monte Carlo CFR with external sampling: every iteration deals
+one random set of cards, and for each player in turn walks every one of
+that player's actions and one sampled action of the opponent.
+
+The regret and strategy tables are two float32 arrays with one row per
+information set and one column per action. Rows are laid out by the tree:
+decision node n on street s owns 'buckets on street s' rows starting at
+tree.infoset_base[n]. There are no dicts or objects per information set.
+
+Iterations run on a process pool. In each round every worker gets a copy of
+the regrets, plays 'batch' iterations on its copy and sends back how much
+the regrets and strategy sums changed, and those changes are added up. The
+tables are written to the checkpoint file every checkpoint_every iterations
+and at the end.
+
+CFRBot is an ActionProvider that plays the average strategy. It finds the
+tree node closest to the real situation (same street, same seat, facing a
+bet or not, nearest pot and amount to call after scaling the chips to the
+trained stack), picks an action from that node's strategy and turns it into
+a real amount with the same sizing rules.
+"""
+import os
+import json
+import time
+import random
+import argparse
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from batch_eval import COMBO_INDEX, COMBO_MASKS, combo_strengths
+from pokergame import Game
+from preflop import NUM_CLASSES, hand_class
+from providers import ActionProvider, CallingBot, RandomBot, call_amount, min_raise_amount
+
+
+ACTIONS = ('fold', 'call', 'small', 'pot', 'all_in')
+FOLD, CALL, SMALL, POT, ALL_IN = range(len(ACTIONS))
+NUM_ACTIONS = len(ACTIONS)
+NUM_STREETS = 4  # preflop, flop, turn, river
+BOARD_CARDS = (0, 3, 4, 5)  # community cards on each street
+MAX_RAISES = 3
+DEFAULT_BUCKETS = 10
+
+# Node kinds
+DECISION, FOLDED, SHOWDOWN = range(3)
+
+
+def raise_to(action: int, pot: int, current_bet: int, last_bet: int, money: int, big_blind: int) -> int:
+    """
+    Street total (like Game.bet's amount) for a SMALL, POT or ALL_IN action.
+    Used both to build the tree and by CFRBot at the table, so the two size
+    bets the same way. Anything past the player's stack is capped at all in.
+    """
+    all_in = last_bet + money
+    to_call = current_bet - last_bet
+    if action == ALL_IN:
+        return all_in
+    if current_bet == 0:
+        total = max(big_blind, pot // 2 if action == SMALL else pot)
+    elif action == SMALL:
+        total = 2 * current_bet  # the smallest raise Game.bet takes
+    else:
+        total = current_bet + pot + to_call  # call, then raise by the pot that leaves
+    return min(total, all_in)
+
+
+# -----------------------------------------
+# The abstract betting tree
+# -----------------------------------------
+
+class BettingTree:
+    """
+    Every node of the abstract heads-up game, as flat arrays indexed by node id:
+
+        kind[n]          DECISION, FOLDED (the other player wins) or SHOWDOWN
+        actor[n]         player to act (0 = small blind) / player who folded
+        street[n]        0 preflop .. 3 river
+        children[n, a]   node after action a, -1 if a isn't allowed here
+        contribution[n]  chips each player has put in this hand
+        pot[n], to_call[n]    what the actor sees (for CFRBot)
+        infoset_base[n]  first table row of a decision node (-1 otherwise)
+
+    Node 0 is the small blind's first decision.
+    """
+    def __init__(self, stack: int = 1000, small_blind: int = 10, big_blind: int = 25,
+                 buckets: int = DEFAULT_BUCKETS, max_raises: int = MAX_RAISES):
+        if stack <= big_blind:
+            raise ValueError("the stack must be bigger than the big blind")
+        self.stack = stack
+        self.small_blind = small_blind
+        self.big_blind = big_blind
+        self.buckets = buckets
+        self.max_raises = max_raises
+        self.street_buckets = (NUM_CLASSES,) + (buckets,) * (NUM_STREETS - 1)
+
+        kind, actor, street, children, contribution, pot, to_call = [], [], [], [], [], [], []
+
+        def add_node(node_kind: int, node_actor: int, node_street: int, contributions: Tuple[int, int],
+                     node_to_call: int = 0) -> int:
+            kind.append(node_kind)
+            actor.append(node_actor)
+            street.append(node_street)
+            children.append([-1] * NUM_ACTIONS)
+            contribution.append(contributions)
+            pot.append(sum(contributions))
+            to_call.append(node_to_call)
+            return len(kind) - 1
+
+        # A betting state: (street, actor, contributions, last_bets, current_bet, to_act, raises, all_in)
+        start = (0, 0, (small_blind, big_blind), (small_blind, big_blind), big_blind, 2, 0, (False, False))
+        pending = [(start, None, 0)]  # (state, parent node, action that leads here)
+        while pending:
+            state, parent, parent_action = pending.pop()
+            node_street, node_actor, contributions, last_bets, current_bet, to_act, raises, all_in = state
+            node = add_node(DECISION, node_actor, node_street, contributions, current_bet - last_bets[node_actor])
+            if parent is not None:
+                children[parent][parent_action] = node
+
+            other = 1 - node_actor
+            last_bet = last_bets[node_actor]
+            money = stack - contributions[node_actor]
+            current_pot = sum(contributions)
+            facing = current_bet > last_bet
+
+            totals = {}
+            if facing:
+                totals[FOLD] = None
+            totals[CALL] = min(current_bet, last_bet + money)
+            if raises < max_raises and not all_in[other]:
+                for action in (SMALL, POT, ALL_IN):
+                    total = raise_to(action, current_pot, current_bet, last_bet, money, big_blind)
+                    # Only real raises, and each amount once (a capped bet is just the all in)
+                    if total > current_bet and total not in totals.values() and \
+                            (action == ALL_IN or total < last_bet + money):
+                        totals[action] = total
+
+            for action, total in totals.items():
+                if action == FOLD:
+                    children[node][FOLD] = add_node(FOLDED, node_actor, node_street, contributions)
+                    continue
+                added = total - last_bet
+                new_contributions = list(contributions)
+                new_contributions[node_actor] += added
+                new_last_bets = list(last_bets)
+                new_last_bets[node_actor] = total
+                new_all_in = list(all_in)
+                new_all_in[node_actor] = added == money
+                if total > current_bet:
+                    # A raise: the other player has to answer it (like BettingRound.record)
+                    new_to_act, new_raises, new_current_bet = 1, raises + 1, total
+                else:
+                    new_to_act, new_raises, new_current_bet = to_act - 1, raises, current_bet
+                if new_to_act > 0 and not new_all_in[other]:
+                    pending.append(((node_street, other, tuple(new_contributions), tuple(new_last_bets),
+                                     new_current_bet, new_to_act, new_raises, tuple(new_all_in)), node, action))
+                elif any(new_all_in) or node_street == NUM_STREETS - 1:
+                    # Betting is over for the hand: deal out the board and show down
+                    children[node][action] = add_node(SHOWDOWN, node_actor, node_street, tuple(new_contributions))
+                else:
+                    pending.append(((node_street + 1, 0, tuple(new_contributions), (0, 0), 0, 2, 0, (False, False)),
+                                    node, action))
+
+        self.kind = np.array(kind, dtype=np.int8)
+        self.actor = np.array(actor, dtype=np.int8)
+        self.street = np.array(street, dtype=np.int8)
+        self.children = np.array(children, dtype=np.int32)
+        self.contribution = np.array(contribution, dtype=np.int32)
+        self.pot = np.array(pot, dtype=np.int32)
+        self.to_call = np.array(to_call, dtype=np.int32)
+
+        decision = self.kind == DECISION
+        sizes = np.where(decision, np.array(self.street_buckets)[self.street], 0)
+        self.infoset_base = np.where(decision, np.cumsum(sizes) - sizes, -1).astype(np.int64)
+        self.num_infosets = int(sizes.sum())
+        # Which node every table row belongs to, and which actions it allows
+        self.infoset_node = np.repeat(np.arange(len(kind)), sizes)
+        self.legal = self.children[self.infoset_node] >= 0
+
+    def config(self) -> Dict:
+        return {'stack': self.stack, 'small_blind': self.small_blind, 'big_blind': self.big_blind,
+                'buckets': self.buckets, 'max_raises': self.max_raises}
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+
+_trees: Dict[str, BettingTree] = {}
+
+
+def get_tree(config: Dict) -> BettingTree:
+    # One tree per configuration per process (workers build theirs once)
+    key = json.dumps(config, sort_keys=True)
+    if key not in _trees:
+        _trees[key] = BettingTree(**config)
+    return _trees[key]
+
+
+# -----------------------------------------
+# Card buckets
+# -----------------------------------------
+
+CLASS_OF = np.array([[hand_class(a, b) if a != b else -1 for b in range(52)] for a in range(52)], dtype=np.int16)
+
+
+def hand_strength(hole: np.ndarray, board: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For D deals: hole is (D, P, 2) cards, board is (D, k) with k = 3, 4 or 5.
+    Returns (share, strength): share[d, p] is the part of all other two-card
+    hands (not using the board or p's cards) that p's hand beats, ties
+    counting half; strength[d, p] is p's evaluate_batch strength.
+    """
+    num_deals, num_players = hole.shape[:2]
+    board_masks = np.left_shift(np.int64(1), board.astype(np.int64)).sum(axis=1)
+    strengths = combo_strengths(board)
+    blocked = (COMBO_MASKS[None] & board_masks[:, None]) != 0
+
+    own = COMBO_INDEX[hole[:, :, 0], hole[:, :, 1]]  # (D, P)
+    own_strength = np.take_along_axis(strengths, own, axis=1)
+    share = np.zeros((num_deals, num_players))
+    for p in range(num_players):
+        opponents = ~blocked & ((COMBO_MASKS[None] & COMBO_MASKS[own[:, p]][:, None]) == 0)
+        mine = own_strength[:, p:p + 1]
+        beaten = ((strengths < mine) & opponents).sum(axis=1) + 0.5 * ((strengths == mine) & opponents).sum(axis=1)
+        share[:, p] = beaten / opponents.sum(axis=1)
+    return share, own_strength
+
+
+def deal_buckets(rng: np.random.Generator, num_deals: int, buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Deal num_deals heads-up hands. Returns (bucket, winner): bucket[d, p, s]
+    is player p's bucket on street s, winner[d] is 0 or 1 for the player
+    whose hand is better at showdown, or -1 for a split pot.
+    """
+    cards = np.argsort(rng.random((num_deals, 52)), axis=1)[:, :9].astype(np.int8)
+    hole = cards[:, :4].reshape(num_deals, 2, 2)
+    board = cards[:, 4:]
+    bucket = np.zeros((num_deals, 2, NUM_STREETS), dtype=np.int32)
+    bucket[:, :, 0] = CLASS_OF[hole[:, :, 0], hole[:, :, 1]]
+    for street in range(1, NUM_STREETS):
+        share, strength = hand_strength(hole, board[:, :BOARD_CARDS[street]])
+        bucket[:, :, street] = np.minimum((share * buckets).astype(np.int32), buckets - 1)
+    winner = np.where(strength[:, 0] > strength[:, 1], 0, np.where(strength[:, 1] > strength[:, 0], 1, -1))
+    return bucket, winner
+
+
+# -----------------------------------------
+# External sampling MCCFR
+# -----------------------------------------
+
+class _Walker:
+    """
+    Runs iterations against plain Python lists (much faster than NumPy for
+    one small row at a time) and turns the changes back into arrays at the end.
+    """
+    def __init__(self, tree: BettingTree, regrets: np.ndarray, seed: int):
+        self.tree = tree
+        self.kind = tree.kind.tolist()
+        self.actor = tree.actor.tolist()
+        self.street = tree.street.tolist()
+        self.children = tree.children.tolist()
+        self.contribution = (tree.contribution / tree.big_blind).tolist()  # utilities in big blinds
+        self.base = tree.infoset_base.tolist()
+        self.legal = [[a for a in range(NUM_ACTIONS) if row[a] >= 0] for row in self.children]
+        self.start = regrets
+        self.regrets = regrets.ravel().tolist()
+        self.strategy_sum = [0.0] * len(self.regrets)
+        self.rng = np.random.default_rng(seed)  # deals
+        self.random = random.Random(seed).random  # opponent actions, one at a time
+
+    def run(self, iterations: int, deals_at_once: int = 256):
+        done = 0
+        while done < iterations:
+            count = min(deals_at_once, iterations - done)
+            buckets, winners = deal_buckets(self.rng, count, self.tree.buckets)
+            for bucket, winner in zip(buckets.tolist(), winners.tolist()):
+                for traverser in (0, 1):
+                    self.walk(0, traverser, bucket, winner)
+            done += count
+
+    def strategy(self, row: int, legal: List[int]) -> List[float]:
+        # Regret matching: play each action in proportion to its positive regret
+        regrets = self.regrets
+        positive = [max(regrets[row + a], 0.0) for a in legal]
+        total = sum(positive)
+        if total > 0:
+            return [r / total for r in positive]
+        return [1.0 / len(legal)] * len(legal)
+
+    def walk(self, node: int, traverser: int, bucket: List[List[int]], winner: int) -> float:
+        kind = self.kind[node]
+        if kind != DECISION:
+            contribution = self.contribution[node]
+            if kind == FOLDED:
+                loser = self.actor[node]
+            elif winner < 0:
+                return 0.0  # equal stacks in, so a split pot is break even
+            else:
+                loser = 1 - winner
+            return -contribution[traverser] if loser == traverser else contribution[1 - traverser]
+
+        actor = self.actor[node]
+        legal = self.legal[node]
+        row = (self.base[node] + bucket[actor][self.street[node]]) * NUM_ACTIONS
+        sigma = self.strategy(row, legal)
+        children = self.children[node]
+        if actor == traverser:
+            values = [self.walk(children[a], traverser, bucket, winner) for a in legal]
+            expected = sum(p * v for p, v in zip(sigma, values))
+            regrets = self.regrets
+            for a, value in zip(legal, values):
+                regrets[row + a] += value - expected
+            return expected
+
+        # Opponent: add its current strategy to the average and follow one sampled action
+        strategy_sum = self.strategy_sum
+        for a, p in zip(legal, sigma):
+            strategy_sum[row + a] += p
+        draw = self.random()
+        for a, p in zip(legal, sigma):
+            draw -= p
+            if draw < 0:
+                break
+        return self.walk(children[a], traverser, bucket, winner)
+
+    def changes(self) -> Tuple[np.ndarray, np.ndarray]:
+        shape = self.start.shape
+        regrets = np.array(self.regrets, dtype=np.float32).reshape(shape)
+        return regrets - self.start, np.array(self.strategy_sum, dtype=np.float32).reshape(shape)
+
+
+def _run_iterations(config: Dict, regrets: np.ndarray, iterations: int, seed: int) -> Tuple[np.ndarray, np.ndarray]:
+    # One worker's share of a round: returns (regret change, strategy sum change)
+    walker = _Walker(get_tree(config), regrets, seed)
+    walker.run(iterations)
+    return walker.changes()
+
+
+class CFRTrainer:
+    """
+    Regret and strategy tables for one BettingTree, trained with run().
+    Blinds default to the ones a new Game uses, the stack to a new Player's.
+    """
+    def __init__(self, stack: int = 1000, small_blind: Optional[int] = None, big_blind: Optional[int] = None,
+                 buckets: int = DEFAULT_BUCKETS, max_raises: int = MAX_RAISES):
+        if small_blind is None or big_blind is None:
+            game = Game(2, names=["SB", "BB"], providers=CallingBot())
+            small_blind = game.small_blind if small_blind is None else small_blind
+            big_blind = game.big_blind if big_blind is None else big_blind
+        self.tree = get_tree({'stack': stack, 'small_blind': small_blind, 'big_blind': big_blind,
+                              'buckets': buckets, 'max_raises': max_raises})
+        self.regrets = np.zeros((self.tree.num_infosets, NUM_ACTIONS), dtype=np.float32)
+        self.strategy_sum = np.zeros_like(self.regrets)
+        self.iterations = 0
+        self.seed = 0
+
+    def train(self, iterations: int, workers: Optional[int] = None, batch: int = 2000,
+              checkpoint: Optional[str] = None, checkpoint_every: int = 50_000, seed: Optional[int] = None,
+              progress=None):
+        """
+        Run 'iterations' more iterations (each one walks the tree once for each player).
+
+        workers          - processes (None = all cores, 1 = no process pool)
+        batch            - iterations a worker plays on its own copy of the regrets per round
+        checkpoint       - file to save() to every checkpoint_every iterations and at the end
+        seed             - same seed, workers and batch => same tables (default: carry on
+                           from the seed the tables were saved with)
+        progress         - called with the trainer after every round, e.g. to print
+        """
+        if seed is not None:
+            self.seed = seed
+        if workers is None:
+            workers = os.cpu_count() or 1
+        config = self.tree.config()
+        target = self.iterations + iterations
+        next_checkpoint = self.iterations + checkpoint_every
+
+        def seeds(count: int) -> List[int]:
+            # Each round's worker seeds come from (seed, iterations so far), so resuming repeats nothing
+            rng = np.random.default_rng([self.seed, self.iterations])
+            return rng.integers(1 << 62, size=count).tolist()
+
+        def apply(changes: List[Tuple[np.ndarray, np.ndarray]], done: int):
+            for regret_change, strategy_change in changes:
+                self.regrets += regret_change
+                self.strategy_sum += strategy_change
+            self.iterations += done
+
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        try:
+            while self.iterations < target:
+                shares = []
+                remaining = target - self.iterations
+                for _ in range(workers):
+                    share = min(batch, remaining)
+                    if share <= 0:
+                        break
+                    shares.append(share)
+                    remaining -= share
+                round_seeds = seeds(len(shares))
+                if pool is None:
+                    changes = [_run_iterations(config, self.regrets, share, round_seed)
+                               for share, round_seed in zip(shares, round_seeds)]
+                else:
+                    futures = [pool.submit(_run_iterations, config, self.regrets, share, round_seed)
+                               for share, round_seed in zip(shares, round_seeds)]
+                    changes = [future.result() for future in futures]
+                apply(changes, sum(shares))
+                if progress is not None:
+                    progress(self)
+                if checkpoint is not None and self.iterations >= next_checkpoint:
+                    self.save(checkpoint)
+                    next_checkpoint = self.iterations + checkpoint_every
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if checkpoint is not None:
+            self.save(checkpoint)
+
+    def average_strategy(self) -> np.ndarray:
+        # The strategy that converges: strategy sums normalized per row (uniform where never reached)
+        legal = self.tree.legal
+        sums = np.where(legal, self.strategy_sum.astype(np.float64), 0.0)
+        totals = sums.sum(axis=1, keepdims=True)
+        uniform = legal / legal.sum(axis=1, keepdims=True)
+        return np.where(totals > 0, sums / np.where(totals > 0, totals, 1.0), uniform)
+
+    # ----- checkpoints -----
+
+    def save(self, path: str):
+        # Written next to the file and swapped in, so a crash never leaves half a checkpoint
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as f:
+            np.savez(f, regrets=self.regrets, strategy_sum=self.strategy_sum,
+                     iterations=np.int64(self.iterations), seed=np.int64(self.seed),
+                     config=np.array(json.dumps(self.tree.config())))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'CFRTrainer':
+        with np.load(path) as data:
+            trainer = cls(**json.loads(str(data['config'])))
+            if data['regrets'].shape != trainer.regrets.shape:
+                raise ValueError(f"{path} doesn't match the betting tree its settings build")
+            trainer.regrets = data['regrets']
+            trainer.strategy_sum = data['strategy_sum']
+            trainer.iterations = int(data['iterations'])
+            trainer.seed = int(data['seed'])
+        return trainer
+
+
+# -----------------------------------------
+# Playing the strategy
+# -----------------------------------------
+
+class CFRBot(ActionProvider):
+    """
+    Plays a trained strategy in a Game (from a checkpoint file or a trainer).
+    Made for heads-up; at a bigger table seat 0 plays the small blind's
+    strategy and everyone else the big blind's.
+    """
+    def __init__(self, source, seed: Optional[int] = None):
+        trainer = CFRTrainer.load(source) if isinstance(source, str) else source
+        self.tree = tree = trainer.tree
+        self.strategy = trainer.average_strategy()
+        self.rng = np.random.default_rng(seed)
+        # Decision nodes grouped by (street, actor, facing a bet), with their log-scaled pot and call
+        self.candidates: Dict[Tuple[int, int, bool], Tuple[np.ndarray, np.ndarray]] = {}
+        for node in np.flatnonzero(tree.kind == DECISION):
+            key = (int(tree.street[node]), int(tree.actor[node]), bool(tree.to_call[node] > 0))
+            self.candidates.setdefault(key, []).append(node)
+        for key, nodes in self.candidates.items():
+            nodes = np.array(nodes)
+            features = np.stack([np.log(tree.pot[nodes]), np.log1p(tree.to_call[nodes])], axis=1)
+            self.candidates[key] = (nodes, features)
+
+    def get_name(self, seat: int) -> str:
+        return f"CFR {seat + 1}"
+
+    def bucket(self, game, player, street: int) -> int:
+        hand = player.hand
+        if street == 0:
+            return int(CLASS_OF[hand[0], hand[1]])
+        hole = np.array([[hand]], dtype=np.int8)
+        board = np.array([game.deck.community], dtype=np.int8)
+        share = hand_strength(hole, board)[0][0, 0]
+        return min(int(share * self.tree.buckets), self.tree.buckets - 1)
+
+    def find_node(self, game, player, street: int, actor: int) -> int:
+        # Closest decision node once the real chips are scaled to the trained stack
+        opponents = [other for other in game.players if other is not player and (not other.is_folded or other.is_all_in)]
+        effective = min([player.money + player.total_contribution] +
+                        [other.money + other.total_contribution for other in opponents])
+        scale = self.tree.stack / max(effective, 1)
+        to_call = call_amount(game, player)
+        key = (street, actor, to_call > 0)
+        if key not in self.candidates:
+            key = (street, actor, not key[2])
+        nodes, features = self.candidates[key]
+        target = np.array([np.log(max(game.pot * scale, 1.0)), np.log1p(to_call * scale)])
+        return int(nodes[np.abs(features - target).sum(axis=1).argmin()])
+
+    def get_action(self, game, player, attempt: int) -> int:
+        if attempt:
+            return 0  # always legal: a check, or a fold if there is a bet to match
+        street = BOARD_CARDS.index(len(game.deck.community))
+        actor = 0 if game.players.index(player) == 0 else 1
+        node = self.find_node(game, player, street, actor)
+        row = self.tree.infoset_base[node] + self.bucket(game, player, street)
+        action = int(self.rng.choice(NUM_ACTIONS, p=self.strategy[row]))
+
+        to_call = call_amount(game, player)
+        if action == FOLD:
+            return 0
+        if action == CALL:
+            return to_call
+        total = raise_to(action, game.pot, game.current_bet, player.last_bet, player.money, game.big_blind)
+        return max(total - player.last_bet, min_raise_amount(game, player))
+
+
+def evaluate(bot: ActionProvider, opponent: ActionProvider, hands: int, stack: int = 1000,
+             seed: int = 0) -> float:
+    """
+    Big blinds won per 100 hands by 'bot' against 'opponent', both starting
+    every hand with 'stack' and swapping seats every hand.
+    """
+    game = Game(2, names=["Bot", "Opponent"], providers=[bot, opponent], rng=random.Random(seed))
+    hero = game.players[0]
+    won = 0
+    for _ in range(hands):
+        for player in game.players:
+            player.money = stack
+        game.play_one_round()  # also moves the button, so seats swap every hand
+        won += hero.money - stack
+    return won / game.big_blind / hands * 100
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train a heads-up strategy with Monte Carlo CFR.")
+    parser.add_argument('--out', default='cfr_strategy.npz', help="checkpoint file to write")
+    parser.add_argument('--resume', help="checkpoint to carry on from (and write to, unless --out is given)")
+    parser.add_argument('--iterations', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=None, help="processes to use (default: all cores)")
+    parser.add_argument('--batch', type=int, default=2000, help="iterations per worker per round")
+    parser.add_argument('--checkpoint-every', type=int, default=50_000)
+    parser.add_argument('--buckets', type=int, default=DEFAULT_BUCKETS, help="hand strength buckets after the flop")
+    parser.add_argument('--stack', type=int, default=1000, help="stack in cents both players start with")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--play', type=int, default=0, help="afterwards, play this many hands against bots")
+    args = parser.parse_args()
+
+    if args.resume:
+        trainer = CFRTrainer.load(args.resume)
+        out = args.out if args.out != parser.get_default('out') else args.resume
+    else:
+        trainer = CFRTrainer(stack=args.stack, buckets=args.buckets)
+        out = args.out
+    print(f"{len(trainer.tree):,} tree nodes, {trainer.tree.num_infosets:,} information sets, "
+          f"{trainer.iterations:,} iterations so far")
+
+    start = time.perf_counter()
+    first = trainer.iterations
+
+    def progress(trainer: CFRTrainer):
+        rate = (trainer.iterations - first) / (time.perf_counter() - start)
+        print(f"\r{trainer.iterations:,} iterations ({rate:,.0f}/s)", end='', flush=True)
+
+    if args.iterations:
+        trainer.train(args.iterations, args.workers, args.batch, out, args.checkpoint_every, args.seed, progress)
+        print(f"\nSaved {out}")
+
+    if args.play:
+        for name, opponent in (("CallingBot", CallingBot()), ("RandomBot", RandomBot(1, all_in=0))):
+            result = evaluate(CFRBot(trainer, seed=0), opponent, args.play, trainer.tree.stack)
+            print(f"vs {name}: {result:+.1f} bb/100 over {args.play:,} hands")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Chip amounts.
+
+All stacks, bets, blinds and pots are whole numbers of cents (ints), so the
+game never has to round anything. Amounts only become dollars when they are
+shown to someone or typed in:
+
+    to_cents('0.25') -> 25
+    format_chips(25) -> '0.25'
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import List, Union
+
+
+CENTS_PER_DOLLAR = 100
+
+
+def to_cents(value: Union[str, float, int, Decimal]) -> int:
+    """
+    Turn a dollar amount (text like '1.5', or a number) into cents.
+    Raises ValueError if it is not a number.
+    """
+    try:
+        dollars = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"not an amount: {value!r}")
+    if not dollars.is_finite():
+        raise ValueError(f"not an amount: {value!r}")
+    return int((dollars * CENTS_PER_DOLLAR).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_dollars(cents: int) -> Decimal:
+    return Decimal(cents) / CENTS_PER_DOLLAR
+
+
+def format_chips(cents: int) -> str:
+    # 1234 -> '12.34', -5 -> '-0.05'
+    sign = '-' if cents < 0 else ''
+    dollars, cents = divmod(abs(cents), CENTS_PER_DOLLAR)
+    return f"{sign}{dollars}.{cents:02d}"
+
+
+def split_amount(amount: int, ways: int) -> List[int]:
+    """
+    Split amount between 'ways' winners in whole cents. The odd cents go one
+    each to the first winners in the list (seat order), so the split always
+    comes out the same and adds back up to amount.
+    """
+    share, remainder = divmod(amount, ways)
+    return [share + 1 if i < remainder else share for i in range(ways)]
@@ -0,0 +1,136 @@
+"""
+Bot clients for server.py and a load test that runs on one machine.
+
+    python client.py --host 127.0.0.1 --port 9000 --bots 6     # bots for a running server
+    python client.py --load-test --tables 200 --players 6 --hands 20
+
+--load-test starts a GameServer in this process, connects tables * players
+bots to it over local TCP, and prints hands and actions per second, the
+server's time per action (from sending "act" to getting the answer) and
+how many actions timed out. --slow makes that share of the bots sleep past
+the timeout now and then, to exercise the automatic check/fold.
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Dict, List, Optional
+
+from server import GameServer, encode
+
+
+class BotClient:
+    """
+    Plays like providers.RandomBot, but from the numbers in the server's
+    "act" messages. 'slow' is the chance of sleeping past the timeout on a decision.
+    """
+    def __init__(self, name: str, seed: Optional[int] = None, slow: float = 0.0,
+                 fold: float = 0.15, call: float = 0.6, raise_: float = 0.2):
+        self.name = name
+        self.rng = random.Random(seed)
+        self.slow = slow
+        total = fold + call + raise_
+        self.fold_below = fold / total
+        self.call_below = (fold + call) / total
+        self.actions = 0
+        self.timeouts = 0
+        self.stacks = None
+
+    def decide(self, message: Dict) -> int:
+        if message['attempt']:
+            return 0
+        roll = self.rng.random()
+        if roll < self.fold_below:
+            return 0
+        if roll < self.call_below:
+            return message['to_call']
+        return message['min_raise']
+
+    async def play(self, host: str, port: int, timeout: float = 5.0):
+        reader, writer = await asyncio.open_connection(host, port, limit=1 << 20)
+        writer.write(encode({'type': 'join', 'name': self.name}))
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            kind = message['type']
+            if kind == 'act':
+                if self.slow and self.rng.random() < self.slow:
+                    await asyncio.sleep(timeout * 1.5)
+                writer.write(encode({'type': 'action', 'id': message['id'], 'amount': self.decide(message)}))
+                self.actions += 1
+            elif kind == 'timeout':
+                self.timeouts += 1
+            elif kind == 'game_over':
+                self.stacks = message['stacks']
+                break
+        writer.close()
+
+
+async def run_bots(host: str, port: int, bots: List[BotClient], timeout: float):
+    await asyncio.gather(*(bot.play(host, port, timeout) for bot in bots))
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def load_test(tables: int, players: int, hands: int, timeout: float = 1.0,
+                    slow: float = 0.0, seed: int = 0) -> Dict:
+    """
+    Run 'tables' full tables of bots against an in-process server and return
+    the numbers (also used by main() to print them).
+    """
+    server = GameServer(players, hands, timeout, seed=seed)
+    port = await server.start()
+    bots = [BotClient(f"Bot {i + 1}", seed=seed * 100_003 + i, slow=slow) for i in range(tables * players)]
+    start = time.perf_counter()
+    await run_bots('127.0.0.1', port, bots, timeout)
+    await server.all_finished.wait()
+    elapsed = time.perf_counter() - start
+    await server.close()
+    return {
+        'tables': server.tables_finished,
+        'hands': server.hands_played,
+        'actions': server.actions,
+        'timeouts': server.timeouts,
+        'seconds': elapsed,
+        'hands_per_s': server.hands_played / elapsed,
+        'actions_per_s': server.actions / elapsed,
+        'action_ms_p50': percentile(server.latencies, 0.5) * 1000,
+        'action_ms_p99': percentile(server.latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot clients for server.py, or a local load test.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--bots', type=int, default=6, help="bots to connect to a running server")
+    parser.add_argument('--load-test', action='store_true', help="start a server here and load it")
+    parser.add_argument('--tables', type=int, default=100)
+    parser.add_argument('--players', type=int, default=6)
+    parser.add_argument('--hands', type=int, default=20)
+    parser.add_argument('--timeout', type=float, default=1.0, help="server's seconds per action")
+    parser.add_argument('--slow', type=float, default=0.0, help="chance a bot is too slow on a decision")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.load_test:
+        results = asyncio.run(load_test(args.tables, args.players, args.hands, args.timeout, args.slow, args.seed))
+        for name, value in results.items():
+            print(f"{name:<16}{value:>14,.2f}" if isinstance(value, float) else f"{name:<16}{value:>14,}")
+    else:
+        bots = [BotClient(f"Bot {i + 1}", seed=args.seed * 100_003 + i, slow=args.slow) for i in range(args.bots)]
+        asyncio.run(run_bots(args.host, args.port, bots, args.timeout))
+        for bot in bots:
+            print(f"{bot.name}: {bot.actions} actions, {bot.timeouts} timeouts, final stacks {bot.stacks}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Equity calculator.
+
+monte_carlo_equity() gives each player's chance to win, tie or lose from any
+point in a hand: known hole cards for 2-10 players, a partial board (0, 3 or
+4 community cards) and any dead cards. It deals out the rest of the board
+many times from the cards left in the deck and scores every runout with
+handeval.evaluate_mask().
+
+Trials run in batches. Every batch gets its own random.Random seeded from the
+one seed you pass in, so the same seed and worker count always give the same
+answer. Batches are spread over a process pool and the run stops as soon as
+every player's 95% confidence interval is narrower than ci_width.
+
+exact_equity() gives the exact numbers instead, by going through every
+possible runout. It does not score each 7-card hand from scratch: every
+player's rank key (see handeval.py) for hole cards + board is built once and
+then extended one card at a time as the turn and river are added, so a
+runout only costs a table lookup per player.
+"""
+import os
+import random
+from math import sqrt
+from typing import List, Optional, Sequence
+from concurrent.futures import ProcessPoolExecutor
+
+from cards import AnyCard, FULL_DECK_MASK, SUIT_MASK, cards_to_mask, mask_to_cards
+from handeval import RANK_KEYS, RANK_TABLE, FLUSH_TABLE, MASK_RANK_KEY, evaluate_mask
+
+
+Z_95 = 1.96
+FIRST_BATCH = 1000
+
+
+class EquityResult:
+    """
+    Totals for every player over all trials (or all runouts, for exact counts).
+
+    wins[i]   - runouts player i won alone
+    ties[i]   - runouts player i split with someone
+    losses[i] - runouts player i lost
+    shares[i] - pots won, counting a split between k players as 1/k
+    """
+    def __init__(self, num_players: int):
+        self.trials = 0
+        self.wins = [0] * num_players
+        self.ties = [0] * num_players
+        self.losses = [0] * num_players
+        self.shares = [0.0] * num_players
+
+    def add(self, other: 'EquityResult'):
+        self.trials += other.trials
+        for i in range(len(self.wins)):
+            self.wins[i] += other.wins[i]
+            self.ties[i] += other.ties[i]
+            self.losses[i] += other.losses[i]
+            self.shares[i] += other.shares[i]
+
+    @property
+    def win(self) -> List[float]:
+        return [w / self.trials for w in self.wins]
+
+    @property
+    def tie(self) -> List[float]:
+        return [t / self.trials for t in self.ties]
+
+    @property
+    def loss(self) -> List[float]:
+        return [l / self.trials for l in self.losses]
+
+    @property
+    def equity(self) -> List[float]:
+        return [s / self.trials for s in self.shares]
+
+    def ci_width(self) -> float:
+        # Widest 95% confidence interval over all players' equity
+        if self.trials == 0:
+            return 1.0
+        widest = 0.0
+        for p in self.equity:
+            widest = max(widest, 2 * Z_95 * sqrt(p * (1 - p) / self.trials))
+        return widest
+
+
+def _known_cards(hands: Sequence[Sequence[AnyCard]], board: Sequence[AnyCard], dead: Sequence[AnyCard]):
+    """
+    Check the inputs and turn everything into masks.
+    Returns (hand_masks, board_mask, remaining_cards).
+    """
+    if not 2 <= len(hands) <= 10:
+        raise ValueError("equity needs between 2 and 10 players")
+    if len(board) not in (0, 3, 4, 5):
+        raise ValueError("the board must have 0, 3, 4 or 5 cards")
+
+    known = list(board) + list(dead)
+    hand_masks = []
+    for hand in hands:
+        if len(hand) != 2:
+            raise ValueError("every player needs exactly 2 hole cards")
+        hand_masks.append(cards_to_mask(hand))
+        known += list(hand)
+
+    used_mask = cards_to_mask(known)
+    if bin(used_mask).count('1') != len(known):
+        raise ValueError("the same card was given more than once")
+
+    # Same ints the Deck deals, so any Deck-style list of cards can be sampled
+    remaining = mask_to_cards(FULL_DECK_MASK & ~used_mask)
+    return hand_masks, cards_to_mask(board), remaining
+
+
+def _tally(strengths: List[int], result: EquityResult):
+    # Add one finished runout (every player's strength) to result
+    best = max(strengths)
+    winners = [i for i, strength in enumerate(strengths) if strength == best]
+    result.trials += 1
+    if len(winners) == 1:
+        result.wins[winners[0]] += 1
+        result.shares[winners[0]] += 1.0
+    else:
+        share = 1.0 / len(winners)
+        for i in winners:
+            result.ties[i] += 1
+            result.shares[i] += share
+    for i, strength in enumerate(strengths):
+        if strength != best:
+            result.losses[i] += 1
+
+
+def _score_runout(hand_masks: List[int], board_mask: int, result: EquityResult):
+    # Score one complete board for every player and add it to result
+    _tally([evaluate_mask(hand_mask | board_mask) for hand_mask in hand_masks], result)
+
+
+def _run_trials(hand_masks: List[int], board_mask: int, remaining: List[int],
+                trials: int, seed: int) -> EquityResult:
+    """
+    One batch of Monte Carlo trials. Runs inside a worker process, so it only
+    takes plain values and uses its own seeded random.Random.
+    """
+    rng = random.Random(seed)
+    needed = 5 - bin(board_mask).count('1')
+    result = EquityResult(len(hand_masks))
+    for _ in range(trials):
+        runout_mask = board_mask
+        for card in rng.sample(remaining, needed):
+            runout_mask |= 1 << card
+        _score_runout(hand_masks, runout_mask, result)
+    return result
+
+
+def monte_carlo_equity(hands: Sequence[Sequence[AnyCard]], board: Sequence[AnyCard] = (),
+                       dead: Sequence[AnyCard] = (), max_trials: int = 1_000_000,
+                       ci_width: Optional[float] = 0.01, workers: Optional[int] = None,
+                       batch_size: int = 5000, seed: Optional[int] = None) -> EquityResult:
+    """
+    Estimate win/tie/loss chances by dealing random runouts.
+
+    hands      - hole cards for each player, int cards or (rank, suit) tuples
+    board      - community cards dealt so far (0, 3, 4 or 5)
+    dead       - cards known to be out of the deck (e.g. folded or burned cards)
+    max_trials - hard cap on the number of runouts
+    ci_width   - stop once every player's 95% confidence interval is this narrow
+                 (None to always run max_trials)
+    workers    - processes to use (None = all cores, 1 = no process pool)
+    seed       - same seed + same workers => same answer
+    """
+    hand_masks, board_mask, remaining = _known_cards(hands, board, dead)
+    master_rng = random.Random(seed)
+    result = EquityResult(len(hands))
+
+    def done() -> bool:
+        if result.trials >= max_trials:
+            return True
+        return ci_width is not None and result.ci_width() <= ci_width
+
+    # The first batch always runs here, so cheap queries never pay for starting a pool
+    first = min(FIRST_BATCH, batch_size, max_trials)
+    result.add(_run_trials(hand_masks, board_mask, remaining, first, master_rng.getrandbits(64)))
+    if done():
+        return result
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1:
+        while not done():
+            trials = min(batch_size, max_trials - result.trials)
+            result.add(_run_trials(hand_masks, board_mask, remaining, trials, master_rng.getrandbits(64)))
+        return result
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while not done():
+            # One batch per worker per round, added in the order they were submitted
+            futures = []
+            planned = result.trials
+            for _ in range(workers):
+                trials = min(batch_size, max_trials - planned)
+                if trials <= 0:
+                    break
+                planned += trials
+                futures.append(pool.submit(_run_trials, hand_masks, board_mask, remaining,
+                                           trials, master_rng.getrandbits(64)))
+            for future in futures:
+                result.add(future.result())
+    return result
+
+
+def _enumerate_runouts(remaining: List[int], start: int, needed: int, player_keys: List[int],
+                       board_suits: List[int], hole_suits: List[List[int]], result: EquityResult):
+    """
+    Go through every way to add 'needed' more cards from remaining[start:].
+
+    player_keys[i] - rank key of player i's hole cards + the board so far
+    board_suits[s] - 13-bit ranks the board holds in suit s
+    hole_suits[i]  - 13-bit ranks player i holds in each suit
+    """
+    if needed == 0:
+        # Board already complete (river was given)
+        strengths = [RANK_TABLE[key] for key in player_keys]
+        _add_flushes(strengths, board_suits, hole_suits)
+        _tally(strengths, result)
+        return
+
+    for j in range(start, len(remaining) - needed + 1):
+        card = remaining[j]
+        rank = card % 13
+        suit = card // 13
+        rank_key = RANK_KEYS[rank]
+        next_suits = list(board_suits)
+        next_suits[suit] |= 1 << rank
+
+        if needed > 1:
+            # Turn (or earlier): extend every player's state by this card and go deeper
+            _enumerate_runouts(remaining, j + 1, needed - 1, [key + rank_key for key in player_keys],
+                               next_suits, hole_suits, result)
+            continue
+
+        # River: the last card finishes every hand, so just look it up
+        strengths = [RANK_TABLE[key + rank_key] for key in player_keys]
+        if max(suit_mask.bit_count() for suit_mask in next_suits) >= 3:
+            _add_flushes(strengths, next_suits, hole_suits)
+        _tally(strengths, result)
+
+
+def _add_flushes(strengths: List[int], board_suits: List[int], hole_suits: List[List[int]]):
+    # A flush needs at least 3 board cards of one suit (players only have 2 hole cards)
+    for suit, suit_mask in enumerate(board_suits):
+        if suit_mask.bit_count() < 3:
+            continue
+        for i in range(len(strengths)):
+            flush = FLUSH_TABLE[suit_mask | hole_suits[i][suit]]
+            if flush > strengths[i]:
+                strengths[i] = flush
+
+
+def exact_equity(hands: Sequence[Sequence[AnyCard]], board: Sequence[AnyCard] = (),
+                 dead: Sequence[AnyCard] = ()) -> EquityResult:
+    """
+    Exact win/tie/loss chances, going through every remaining runout.
+
+    Same arguments as monte_carlo_equity(). result.trials is the number of
+    runouts (990 heads-up on the flop, 44 on the turn). From the flop or turn
+    this is fast; preflop (about 1.7 million runouts heads-up) takes a while.
+    """
+    hand_masks, board_mask, remaining = _known_cards(hands, board, dead)
+    result = EquityResult(len(hands))
+
+    # Flop (or turn) state for every player, built once and then extended card by card
+    player_keys = []
+    hole_suits = []
+    for hand_mask in hand_masks:
+        both = hand_mask | board_mask
+        player_keys.append(sum(MASK_RANK_KEY[(both >> (13 * suit)) & SUIT_MASK] for suit in range(4)))
+        hole_suits.append([(hand_mask >> (13 * suit)) & SUIT_MASK for suit in range(4)])
+    board_suits = [(board_mask >> (13 * suit)) & SUIT_MASK for suit in range(4)]
+
+    _enumerate_runouts(remaining, 0, 5 - len(board), player_keys, board_suits, hole_suits, result)
+    return result
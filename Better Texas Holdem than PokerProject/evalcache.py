@@ -0,0 +1,105 @@
+"""
+Bounded LRU cache for hand evaluators, keyed on a suit-canonical form.
+
+Swapping suits around never changes what a hand is worth, and unless five or
+more cards share a suit, suits don't matter at all. So a hand can be reduced
+to one int key:
+
+    - the rank key (the sum of RANK_KEYS from handeval.py), which says
+      exactly how many cards of each rank the hand has
+    - plus, only if some suit holds 5 or more cards, that suit's 13-bit
+      rank mask (only one suit can, with 7 cards or fewer)
+
+Every hand with the same key gets the same answer, e.g. As Kd Qh 7c 2s and
+Ah Ks Qd 7s 2c share one cache entry.
+
+    @cached_evaluator(maxsize=50_000)
+    def evaluate_5card_hand_detailed(cards): ...
+
+    evaluate_5card_hand_detailed.cache_info()
+    -> {'hits': 9120, 'misses': 880, 'evictions': 0, 'size': 880, 'maxsize': 50000}
+"""
+from collections import OrderedDict
+from functools import update_wrapper
+from typing import Callable, Dict, Iterable, Optional
+
+from cards import AnyCard
+from handeval import CARD_INFO
+
+
+def canonical_key(cards: Iterable[AnyCard]) -> int:
+    # Same key for every hand that only differs by a renaming of suits (see above)
+    key = 0
+    suit_masks = [0, 0, 0, 0]
+    for card in cards:
+        rank_key, suit, bit = CARD_INFO[card]
+        key += rank_key
+        suit_masks[suit] |= bit
+    for mask in suit_masks:
+        if mask.bit_count() >= 5:
+            # Rank keys of up to 7 cards stay below 2**31, so the flush ranks go above that
+            return key | (mask << 31)
+    return key
+
+
+class EvaluationCache:
+    """
+    Wraps an evaluator that takes a list of cards and returns
+    (category, tiebreakers). Results are kept for the maxsize most recently
+    used canonical keys; the least recently used one is dropped when the
+    cache is full. maxsize=None never drops anything.
+    """
+    def __init__(self, evaluate: Callable, maxsize: Optional[int] = 100_000):
+        self.evaluate = evaluate
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        update_wrapper(self, evaluate)
+
+    def __call__(self, cards):
+        key = canonical_key(cards)
+        entries = self.entries
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            category, tiebreakers = entries[key]
+        else:
+            self.misses += 1
+            category, tiebreakers = self.evaluate(cards)
+            entries[key] = (category, tiebreakers)
+            if self.maxsize is not None and len(entries) > self.maxsize:
+                entries.popitem(last=False)
+                self.evictions += 1
+        # A fresh list, so a caller changing it can't change the cached answer
+        return category, list(tiebreakers)
+
+    def resize(self, maxsize: Optional[int]):
+        # Change the size limit, dropping the oldest entries if there are too many now
+        self.maxsize = maxsize
+        while maxsize is not None and len(self.entries) > maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def cache_info(self) -> Dict[str, Optional[int]]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.entries),
+            'maxsize': self.maxsize,
+        }
+
+    def cache_clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+def cached_evaluator(maxsize: Optional[int] = 100_000) -> Callable[[Callable], EvaluationCache]:
+    # Decorator form of EvaluationCache
+    def decorate(evaluate: Callable) -> EvaluationCache:
+        return EvaluationCache(evaluate, maxsize)
+    return decorate
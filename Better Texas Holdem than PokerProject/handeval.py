@@ -0,0 +1,220 @@
+"""
+Table-driven poker hand evaluator.
+
+Instead of trying all 21 five-card subsets of a 7-card hand, a hand is scored
+with a few lookups into two tables that are built once when this module is
+imported:
+
+    RANK_TABLE  - every possible set of 5, 6 or 7 ranks (suits ignored),
+                  keyed by adding up one number per card (see RANK_KEYS)
+    FLUSH_TABLE - indexed by the 13-bit mask of ranks held in one suit
+
+The answer is a single integer "strength" where BIGGER IS BETTER, so two
+hands can be compared with < and >, and the best of many is just max().
+strength_to_detailed() turns a strength back into the (category, tiebreakers)
+tuple that evaluate_5card_hand_detailed returns.
+
+Cards can be the int cards from cards.py or the old (rank, suit) tuples.
+evaluate_mask() scores a 64-bit card mask directly (see cards.py).
+"""
+from typing import Dict, Iterable, List, Tuple
+from itertools import combinations_with_replacement
+
+from cards import SUIT_MASK, CARD_FROM, AnyCard
+
+CATEGORY_NAMES = {
+    1: "Straight Flush",
+    2: "Four of a Kind",
+    3: "Full House",
+    4: "Flush",
+    5: "Straight",
+    6: "Three of a Kind",
+    7: "Two Pair",
+    8: "One Pair",
+    9: "High Card"
+}
+
+# How many tiebreakers each category has (category 1 = straight flush ... 9 = high card)
+TIEBREAK_COUNT = {1: 1, 2: 2, 3: 2, 4: 5, 5: 1, 6: 3, 7: 3, 8: 4, 9: 5}
+
+# Every card adds 5**rank_index to the rank key. A rank can show up at most
+# 4 times, so each "digit" of the key (in base 5) is how many of that rank we hold.
+RANK_KEYS = [5 ** i for i in range(13)]
+
+# Straights as (rank mask, top card value), best first. The wheel (A-2-3-4-5) is last.
+STRAIGHTS = [(0b11111 << (high - 6), high) for high in range(14, 5, -1)]
+STRAIGHTS.append(((1 << 12) | 0b1111, 5))
+
+
+def make_strength(category: int, tiebreakers: List[int]) -> int:
+    """
+    Pack (category, tiebreakers) into one integer.
+
+    The category goes in the top bits (flipped, so a straight flush is the
+    biggest) and each tiebreaker (2..14) takes 4 bits after it, most
+    significant first.
+    """
+    strength = 10 - category
+    for value in tiebreakers:
+        strength = (strength << 4) | value
+    return strength << (4 * (5 - len(tiebreakers)))
+
+
+def strength_to_detailed(strength: int) -> Tuple[int, List[int]]:
+    """
+    Undo make_strength(). Returns the same (category, tiebreakers) tuple
+    that evaluate_5card_hand_detailed / evaluate_7card_hand_detailed give.
+    """
+    category = 10 - (strength >> 20)
+    count = TIEBREAK_COUNT[category]
+    tiebreakers = [(strength >> (16 - 4 * i)) & 0xF for i in range(count)]
+    return (category, tiebreakers)
+
+
+def straight_high(mask: int) -> int:
+    # Top card of the best straight inside a 13-bit rank mask, or 0 if there is none
+    for straight_mask, high in STRAIGHTS:
+        if mask & straight_mask == straight_mask:
+            return high
+    return 0
+
+
+def _score_rank_counts(counts: List[int]) -> int:
+    """
+    Best hand that can be made from these rank counts when there is no flush.
+    counts[i] is how many cards of rank index i (0 = 2 ... 12 = A) we hold (5 to 7 cards total).
+    """
+    # Ranks by value, highest first, for each group size
+    values = []
+    quads = []
+    trips = []
+    pairs = []
+    mask = 0
+    for i in range(12, -1, -1):
+        count = counts[i]
+        if count:
+            values.append(i + 2)
+            mask |= 1 << i
+            if count == 2:
+                pairs.append(i + 2)
+            elif count == 3:
+                trips.append(i + 2)
+            elif count == 4:
+                quads.append(i + 2)
+
+    # 2) Four of a Kind
+    if quads:
+        kicker = [v for v in values if v != quads[0]][0]
+        return make_strength(2, [quads[0], kicker])
+
+    # 3) Full House (a second set of trips can be used as the pair)
+    if trips and (len(trips) > 1 or pairs):
+        pair = max(trips[1:] + pairs)
+        return make_strength(3, [trips[0], pair])
+
+    # 5) Straight
+    high = straight_high(mask)
+    if high:
+        return make_strength(5, [high])
+
+    # 6) Three of a Kind
+    if trips:
+        kickers = [v for v in values if v != trips[0]][:2]
+        return make_strength(6, [trips[0]] + kickers)
+
+    # 7) Two Pair (with 3 pairs, the third one can be the kicker)
+    if len(pairs) >= 2:
+        kicker = [v for v in values if v not in pairs[:2]][0]
+        return make_strength(7, [pairs[0], pairs[1], kicker])
+
+    # 8) One Pair
+    if pairs:
+        kickers = [v for v in values if v != pairs[0]][:3]
+        return make_strength(8, [pairs[0]] + kickers)
+
+    # 9) High Card
+    return make_strength(9, values[:5])
+
+
+def _build_rank_table() -> Dict[int, int]:
+    table = {}
+    for num_cards in (5, 6, 7):
+        for rank_indexes in combinations_with_replacement(range(13), num_cards):
+            counts = [0] * 13
+            key = 0
+            for i in rank_indexes:
+                counts[i] += 1
+                key += RANK_KEYS[i]
+            if max(counts) > 4:
+                continue  # there are only 4 of each rank
+            table[key] = _score_rank_counts(counts)
+    return table
+
+
+def _build_flush_table() -> List[int]:
+    # 0 means "not a flush" (fewer than 5 cards of the suit), which loses to any real hand
+    table = [0] * (1 << 13)
+    for mask in range(1 << 13):
+        if bin(mask).count('1') < 5:
+            continue
+        high = straight_high(mask)
+        if high:
+            table[mask] = make_strength(1, [high])
+        else:
+            top_five = [i + 2 for i in range(12, -1, -1) if mask & (1 << i)][:5]
+            table[mask] = make_strength(4, top_five)
+    return table
+
+
+RANK_TABLE = _build_rank_table()
+FLUSH_TABLE = _build_flush_table()
+
+# (rank key, suit index, rank bit) for every card, keyed by int card and by tuple
+CARD_INFO = {
+    key: (RANK_KEYS[card % 13], card // 13, 1 << (card % 13))
+    for key, card in CARD_FROM.items()
+}
+
+# Rank key of all the cards in one suit's 13-bit mask, used by evaluate_mask()
+MASK_RANK_KEY = [0] * (1 << 13)
+for _mask in range(1, 1 << 13):
+    _low_bit = _mask & -_mask
+    MASK_RANK_KEY[_mask] = MASK_RANK_KEY[_mask ^ _low_bit] + RANK_KEYS[_low_bit.bit_length() - 1]
+
+
+def evaluate_strength(cards: Iterable[AnyCard]) -> int:
+    """
+    Score 5, 6 or 7 cards and return one comparable integer (bigger is better).
+    """
+    key = 0
+    suit_masks = [0, 0, 0, 0]
+    for card in cards:
+        rank_key, suit, bit = CARD_INFO[card]
+        key += rank_key
+        suit_masks[suit] |= bit
+    # Quads and full houses beat a flush, so take the best of both paths
+    return max(RANK_TABLE[key],
+               FLUSH_TABLE[suit_masks[0]], FLUSH_TABLE[suit_masks[1]],
+               FLUSH_TABLE[suit_masks[2]], FLUSH_TABLE[suit_masks[3]])
+
+
+def evaluate_mask(mask: int) -> int:
+    """
+    Score a 64-bit card mask holding 5, 6 or 7 cards, e.g. player.hand_mask | deck.community_mask.
+    """
+    spades = mask & SUIT_MASK
+    clubs = (mask >> 13) & SUIT_MASK
+    hearts = (mask >> 26) & SUIT_MASK
+    diamonds = (mask >> 39) & SUIT_MASK
+    key = MASK_RANK_KEY[spades] + MASK_RANK_KEY[clubs] + MASK_RANK_KEY[hearts] + MASK_RANK_KEY[diamonds]
+    return max(RANK_TABLE[key],
+               FLUSH_TABLE[spades], FLUSH_TABLE[clubs],
+               FLUSH_TABLE[hearts], FLUSH_TABLE[diamonds])
+
+
+def evaluate_detailed(cards: Iterable[AnyCard]) -> Tuple[int, List[int]]:
+    """
+    Same as evaluate_strength() but returns the old (category, tiebreakers) tuple,
+    so it can be dropped in wherever evaluate_7card_hand_detailed was used.
+    """
+    return strength_to_detailed(evaluate_strength(cards))
@@ -0,0 +1,333 @@
+"""
+Binary hand history.
+
+HandHistoryWriter is a listener: give it to Game (or add it to a
+MultiListener) and every hand play_one_round plays is appended to a file.
+HandHistoryReader memory-maps that file and hands back one hand at a time,
+so a history of many gigabytes can be scanned without loading it.
+
+File layout (little endian). The file starts with MAGIC and is then a list
+of records, each starting with a one byte record type:
+
+    PLAYER  B I B + name    type, player id, name length, utf-8 name
+                            (written the first time a name shows up)
+    HAND    B Q B 5s B H    type, hand id, seats, board (5 card bytes, 255 =
+                            not dealt), went to showdown, number of actions
+      then one SEAT per seat:
+            I B B q q       player id, hole card 1, hole card 2,
+                            stack at the start of the hand, net result
+      then one ACTION per action:
+            B B B q         street, seat, kind, amount
+    INDEX   B Q I I + names type, next hand id, number of names, size of the
+                            names (each B length + utf-8, in player id order)
+      then INDEX_TAIL:
+            Q 4s            byte offset of the INDEX record, INDEX_MARK
+
+Cards are the int cards from cards.py and every amount is in cents. Seat 0
+is the small blind and the last seat is the button (Game's seat order).
+An action's amount is the player's total bet on that street after acting.
+
+A writer leaves an INDEX record when it is closed, so the next writer can
+carry on from the last 8 + 4 bytes instead of going through every hand.
+Readers skip INDEX records; a file whose last writer was stopped simply
+doesn't end with one.
+"""
+import os
+import mmap
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from providers import GameListener
+
+
+MAGIC = b'PKHH\x01'
+
+PLAYER_RECORD = 1
+HAND_RECORD = 2
+INDEX_RECORD = 3
+
+PLAYER = struct.Struct('<BIB')
+HAND = struct.Struct('<BQB5sBH')
+SEAT = struct.Struct('<IBBqq')
+ACTION = struct.Struct('<BBBq')
+INDEX = struct.Struct('<BQII')
+INDEX_TAIL = struct.Struct('<Q4s')
+INDEX_MARK = b'PKIX'
+
+NO_CARD = 255
+NO_CARDS = bytes([NO_CARD] * 5)
+
+# Streets
+PREFLOP, FLOP, TURN, RIVER = 0, 1, 2, 3
+STREET_NAMES = ['preflop', 'flop', 'turn', 'river']
+
+# Action kinds
+BLIND, CHECK, FOLD, CALL, BET, RAISE, ALL_IN = 0, 1, 2, 3, 4, 5, 6
+ACTION_NAMES = ['blind', 'check', 'fold', 'call', 'bet', 'raise', 'all in']
+
+
+class SeatRecord:
+    def __init__(self, player_id: int, name: str, cards: List[int], start_stack: int, net: int):
+        self.player_id = player_id
+        self.name = name
+        self.cards = cards
+        self.start_stack = start_stack
+        self.net = net
+
+
+class HandRecord:
+    def __init__(self, hand_id: int, board: List[int], showdown: bool,
+                 seats: List[SeatRecord], actions: List[tuple]):
+        self.hand_id = hand_id
+        self.board = board
+        self.showdown = showdown
+        self.seats = seats
+        self.actions = actions  # (street, seat, kind, amount)
+
+    def winners(self) -> List[int]:
+        # Seats that came out ahead
+        return [i for i, seat in enumerate(self.seats) if seat.net > 0]
+
+
+# -----------------------------------------
+# Writing
+# -----------------------------------------
+
+class HandHistoryWriter(GameListener):
+    """
+    Appends every hand to 'path' when Game sends 'hand_end'.
+
+    Game keeps the hand's actions in one flat list (Game.actions) and hands
+    it over with 'hand_end', so the writer needs no per-action events
+    (wants_actions = False) and writing a hand costs two struct.pack calls
+    into a large file buffer. Call close() (or use 'with') when done so
+    everything reaches the disk.
+    """
+    wants_actions = False
+
+    def __init__(self, path: str, buffer_size: int = 1 << 20):
+        self.player_ids = {}
+        self.next_hand_id = 0
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size > 0:
+            # Carry on with the same player ids and hand numbers
+            with HandHistoryReader(path) as reader:
+                index = reader.read_index()
+                if index is not None:
+                    _, self.next_hand_id, names = index
+                    complete = size
+                else:
+                    # The last writer was stopped: step over the record headers (only
+                    # the names are read) to the last complete record
+                    last_hand = None
+                    for offset, record_type in reader.records():
+                        if record_type == HAND_RECORD:
+                            last_hand = offset
+                    if last_hand is not None:
+                        self.next_hand_id = HAND.unpack_from(reader.mm, last_hand)[1] + 1
+                    names = reader.names
+                    complete = reader.position
+            self.player_ids = {name: player_id for player_id, name in names.items()}
+            # Cut off a record that was only partly written when the last writer stopped,
+            # so the new records follow the last complete one
+            if complete < size:
+                os.truncate(path, complete)
+            self.file = open(path, 'ab', buffering=buffer_size)
+        else:
+            self.file = open(path, 'wb', buffering=buffer_size)
+            self.file.write(MAGIC)
+        self.hand_formats = {}  # number of seats -> Struct for the HAND header and every SEAT
+        self.action_formats = {}  # number of actions -> Struct for all of them
+
+    def on_event(self, event: str, data: Dict):
+        if event == 'hand_end':
+            self.write_hand(data['players'], data['cards'], data['showdown'], data['actions'])
+
+    def _player_id(self, name: str) -> int:
+        if name not in self.player_ids:
+            player_id = len(self.player_ids)
+            self.player_ids[name] = player_id
+            encoded = name.encode('utf-8')[:255]
+            self.file.write(PLAYER.pack(PLAYER_RECORD, player_id, len(encoded)) + encoded)
+        return self.player_ids[name]
+
+    def _hand_struct(self, num_seats: int) -> struct.Struct:
+        # The hand header and its seats are packed with a single call
+        if num_seats not in self.hand_formats:
+            self.hand_formats[num_seats] = struct.Struct(HAND.format + SEAT.format[1:] * num_seats)
+        return self.hand_formats[num_seats]
+
+    def _actions_struct(self, num_actions: int) -> struct.Struct:
+        # Every action of a hand is packed with a single call
+        if num_actions not in self.action_formats:
+            self.action_formats[num_actions] = struct.Struct('<' + ACTION.format[1:] * num_actions)
+        return self.action_formats[num_actions]
+
+    def write_hand(self, players: List, board: List[int], showdown: bool, actions: List[int]):
+        # actions is flat like Game.actions: street, seat, kind, amount, street, ...
+        num_actions = len(actions) // 4
+        player_ids = self.player_ids
+        values = [HAND_RECORD, self.next_hand_id, len(players),
+                  bytes(board) + NO_CARDS[len(board):], showdown, num_actions]
+        try:
+            # Every name seen before and every seat dealt: plain lookups only
+            for player in players:
+                hand = player.hand
+                start = player.beginning_money
+                values += (player_ids[player.name], hand[0], hand[1], start, player.money - start)
+        except (KeyError, IndexError):
+            # A new name (its PLAYER record goes first) or a seat without cards
+            del values[6:]
+            for player in players:
+                hand = player.hand
+                values += (self._player_id(player.name),
+                           hand[0] if hand else NO_CARD, hand[1] if len(hand) > 1 else NO_CARD,
+                           player.beginning_money, player.money - player.beginning_money)
+        self.file.write(self._hand_struct(len(players)).pack(*values)
+                        + self._actions_struct(num_actions).pack(*actions))
+        self.next_hand_id += 1
+
+    def write_index(self):
+        # The INDEX record and its tail, for the next writer on this file
+        names = sorted(self.player_ids, key=self.player_ids.get)
+        blob = b''.join(bytes([len(encoded)]) + encoded
+                        for encoded in (name.encode('utf-8')[:255] for name in names))
+        offset = self.file.tell()
+        self.file.write(INDEX.pack(INDEX_RECORD, self.next_hand_id, len(names), len(blob))
+                        + blob + INDEX_TAIL.pack(offset, INDEX_MARK))
+
+    def close(self):
+        if not self.file.closed:
+            self.write_index()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# -----------------------------------------
+# Reading
+# -----------------------------------------
+
+class HandHistoryReader:
+    """
+    Streams hands out of a history file through mmap.
+
+        with HandHistoryReader('hands.bin') as reader:
+            for hand in reader:
+                ...
+
+    Only the hand being looked at is turned into Python objects. Player
+    names are collected as PLAYER records go by (reader.names).
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.names = {}
+        self.position = len(MAGIC)  # just past the last complete record records() went over
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a hand history file")
+
+    def records(self, start: int = len(MAGIC)) -> Iterator[tuple]:
+        """
+        Yield (offset, record type) for every PLAYER and HAND record from byte
+        offset 'start' on, reading player names on the way (INDEX records are
+        stepped over). Used by __iter__ and by code that
+        wants to decode hands itself (see stats.py). Afterwards self.position
+        is where the next records() call should start to only see newer records.
+        """
+        mm = self.mm
+        offset = start
+        end = len(mm)
+        self.position = start
+        while offset < end:
+            record_type = mm[offset]
+            if record_type == PLAYER_RECORD:
+                if offset + PLAYER.size > end:
+                    return  # only partly written, like a partial hand below
+                _, player_id, name_length = PLAYER.unpack_from(mm, offset)
+                name_start = offset + PLAYER.size
+                if name_start + name_length > end:
+                    return
+                self.names[player_id] = mm[name_start:name_start + name_length].decode('utf-8')
+                yield offset, record_type
+                offset = name_start + name_length
+                self.position = offset
+            elif record_type == HAND_RECORD:
+                if offset + HAND.size > end:
+                    return
+                _, _, num_seats, _, _, num_actions = HAND.unpack_from(mm, offset)
+                size = HAND.size + num_seats * SEAT.size + num_actions * ACTION.size
+                if offset + size > end:
+                    return  # a hand that was only partly written when the writer stopped
+                yield offset, record_type
+                offset += size
+                self.position = offset
+            elif record_type == INDEX_RECORD:
+                if offset + INDEX.size > end:
+                    return
+                names_size = INDEX.unpack_from(mm, offset)[3]
+                size = INDEX.size + names_size + INDEX_TAIL.size
+                if offset + size > end:
+                    return
+                offset += size  # only there for the next writer
+                self.position = offset
+            else:
+                raise ValueError(f"unknown record type {record_type} at byte {offset} of {self.path}")
+
+    def read_index(self) -> Optional[Tuple[int, int, Dict[int, str]]]:
+        """
+        (offset, next hand id, player id -> name) from the INDEX record at the
+        end of the file, or None if the file doesn't end with a complete one
+        (its last writer was stopped before close()).
+        """
+        mm = self.mm
+        end = len(mm)
+        if end < len(MAGIC) + INDEX.size + INDEX_TAIL.size:
+            return None
+        offset, mark = INDEX_TAIL.unpack_from(mm, end - INDEX_TAIL.size)
+        if mark != INDEX_MARK or not len(MAGIC) <= offset <= end - INDEX.size - INDEX_TAIL.size:
+            return None
+        record_type, next_hand_id, num_names, names_size = INDEX.unpack_from(mm, offset)
+        if record_type != INDEX_RECORD or offset + INDEX.size + names_size + INDEX_TAIL.size != end:
+            return None
+        names = {}
+        position = offset + INDEX.size
+        for player_id in range(num_names):
+            length = mm[position]
+            names[player_id] = mm[position + 1:position + 1 + length].decode('utf-8')
+            position += 1 + length
+        return offset, next_hand_id, names
+
+    def read_hand(self, offset: int) -> HandRecord:
+        mm = self.mm
+        _, hand_id, num_seats, board_bytes, showdown, num_actions = HAND.unpack_from(mm, offset)
+        offset += HAND.size
+        seats = []
+        for _ in range(num_seats):
+            player_id, card1, card2, start_stack, net = SEAT.unpack_from(mm, offset)
+            cards = [card for card in (card1, card2) if card != NO_CARD]
+            seats.append(SeatRecord(player_id, self.names.get(player_id, ''), cards, start_stack, net))
+            offset += SEAT.size
+        actions = [ACTION.unpack_from(mm, offset + i * ACTION.size) for i in range(num_actions)]
+        board = [card for card in board_bytes if card != NO_CARD]
+        return HandRecord(hand_id, board, bool(showdown), seats, actions)
+
+    def __iter__(self) -> Iterator[HandRecord]:
+        for offset, record_type in self.records():
+            if record_type == HAND_RECORD:
+                yield self.read_hand(offset)
+
+    def close(self):
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
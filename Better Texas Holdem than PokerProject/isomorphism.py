@@ -0,0 +1,132 @@
+"""
+Suit isomorphism: treating situations that only differ by suits as one.
+
+Suits have no order in poker, so As Kd on Qs 7s 2h plays exactly like
+Ah Kc on Qh 7h 2d. canonical_form() picks one representative for every such
+group by renaming the suits, so anything worked out for the representative
+holds for the whole group:
+
+    canonical_form(hole, board) -> (hole, board) with suits renamed
+
+CanonicalIndex numbers every representative for one shape of situation
+(how many hole cards, how many board cards) so results can be stored in
+arrays indexed by class id:
+
+    flops = CanonicalIndex(0, 3)
+    len(flops)                      -> 1755   (out of 22100 flops)
+    flops.index([], board)          -> class id of any flop
+    flops.situation(class_id)       -> (hole, board) of that class
+    flops.weights[class_id]         -> how many real situations it stands for
+
+Cards can be int cards or (rank, suit) tuples; results are int cards (cards.py).
+
+How suits get renamed: every suit gets a signature, the ranks it holds in the
+hole cards and then the ranks it holds on the board (as 13-bit masks). Suits
+are sorted by signature, biggest first, and renamed S, C, H, D in that order.
+Two suits with the same signature hold the same ranks everywhere, so it
+doesn't matter which one comes first.
+"""
+from math import comb, factorial
+from typing import Dict, Iterable, List, Tuple
+
+from cards import AnyCard, to_card
+
+
+Situation = Tuple[Tuple[int, ...], Tuple[int, ...]]
+
+
+def _suit_signatures(hole: List[int], board: List[int]) -> List[Tuple[int, int]]:
+    hole_masks = [0, 0, 0, 0]
+    board_masks = [0, 0, 0, 0]
+    for card in hole:
+        hole_masks[card // 13] |= 1 << (card % 13)
+    for card in board:
+        board_masks[card // 13] |= 1 << (card % 13)
+    return list(zip(hole_masks, board_masks))
+
+
+def suit_renaming(hole: List[int], board: List[int]) -> List[int]:
+    """
+    new_suit[old suit] for canonical_form(hole, board). With no hole cards it
+    renames a board; the same renaming can then be used on any hole cards
+    to find them on the canonical board.
+    """
+    signatures = _suit_signatures(hole, board)
+    order = sorted(range(4), key=signatures.__getitem__, reverse=True)
+    new_suit = [0] * 4
+    for new, old in enumerate(order):
+        new_suit[old] = new
+    return new_suit
+
+
+def canonical_form(hole: Iterable[AnyCard], board: Iterable[AnyCard] = ()) -> Situation:
+    """
+    The representative of every (hole, board) that is the same up to suits.
+    Both parts come back as sorted tuples of int cards.
+    """
+    hole = [to_card(card) for card in hole]
+    board = [to_card(card) for card in board]
+    new_suit = suit_renaming(hole, board)
+    return (tuple(sorted(new_suit[card // 13] * 13 + card % 13 for card in hole)),
+            tuple(sorted(new_suit[card // 13] * 13 + card % 13 for card in board)))
+
+
+def class_weight(hole: Iterable[AnyCard], board: Iterable[AnyCard] = ()) -> int:
+    """
+    How many different (hole, board) situations share this one's class:
+    24 suit renamings, less the ones that give back the same situation
+    (swapping suits with identical signatures changes nothing).
+    """
+    signatures = _suit_signatures([to_card(card) for card in hole], [to_card(card) for card in board])
+    same = 1
+    for signature in set(signatures):
+        same *= factorial(signatures.count(signature))
+    return 24 // same
+
+
+class CanonicalIndex:
+    """
+    Dense ids 0..n-1 for every canonical (hole, board) with the given numbers
+    of cards, plus the way back from id to situation.
+
+    The classes are found by adding one card at a time: every class with
+    one more card is some smaller class plus one card, so only (classes so
+    far) x (cards left) situations are ever canonicalized instead of every
+    raw situation. Flops (0, 3) take a moment; hole cards plus a flop (2, 3)
+    have about 1.3 million classes and take a while to build.
+    """
+    def __init__(self, hole_cards: int, board_cards: int):
+        self.hole_cards = hole_cards
+        self.board_cards = board_cards
+
+        # 1) Grow the hole cards, then the board, one card at a time
+        classes = {((), ())}
+        for _ in range(hole_cards):
+            classes = {canonical_form(hole + (card,), board)
+                       for hole, board in classes for card in range(52) if card not in hole}
+        for _ in range(board_cards):
+            classes = {canonical_form(hole, board + (card,))
+                       for hole, board in classes for card in range(52)
+                       if card not in hole and card not in board}
+
+        # 2) Sorted, so the same shape always gets the same ids
+        self.classes: List[Situation] = sorted(classes)
+        self.ids: Dict[Situation, int] = {situation: i for i, situation in enumerate(self.classes)}
+        self.weights: List[int] = [class_weight(hole, board) for hole, board in self.classes]
+
+    def __len__(self) -> int:
+        return len(self.classes)
+
+    def raw_count(self) -> int:
+        # Number of situations before suits are taken out (sum of the weights)
+        return comb(52, self.hole_cards) * comb(52 - self.hole_cards, self.board_cards)
+
+    def index(self, hole: Iterable[AnyCard], board: Iterable[AnyCard] = ()) -> int:
+        situation = canonical_form(hole, board)
+        if len(situation[0]) != self.hole_cards or len(situation[1]) != self.board_cards:
+            raise ValueError(f"expected {self.hole_cards} hole cards and {self.board_cards} board cards")
+        return self.ids[situation]
+
+    def situation(self, class_id: int) -> Situation:
+        # The representative (hole, board) of a class id
+        return self.classes[class_id]
@@ -0,0 +1,246 @@
+"""
+Outs and draws after the flop or the turn.
+
+    index = BoardIndex(board)                    # once per board (3 or 4 cards)
+    results = index.outs(hands)                  # every player at once
+    results[0].outs                              -> cards that leave player 0 alone on top
+    results[0].improves_to(5)                    -> cards that make player 0 a straight
+    results[0].flush_cards, results[0].straight_cards   -> live draws
+
+    analyze_outs(hands, board, dead=())          # the same without keeping the index
+    game_outs(game)                              # (player, Outs) for everyone still in a Game's hand
+
+Categories are the ones in handeval.CATEGORY_NAMES (1 = straight flush ... 9 = high card).
+
+BoardIndex works out what only depends on the board: every player's rank
+key and suit masks start from the board's, and for each possible pair of
+hole card ranks it keeps the ranks that would complete a straight the
+board can't make alone. Flushes need no table: a card can only complete a
+flush in a suit where the player already holds 4 (board and hole cards
+together), so for every player only the suits with 4 or more are looked at.
+
+That means no card is scored through the full evaluator. Without a flush,
+a player's hand after the next card only depends on the card's rank, so it
+is one RANK_TABLE lookup (rank key plus the card) for each of the 13 ranks.
+Only cards of a suit where the player holds 4 or more get one FLUSH_TABLE
+lookup on top. Any flush the player already has can't get worse and is
+worked out once.
+
+'Unseen' means not on the board, not in any of the hands and not dead, so
+passing every player's cards gives the outs as someone who sees all hands
+(a review tool) would count them.
+"""
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from cards import AnyCard, FULL_DECK_MASK, SUIT_MASK, cards_to_mask, mask_to_cards
+from handeval import RANK_KEYS, RANK_TABLE, FLUSH_TABLE, MASK_RANK_KEY, straight_high
+
+
+# All four cards of each rank as a mask
+RANK_CARDS = [sum(1 << (suit * 13 + rank) for suit in range(4)) for rank in range(13)]
+
+# handeval.straight_high() of every 13-bit rank mask
+STRAIGHT_HIGH = [straight_high(mask) for mask in range(1 << 13)]
+
+
+def category_of(strength: int) -> int:
+    # Category (1 = straight flush ... 9 = high card) of a handeval strength
+    return 10 - (strength >> 20)
+
+
+class Outs:
+    """
+    One player's outs for the next card.
+
+    strength       - the hand now (handeval strength, bigger is better)
+    ahead          - True if nobody has a hand as good right now
+    outs           - unseen cards after which this player has the best hand
+                     alone (for a player who is ahead: the cards that keep them there)
+    split_outs     - unseen cards after which this player ties for the best hand
+    improvements   - category -> unseen cards that take this hand up to that category
+    flush_cards    - unseen cards that complete a flush draw (4 of a suit, at least one in the hole)
+    straight_cards - unseen cards that complete a straight using a hole card
+    """
+    def __init__(self, strength: int, ahead: bool):
+        self.strength = strength
+        self.ahead = ahead
+        self.outs: List[int] = []
+        self.split_outs: List[int] = []
+        self.improvements: Dict[int, List[int]] = {}
+        self.flush_cards: List[int] = []
+        self.straight_cards: List[int] = []
+
+    @property
+    def category(self) -> int:
+        return category_of(self.strength)
+
+    def improves_to(self, category: int) -> List[int]:
+        # Unseen cards that make this hand exactly 'category' (1 = straight flush ... 9 = high card)
+        return self.improvements.get(category, [])
+
+    def improves_to_at_least(self, category: int) -> List[int]:
+        # Unseen cards that make this hand 'category' or better
+        return sorted(card for got, cards in self.improvements.items() if got <= category for card in cards)
+
+    @property
+    def has_draw(self) -> bool:
+        return bool(self.flush_cards or self.straight_cards)
+
+
+class BoardIndex:
+    """
+    Everything about a flop or turn board that doesn't depend on the players,
+    built once and used for any number of outs queries on that board.
+
+    board_key         - rank key of the board cards (see handeval.RANK_KEYS)
+    board_suits       - 13-bit rank mask of the board in each suit
+    straight_makers   - 13-bit hole card rank mask -> 13-bit mask of the ranks
+                        that give a straight the hand doesn't have now and the
+                        board plus that card doesn't make on its own
+    """
+    def __init__(self, board: Sequence[AnyCard]):
+        if len(board) not in (3, 4):
+            raise ValueError("outs need a flop or a turn (3 or 4 board cards)")
+        self.board_mask = cards_to_mask(board)
+        if self.board_mask.bit_count() != len(board):
+            raise ValueError("the same card was given more than once")
+        self.board_suits = [(self.board_mask >> (13 * suit)) & SUIT_MASK for suit in range(4)]
+        self.board_key = sum(MASK_RANK_KEY[suit_mask] for suit_mask in self.board_suits)
+
+        board_ranks = 0
+        for suit_mask in self.board_suits:
+            board_ranks |= suit_mask
+        self.board_ranks = board_ranks
+        self.board_straights = [STRAIGHT_HIGH[board_ranks | 1 << rank] for rank in range(13)]
+
+        # Every hole card rank mask: one rank (a pair) or two
+        self.straight_makers: Dict[int, int] = {}
+        for high in range(13):
+            for low in range(high + 1):
+                hole_ranks = (1 << high) | (1 << low)
+                self.straight_makers[hole_ranks] = self._straight_makers(hole_ranks)
+
+    def _straight_makers(self, hole_ranks: int) -> int:
+        ranks = self.board_ranks | hole_ranks
+        now = STRAIGHT_HIGH[ranks]
+        makers = 0
+        for rank in range(13):
+            made = STRAIGHT_HIGH[ranks | 1 << rank]
+            if made > now and made > self.board_straights[rank]:
+                makers |= 1 << rank
+        return makers
+
+    def outs(self, hands: Sequence[Sequence[AnyCard]], dead: Iterable[AnyCard] = ()) -> List[Outs]:
+        """
+        Outs of every hand for the next card, all worked out together since
+        'best hand' depends on everyone. With a single hand every unseen card
+        is an out, so look at its improvements and draws instead.
+        """
+        hand_masks = []
+        for hand in hands:
+            if len(hand) != 2:
+                raise ValueError("every player needs exactly 2 hole cards")
+            hand_masks.append(cards_to_mask(hand))
+        dead = list(dead)
+        used_mask = self.board_mask | cards_to_mask(dead)
+        for hand_mask in hand_masks:
+            used_mask |= hand_mask
+        if used_mask.bit_count() != self.board_mask.bit_count() + len(dead) + 2 * len(hand_masks):
+            raise ValueError("the same card was given more than once")
+        unseen = FULL_DECK_MASK & ~used_mask
+
+        # Every player's hand now, and what is needed to extend it by one card
+        keys = []
+        suits = []
+        made_flushes = []
+        flush_suits = []  # suits where one more card can make or better a flush
+        strengths = []
+        for hand_mask in hand_masks:
+            player_suits = [self.board_suits[suit] | ((hand_mask >> (13 * suit)) & SUIT_MASK) for suit in range(4)]
+            key = self.board_key + sum(MASK_RANK_KEY[(hand_mask >> (13 * suit)) & SUIT_MASK] for suit in range(4))
+            made_flush = max(FLUSH_TABLE[suit_mask] for suit_mask in player_suits)
+            keys.append(key)
+            suits.append(player_suits)
+            made_flushes.append(made_flush)
+            flush_suits.append([suit for suit in range(4) if player_suits[suit].bit_count() >= 4])
+            strengths.append(max(RANK_TABLE[key], made_flush))
+        num_players = len(hand_masks)
+
+        # Card sets are built as 52-bit masks and only turned into lists at the end
+        outs = [0] * num_players
+        split_outs = [0] * num_players
+        improvements: List[Dict[int, int]] = [{} for _ in hand_masks]
+        categories = [strength >> 20 for strength in strengths]  # bigger is better, like the strengths
+
+        def tally(after: List[int], cards: int):
+            # Add 'cards' (a mask) to every player's sets, given everyone's hand after one of them
+            best = max(after)
+            winners = outs if after.count(best) == 1 else split_outs
+            for i, strength in enumerate(after):
+                if strength == best:
+                    winners[i] |= cards
+                if strength >> 20 > categories[i]:
+                    category = category_of(strength)
+                    improvements[i][category] = improvements[i].get(category, 0) | cards
+
+        # Unless it fills a flush, the next card only matters by its rank: one lookup per rank and player
+        # (a rank the player already holds all 4 of has no key, and no unseen card either)
+        by_rank = [[max(RANK_TABLE.get(key + RANK_KEYS[rank], 0), made_flushes[i]) for rank in range(13)]
+                   for i, key in enumerate(keys)]
+        flush_players = [[i for i in range(num_players) if suit in flush_suits[i]] for suit in range(4)]
+        plain = sum(SUIT_MASK << (13 * suit) for suit in range(4) if not flush_players[suit]) & unseen
+        for rank in range(13):
+            cards = plain & RANK_CARDS[rank]
+            if cards:
+                tally([ranked[rank] for ranked in by_rank], cards)
+        # The rest one card at a time
+        for card in mask_to_cards(unseen & ~plain):
+            rank = card % 13
+            suit = card // 13
+            after = [ranked[rank] for ranked in by_rank]
+            for i in flush_players[suit]:
+                flush = FLUSH_TABLE[suits[i][suit] | (1 << rank)]
+                if flush > after[i]:
+                    after[i] = flush
+            tally(after, 1 << card)
+
+        best_now = max(strengths)
+        results = []
+        for i, hand_mask in enumerate(hand_masks):
+            result = Outs(strengths[i], strengths[i] == best_now and strengths.count(best_now) == 1)
+            result.outs = mask_to_cards(outs[i])
+            result.split_outs = mask_to_cards(split_outs[i])
+            result.improvements = {category: mask_to_cards(cards) for category, cards in sorted(improvements[i].items())}
+
+            hole_ranks = 0
+            flush_cards = 0
+            for suit in range(4):
+                hole_suit = (hand_mask >> (13 * suit)) & SUIT_MASK
+                hole_ranks |= hole_suit
+                if hole_suit and suits[i][suit].bit_count() == 4:
+                    flush_cards |= SUIT_MASK << (13 * suit)
+            makers = self.straight_makers[hole_ranks]
+            straight_cards = 0
+            for rank in range(13):
+                if makers >> rank & 1:
+                    straight_cards |= RANK_CARDS[rank]
+            result.flush_cards = mask_to_cards(flush_cards & unseen)
+            result.straight_cards = mask_to_cards(straight_cards & unseen)
+            results.append(result)
+        return results
+
+
+def analyze_outs(hands: Sequence[Sequence[AnyCard]], board: Sequence[AnyCard],
+                 dead: Iterable[AnyCard] = ()) -> List[Outs]:
+    # Outs of every hand on a flop or turn (see BoardIndex.outs)
+    return BoardIndex(board).outs(hands, dead)
+
+
+def game_outs(game) -> List[Tuple[object, Outs]]:
+    """
+    (player, Outs) for every player still in the hand of a Game, after the
+    flop or turn has been dealt. Folded players' cards count as dead.
+    """
+    active = [player for player in game.players if not player.is_folded or player.is_all_in]
+    dead = [card for player in game.players if player.is_folded and not player.is_all_in for card in player.hand]
+    return list(zip(active, analyze_outs([player.hand for player in active], game.deck.community, dead)))
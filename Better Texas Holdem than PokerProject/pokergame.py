@@ -1,26 +1,32 @@
 import random
-from typing import List, Tuple
-from itertools import combinations
+from typing import Iterator, List, Optional, Tuple
 from collections import Counter
+from cards import Card, AnyCard, CARD_VALUE, CARD_SUIT, cards_to_text
+from handeval import evaluate_detailed, evaluate_mask, strength_to_detailed
+from evalcache import cached_evaluator
+from preflop import load_preflop_table
+from providers import ActionProvider, ConsoleProvider, ConsoleListener, GameListener
+from sidepots import build_pots, award_pots
+from profiling import NullProfiler
+from betting import BettingRound
+from handhistory import PREFLOP, FLOP, TURN, RIVER, BLIND, CHECK, FOLD, CALL, BET, RAISE, ALL_IN
 
 
 
 def main():
     # 1) Ask how many players
         num_players = int(input("Enter number of players: "))
-        game = Game(num_players)
+        # 2) Everyone plays from this terminal and sees what happens
+        game = Game(num_players, providers=ConsoleProvider(), listener=ConsoleListener())
 
         while True:
             
             # 3) Play that round
             game.play_one_round()
             
-            # 4) Optional: If you want to remove busted players (money <= 0)
+            # 4) Remove busted players (money <= 0)
             #    or end game if only 1 remains:
-            busted = [p for p in game.players if p.money <= 0]
-            for p in busted:
-                print(f"{p.name} is out of money and removed from the game.")
-            game.players = [p for p in game.players if p.money > 0]
+            game.remove_busted_players()
             
             if len(game.players) < 2:
                 print("Not enough players to continue. Game over.")
@@ -33,12 +39,14 @@ def main():
                 break
 
 
-RANK_VALUE = {
-    '2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7,
-    '8': 8, '9': 9, 'T': 10, 'J': 11, 'Q': 12, 'K': 13, 'A': 14
-}
+# How many hands the 5-card evaluator remembers (see evalcache.py). Change at runtime
+# with evaluate_5card_hand_detailed.resize(10_000); cache_info() has the counters.
+# The 7-card evaluator is not cached: working out the cache key costs about as
+# much as the table lookups it would save.
+EVAL_CACHE_SIZE = 100_000
 
-def evaluate_5card_hand_detailed(cards: List[Tuple[str, str]]) -> Tuple[int, List[int]]:
+@cached_evaluator(maxsize=EVAL_CACHE_SIZE)
+def evaluate_5card_hand_detailed(cards: List[AnyCard]) -> Tuple[int, List[int]]:
     """
     Evaluate exactly 5 cards. Return (category, tiebreakers).
     
@@ -56,13 +64,15 @@ def evaluate_5card_hand_detailed(cards: List[Tuple[str, str]]) -> Tuple[int, Lis
     tiebreakers is a list of integers (descending significance),
     e.g. for a Full House: [rank_of_trips, rank_of_pair].
     For a Flush or High Card: sorted ranks descending, etc.
+
+    Cards can be int cards (see cards.py) or the old (rank, suit) tuples.
     
     We compare two hands by:
       1. category ascending (1 is best)
       2. if category ties, compare tiebreakers lexicographically, where bigger is better.
     """
-    rank_vals = [RANK_VALUE[r] for (r, s) in cards]
-    suits = [s for (r, s) in cards]
+    rank_vals = [CARD_VALUE[card] for card in cards]
+    suits = [CARD_SUIT[card] for card in cards]
 
     rank_vals.sort(reverse=True)
     freq = Counter(rank_vals)  # e.g. {14:4, 9:1} for four Aces
@@ -147,79 +157,121 @@ def evaluate_5card_hand_detailed(cards: List[Tuple[str, str]]) -> Tuple[int, Lis
     return (9, rank_vals)
 
 
-def evaluate_7card_hand_detailed(seven_cards: List[Tuple[str, str]]) -> Tuple[int, List[int]]:
+def evaluate_7card_hand_detailed(seven_cards: List[AnyCard]) -> Tuple[int, List[int]]:
     """
-    Evaluate 7 cards (2 hole + 5 community) by picking the best 5-card subset.
-    Returns (category, tiebreakers).
+    Evaluate 7 cards (2 hole + 5 community) and return the best 5-card hand
+    as (category, tiebreakers).
+    Uses the lookup tables in handeval.py instead of trying all 21 five-card subsets.
     """
-    best = (9, [-1, -1, -1, -1, -1])  # something "worst" by default
-    for combo in combinations(seven_cards, 5):
-        cat, tie = evaluate_5card_hand_detailed(list(combo))
-        # Compare to current best:
-        #  - cat ascending
-        #  - if cat ties, tiebreak descending
-        if cat < best[0]:
-            best = (cat, tie)
-        elif cat == best[0] and tie > best[1]:
-            best = (cat, tie)
-    return best
+    return evaluate_detailed(seven_cards)
 
 
 # -----------------------------------------
 # 2) Deck, Player, and Game classes
 # -----------------------------------------
 
+UNSEEDED_RNG = random.Random()
+
+
 class Deck:
-    def __init__(self):
-        suits = ['S', 'C', 'H', 'D']
-        ranks = ['2', '3', '4', '5', '6', '7', '8', '9', 'T', 'J', 'Q', 'K', 'A']
-  
-        self.cards = [(rank, suit) for suit in suits for rank in ranks]
-        random.shuffle(self.cards)
-        self.community = []  
-
-    def deal_card(self) -> Tuple[str, str]:
-        # Deal a single card from the deck
-        return self.cards.pop() if self.cards else None
+    """
+    One deck that is reused for every hand.
+
+    Cards are ints 0-51 (see cards.py), only turned into text for display.
+    shuffle() doesn't move anything: each card is picked at random from the
+    cards not dealt yet when it is dealt (a Fisher-Yates shuffle that stops
+    after the cards a hand actually uses, usually well under half the deck).
+
+    The deck draws from its own random.Random, never the global random
+    module, so a Deck (or a Game) given the same seed deals the same cards.
+    Decks without one share UNSEEDED_RNG (a Random is about 2.5 KB).
+    """
+    __slots__ = ('rng', 'cards', 'dealt', 'community', 'community_mask')
+
+    def __init__(self, rng: Optional[random.Random] = None):
+        self.rng = rng if rng is not None else UNSEEDED_RNG
+        self.cards = bytearray(range(52))  # cards[:dealt] have been dealt (one byte per card)
+        self.shuffle()
+
+    def shuffle(self) -> None:
+        # Put every card back for a new hand
+        self.dealt = 0
+        self.community = []
+        self.community_mask = 0
+
+    def deal_card(self) -> Optional[Card]:
+        # Deal a single card from the deck (None once it is empty)
+        dealt = self.dealt
+        if dealt == 52:
+            return None
+        cards = self.cards
+        pick = dealt + int(self.rng.random() * (52 - dealt))
+        cards[dealt], cards[pick] = cards[pick], cards[dealt]
+        self.dealt = dealt + 1
+        return cards[dealt]
+
+    def deal(self, n: int) -> List[Card]:
+        # Deal n cards at once (fewer if the deck runs out)
+        cards = self.cards
+        random_value = self.rng.random
+        start = self.dealt
+        stop = min(start + n, 52)
+        for i in range(start, stop):
+            pick = i + int(random_value() * (52 - i))
+            cards[i], cards[pick] = cards[pick], cards[i]
+        self.dealt = stop
+        return list(cards[start:stop])
+
+    def add_community_cards(self, n: int) -> None:
+        for card in self.deal(n):
+            self.community.append(card)
+            self.community_mask |= 1 << card
+
+    def add_community_card(self) -> None:
+        self.add_community_cards(1)
     
     def deal_flop(self) -> None:
-        for _ in range(3):
-            self.community.append(self.deal_card())
+        self.add_community_cards(3)
     
     def deal_turn(self) -> None:
-        self.community.append(self.deal_card())
+        self.add_community_cards(1)
     
     def deal_river(self) -> None:
-        self.community.append(self.deal_card())
+        self.add_community_cards(1)
     
     def get_community_cards(self) -> str:
-        return ', '.join([f"{rank}{suit}" for rank, suit in self.community])
+        return cards_to_text(self.community)
 
 
 class Player: 
-    def __init__(self, name: str, money: float = 10.0, last_bet: float = 0.0,
-                 beginning_money: float = 0.0, all_in_pot_amount: float = 0.0, all_in_difference: float = 0.0):
+    # All money (stacks, bets, pots) is in whole cents, see chips.py.
+    # __slots__ keeps every player small when a process hosts thousands of tables.
+    __slots__ = ('name', 'provider', 'money', 'hand', 'hand_mask', 'is_folded', 'last_bet',
+                 'is_all_in', 'beginning_money', 'total_contribution')
+
+    def __init__(self, name: str, money: int = 1000, last_bet: int = 0,
+                 beginning_money: int = 0, provider: Optional[ActionProvider] = None):
         self.name = name
+        self.provider = provider  # where this player's actions come from (see providers.py)
         self.money = money
         self.hand = []
+        self.hand_mask = 0
         self.is_folded = False
         self.last_bet = last_bet
         self.is_all_in = False
         self.beginning_money = beginning_money
-        self.winner = []
-        self.all_in_pot_amount = all_in_pot_amount
-        self.all_in_difference = all_in_difference
+        self.total_contribution = 0  # everything put in the pot this hand, for the side pots
         
 
-    def receive_card(self, card: Tuple[str, str]):
+    def receive_card(self, card: Card):
         self.hand.append(card)
+        self.hand_mask |= 1 << card
 
     def show_hand(self):
-        return ', '.join([f"{rank}{suit}" for rank, suit in self.hand])
+        return cards_to_text(self.hand)
 
-    def update_money(self, amount: float):
+    def update_money(self, amount: int):
         self.money += amount
-        self.money = round(self.money, 2)
     
     def fold(self):
         self.is_folded = True
@@ -241,37 +293,74 @@ class Player:
 
 
 class Game: 
-    def __init__(self, num_players: int):
-        self.deck = Deck()
+    __slots__ = ('deck', 'players', 'pot', 'current_bet', 'small_blind', 'big_blind', 'winner',
+                 'winner_determined', 'preflop_table', 'listener', 'profiler', 'betting',
+                 'street', 'actions')
+
+    def __init__(self, num_players: int, names: Optional[List[str]] = None,
+                 providers=None, listener: Optional[GameListener] = None,
+                 rng: Optional[random.Random] = None, profiler=None):
+        """
+        names     - player names; if left out each provider is asked with get_name()
+        providers - one ActionProvider for every seat, or a list with one per seat
+                    (default: everyone types their actions at the console)
+        listener  - gets every event (checks, folds, cards dealt, winners...);
+                    None means nothing is printed at all
+        rng       - random.Random the deck shuffles with; pass a seeded one to
+                    replay the same cards (default: one unseeded Random shared by all decks)
+        profiler  - a profiling.Profiler to time every phase of a hand (default: off)
+        """
+        self.deck = Deck(rng)
         self.players = []
-        self.pot = 0.00
-        self.current_bet = 0.00
-        self.small_blind = 0.10
-        self.big_blind = 0.25
+        # In cents
+        self.pot = 0
+        self.current_bet = 0
+        self.small_blind = 10
+        self.big_blind = 25
+        self.winner = []  # players who won the last hand (set again by every hand)
         self.winner_determined = False
-        
+        # Precomputed preflop equities (preflop.py), None if the table file hasn't been built
+        self.preflop_table = load_preflop_table()
+        self.listener = listener
+        self.profiler = profiler if profiler is not None else NullProfiler()
+        self.betting = None  # the street being bet on right now (betting.BettingRound)
+        self.street = PREFLOP  # handhistory street numbers
+        # This hand's actions, flat: street, seat, kind, amount, street, seat, ...
+        # (handhistory's kinds; amount is the player's total bet on the street).
+        # Handed over with 'hand_end', so a listener that only keeps history
+        # doesn't need the per-action events at all (GameListener.wants_actions).
+        self.actions = []
+
+        if providers is None:
+            providers = ConsoleProvider()
+        if not isinstance(providers, list):
+            providers = [providers] * num_players
 
         for i in range(num_players):
-            name = input(f"Enter name for Player {i + 1}: ")
-            self.players.append(Player(name))
+            provider = providers[i]
+            name = names[i] if names is not None else provider.get_name(i)
+            self.players.append(Player(name, provider=provider))
+
+    def emit(self, event: str, **data):
+        # Hand an event to the listener (if there is one) instead of printing it
+        if self.listener is not None:
+            self.listener.on_event(event, data)
 
     def deal_cards_to_player(self, player: Player, num_cards: int):
-        for _ in range(num_cards):
-            card = self.deck.deal_card()
-            if card:
-                player.receive_card(card)
+        for card in self.deck.deal(num_cards):
+            player.receive_card(card)
 
-    def bet(self, player: Player, amount: float) -> bool:
+    def bet(self, player: Player, amount: int) -> bool:
         """
-        Attempts to place a bet for 'player' in the amount 'amount'.
+        Attempts to place a bet for 'player' in the amount 'amount' (total for this street, in cents).
         Returns True if bet was successful (or fold/check/all-in).
         Returns False if invalid and we should re-prompt.
         """
-        try:
-            amount = float(amount)
-        except ValueError:
-            print("Invalid input! Please enter a valid numeric amount.")
+        if not isinstance(amount, int):
+            self.emit('invalid_amount', player=player, amount=amount)
             return False
+        # Accepted actions only become events for listeners that want them
+        announce = self.listener is not None and self.listener.wants_actions
         
         while True:
             if player.is_folded:
@@ -280,249 +369,168 @@ class Game:
             # Checking
             if amount == player.last_bet and player.last_bet == self.current_bet:
                 player.check()
-                print(f"{player.name} checks")
+                self.actions += (self.street, self.players.index(player), CHECK, amount)
+                if announce:
+                    self.emit('check', player=player)
                 return True
             
             # Folding (entering 0 when you owe something)
             elif amount - player.last_bet == 0:
                 player.fold()
-                print(f"{player.name} folds")
+                self.actions += (self.street, self.players.index(player), FOLD, amount)
+                if announce:
+                    self.emit('fold', player=player)
                 return True
             
             # All-in
             elif amount - player.last_bet == player.money:
-                print(f'{player.name} is all in!')
+                self.actions += (self.street, self.players.index(player), ALL_IN, amount)
+                if announce:
+                    self.emit('all_in', player=player, amount=amount)
+                if self.profiler.enabled:
+                    self.count_bet(amount)
                 player.update_money(-amount + player.last_bet)
+                player.total_contribution += amount - player.last_bet
                 self.pot += (amount - player.last_bet)
-                self.pot = round(self.pot, 2)
-                player.last_bet = round(amount, 2)
+                player.last_bet = amount
                 self.current_bet = max(self.current_bet, amount)
-                self.current_bet = round(self.current_bet, 2)
                 player.all_in()
                 return True
             
             # Invalid negative
             elif amount < 0:
-                print (f'{player.name}, negative amounts not allowed')
+                self.emit('negative_amount', player=player, amount=amount)
                 return False
             
             # Not enough money
             elif amount - player.last_bet > player.money:
-                print(f"You do not have enough money to bet {round(amount, 2)}, your available money is {player.money}")
+                self.emit('not_enough_money', player=player, amount=amount)
                 return False
             
             # If bet < current bet (but > 0), not matching
             elif amount < self.current_bet and amount > 0:
-                print(f"{player.name}, not enough to match the current bet. Type 0 to fold.")
+                self.emit('under_call', player=player, amount=amount)
                 return False
             
             # Must raise at least double the current bet
             elif amount > self.current_bet and amount < 2 * self.current_bet:
-                print("Raise must be at least double the current bet.")
+                self.emit('raise_too_small', player=player, amount=amount)
                 return False
 
             # Otherwise, a valid bet or valid raise
+            if self.profiler.enabled:
+                self.count_bet(amount)
+            if amount > self.current_bet:
+                kind = RAISE if self.current_bet else BET
+            else:
+                kind = CALL
+            self.actions += (self.street, self.players.index(player), kind, amount)
             player.update_money(-amount + player.last_bet) 
+            player.total_contribution += amount - player.last_bet
             self.pot += (amount - player.last_bet)
-            self.pot = round(self.pot, 2)
             player.last_bet = amount
             self.current_bet = max(self.current_bet, amount)
+            if announce:
+                self.emit('bet', player=player, amount=amount)
             return True
     
-    def calculate_all_in_amounts(self):
-        for player in self.players:
-            if player.is_all_in:
-                player.all_in_pot_amount = self.pot
-                for p in self.players:
-                    if player.last_bet < p.last_bet:
-                        if player is p:
-                            continue
-                        player.all_in_difference += p.last_bet - player.last_bet 
-                player.all_in_pot_amount -= player.all_in_difference
-
-    def betting_sequence(self, player: Player):
+    def count_bet(self, amount: int):
+        # Profiler counters for an accepted bet (called before current_bet is updated)
+        self.profiler.count('bets')
+        if amount > self.current_bet > 0:
+            self.profiler.count('raises')
+
+    def take_action(self, player: Player):
         """
-        Prompt 'player' for a bet/call/fold/check action when needed.
+        Ask the player's provider how much more to put in until bet() accepts it.
         """
-        additional_amount = self.current_bet - player.last_bet
-        old_current_bet = self.current_bet
-        
-        # If they already matched the bet, don't ask again
-        if player.last_bet == self.current_bet and self.current_bet != 0:
-            return
-        
+        attempt = 0
         while True:
-            try:
-                prompt_msg = (f'{player.name}: {player.show_hand()}, money: {round(player.money, 2)}, '
-                              f'pot: {round(self.pot, 2)}, current bet: {round(self.current_bet, 2)}, '
-                              f'{round(additional_amount, 2)} more to call -> ')
-                total_bet_input = float(input(prompt_msg))
-            except ValueError:
-                print("Invalid input. Please enter a valid number.")
-                continue
-            
-            bet_amount = total_bet_input + player.last_bet
-            bet_success = self.bet(player, bet_amount)
-            if bet_success:
-                # If someone raised above old_current_bet, we do raise_protocol
-                if old_current_bet < self.current_bet:
-                    self.raise_protocol()
-                break
-            else:
-                continue
+            bet_amount = player.provider.get_action(self, player, attempt) + player.last_bet
+            if self.bet(player, bet_amount):
+                return
+            attempt += 1
+            if self.profiler.enabled:
+                self.profiler.count('reprompts')
 
     def reset_current_bet(self):
-        self.current_bet = 0.00
+        self.current_bet = 0
 
     def use_small_blind(self):
         # Player[0] => small blind
         small_blind_player = self.players[0]
         self.current_bet = self.small_blind
-        self.bet(small_blind_player, self.small_blind)
+        if self.bet(small_blind_player, self.small_blind):
+            self.actions[-2] = BLIND
     
     def use_big_blind(self):
         # Player[1] => big blind
         big_blind_player = self.players[1]
         self.current_bet = self.big_blind
-        self.bet(big_blind_player, self.big_blind)
-
-    def initial_betting_sequence(self):
-        # Each player after the blinds
-        for player in self.players[2:]:
-            while True:
-                try:
-                    msg = (f'{player.name}: {player.show_hand()}, money: {round(player.money, 2)}, '
-                           f'pot: {round(self.pot, 2)}, current bet: {round(self.current_bet, 2)}, '
-                           f'how much would you like to bet? ')
-                    bet_amount = float(input(msg))
-                except ValueError:
-                    print("Invalid input. Please enter a valid number.")
-                    continue
-                bet_success = self.bet(player, bet_amount)
-                if bet_success:
-                    break
-                else:
-                    continue
-        
-        # Force each player to match or fold if the bet changed
-        for i in range(len(self.players)):
-            self.additional_bet_required(self.players[i])
-        
-        # Now specifically let the big blind (player[1]) act again if everyone else is done
-        if (self.current_bet == self.players[1].last_bet == self.big_blind):
-            old_current_bet = self.current_bet
-            while True:
-                try:
-                    msg = (f'{self.players[1].name}: {self.players[1].show_hand()}, money: {round(self.players[1].money, 2)}, '
-                           f'pot: {round(self.pot, 2)}, current bet: {round(self.current_bet, 2)}, 0 to check -> ')
-                    total_bet = float(input(msg))
-                except ValueError:
-                    print("Invalid input. Please enter a valid number.")
-                    continue
-                bet_amount = total_bet + self.players[1].last_bet
-                bet_success = self.bet(self.players[1], bet_amount)
-                if bet_success:
-                    if old_current_bet < self.current_bet:
-                        self.raise_protocol()
-                    break
-                else:
-                    continue
-
-    def post_betting_sequence(self):
-        # Another round of betting for each non-folded player
-        for player in self.players:
-            if not player.is_folded:
-                self.betting_sequence(player)
-
-    def additional_bet_required(self, player: Player):
-        # If player hasn't matched current_bet yet, ask them
-        if player.is_folded:
-            return
-        if self.current_bet > player.last_bet:
-            self.betting_sequence(player)
-
-    def raise_protocol(self):
-    #After a raise, each player (except the raiser) must have the chance to call or raise again.
-        num_players = len(self.players)
-
-        
-        last_raiser_index = None
-        for i, player in enumerate(self.players):
-            if player.last_bet == self.current_bet and player.last_bet != 0:
-                last_raiser_index = i
+        if self.bet(big_blind_player, self.big_blind):
+            self.actions[-2] = BLIND
 
-        if last_raiser_index is None:
-            return  
+    def preflop_equity_text(self, player: Player) -> str:
+        # e.g. 'equity: 31%, ' against the number of players at the table, or '' without a table file
+        if self.preflop_table is None or len(self.players) not in self.preflop_table.field_sizes:
+            return ''
+        equity = self.preflop_table.hand_equity(player.hand, len(self.players))
+        return f'equity: {equity:.0%}, '
 
-        
-        start_index = (last_raiser_index + 1) % num_players
-
-        for i in range(start_index, start_index + num_players - 1):  
-            player = self.players[i % num_players]  
-
-            if player.last_bet < self.current_bet: 
-                self.additional_bet_required(player)
+    def run_betting_round(self, first_seat: int):
+        """
+        Play one street of betting, asking each player's provider in turn.
+        The state lives in self.betting (see betting.py): no recursion, one
+        step per action, and a street could just as well be stepped from outside.
+        """
+        self.start_betting(first_seat)
+        self.play_street()
+
+    def start_betting(self, first_seat: int) -> BettingRound:
+        # A new street of betting in self.betting, for play_street() or a driver of its own
+        self.betting = BettingRound(self, first_seat)
+        return self.betting
+
+    def play_street(self):
+        # Ask each player's provider in turn until the street in self.betting is over
+        betting = self.betting
+        seat = betting.current_seat()
+        while seat is not None:
+            old_current_bet = self.current_bet
+            self.take_action(self.players[seat])
+            betting.record(old_current_bet)
+            seat = betting.current_seat()
 
     def reset_all_players_last_bets(self):
         for player in self.players:
             player.last_bet = 0
 
     def start_new_round(self):
-        self.deck = Deck()
+        self.deck.shuffle()
         self.reset_all_players_last_bets()
         self.reset_current_bet()
         self.pot = 0
         self.winner = []
         self.winner_determined = False
+        self.street = PREFLOP
+        self.actions = []
         
         for player in self.players:
             player.hand.clear()
+            player.hand_mask = 0
             player.is_folded = False
             player.is_all_in = False
             player.last_bet = 0
             player.update_beginning_money()
-            player.all_in_pot_amount = 0
-            player.all_in_difference = 0
+            player.total_contribution = 0
         
 
-    def sort_players_all_in(self):
-        """
-        A utility to handle your custom logic: making all-in players no longer folded, etc.
-        Then sort them by their beginning stack if needed.
-        """
+    def remove_busted_players(self):
+        # Players with no money left are out of the game
         for player in self.players:
-            if player.is_all_in:
-                player.is_folded = False
-        all_in_players = [player for player in self.players if player.is_all_in]
-        all_in_players.sort(key=lambda player: player.beginning_money)
-        for player in all_in_players: 
-            self.determine_winner(self.deck)
-            if self.winner[0] == player and len(self.winner) == 1:
-                winning_amount = player.all_in_pot_amount
-                
-                player.update_money(player.all_in_pot_amount)
-                
-                for p in self.players:
-                    p.all_in_pot_amount -= winning_amount
-                self.pot -= winning_amount
-                
-                for i, current_player in enumerate(all_in_players):
-                    if i < len(all_in_players) - 1:
-                        next_player = all_in_players[i+1]
-                        next_player.all_in_pot_amount -= player.all_in_pot_amount
-                    elif self.pot == current_player.all_in_pot_amount:
-                        break
-                    else:
-                        self.pot -= player.all_in_pot_amount
-            elif len(self.winner) != 1 and player in self.winner:
-                num_winners = len(self.winner)
-                share = player.all_in_pot_amount / num_winners
-                player.update_money(share)
-                self.pot -= share
-                for p in self.players:
-                    p.all_in_pot_amount -= share
-            player.fold()
-    
+            if player.money <= 0:
+                self.emit('busted', player=player)
+        self.players = [player for player in self.players if player.money > 0]
 
     def rotate_players(self):
         last_player = self.players.pop(-1)
@@ -545,168 +553,226 @@ class Game:
         if len(active_players) == 1:
             winner = active_players[0]
             self.winner = [winner]
-            print(f"\n** The winner is {winner.name} (all other players folded) **")
+            self.emit('everyone_folded', player=winner)
             self.winner_determined = True
-            self.award_money_to_winner()
+            # Only one player left, so the whole pot is theirs (showdown() pays split and side pots)
+            winner.update_money(self.pot)
+            self.emit('pot_won', player=winner, pot=self.pot)
+            self.emit('hand_end', players=list(self.players), cards=list(self.deck.community), showdown=False,
+                      actions=self.actions)
             self.rotate_players()
             return True
         return False
-   
-    
-    def award_money_to_winner(self):
-        if len(self.winner) == 1:
-            sole_winner = self.winner[0]
-            sole_winner.update_money(self.pot)
-            print(f"{sole_winner.name} wins the pot of {self.pot}!")
-            
-        else:
-        # Tie: split pot among winners
-            num_winners = len(self.winner)
-            share = self.pot / num_winners
-            winners_names = ', '.join(player.name for player in self.winner)
-            for w in self.winner:
-                w.update_money(share)
-            print(f"{winners_names} split the pot of {self.pot} (each gets {share:.2f})!")
+
 
    
-    def determine_winner(self, deck: Deck):
-        if all(player.is_folded for player in self.players):
-            pass
+    def showdown(self):
+        """
+        Build the main pot and side pots from what everyone put in this hand,
+        score every live hand once and pay each pot to the best hand in it.
+        """
+        community_mask = self.deck.community_mask
+        # All-in players are marked folded to keep them out of the betting, but they are still live
+        live = [not player.is_folded or player.is_all_in for player in self.players]
+        strengths = [evaluate_mask(player.hand_mask | community_mask) if live[i] else 0
+                     for i, player in enumerate(self.players)]
+        self.profiler.count('evaluations', sum(live))
+        pots = build_pots([player.total_contribution for player in self.players], live)
+
+        # Show the best hand at the table (it always wins at least the main pot)
+        best_strength = max(strengths)
+        winners = [player for i, player in enumerate(self.players) if live[i] and strengths[i] == best_strength]
+        best_cat, best_tie = strength_to_detailed(best_strength)
+        if len(winners) == 1:
+            self.emit('showdown_winner', winners=winners, category=best_cat, tiebreakers=best_tie)
         else:
-            """
-            After all betting is done and community cards are dealt,
-            figure out who wins among non-folded players using tie-break logic.
-            """
-            # rank_names for printing
-            rank_names = {
-                1: "Straight Flush",
-                2: "Four of a Kind",
-                3: "Full House",
-                4: "Flush",
-                5: "Straight",
-                6: "Three of a Kind",
-                7: "Two Pair",
-                8: "One Pair",
-                9: "High Card"
-            }
-
-
-            community = deck.community  # 5 community cards in deck.community
-
-            # Evaluate each player's best 7-card hand
-            results = []
-            active_players = [player for player in self.players if not player.is_folded]
-            for player in active_players:
-                seven_cards = player.hand + community  # 7 total (2 hole, 5 community)
-                cat, tie = evaluate_7card_hand_detailed(seven_cards)
-                results.append((player, (cat, tie)))
-
-            # Now pick the single best or tie
-            # best_hand = min(results, key=??) but we must do custom compare:
-            # We'll do a simple pass:
-            best_cat, best_tie = results[0][1]
-            winners = [results[0][0]]  # the player objects
-
-            for (player, (cat, tie)) in results[1:]:
-                if cat < best_cat:
-                    best_cat, best_tie = cat, tie
-                    winners = [player]
-                elif cat == best_cat:
-                    if tie > best_tie:
-                        best_cat, best_tie = cat, tie
-                        winners = [player]
-                    elif tie == best_tie:
-                        winners.append(player)
-
-            # Show the best category + tiebreak
-            if len(winners) == 1:
-                winner = winners[0]
-                print(f"\n** The winner is {winner.name} **")
-                print(f"Winning hand category: {best_cat} ({rank_names[best_cat]})")
-                print(f"Tiebreakers: {best_tie}")
+            self.emit('showdown_tie', winners=winners, category=best_cat, tiebreakers=best_tie)
+        self.winner = winners
+        self.winner_determined = True
+
+        # Pay every pot, main pot first
+        for pot, seats, shares in award_pots(pots, strengths):
+            for seat, share in zip(seats, shares):
+                self.players[seat].update_money(share)
+            if len(seats) == 1:
+                self.emit('pot_won', player=self.players[seats[0]], pot=pot.amount)
             else:
-                # It's a tie among multiple players
-                print(f"\n** It's a tie among: {', '.join(player.name for player in winners)} **")
-                print(f"Hand category: {best_cat} ({rank_names[best_cat]})")
-                print(f"Tiebreakers: {best_tie}")
-            self.winner = winners
+                self.emit('pot_split', winners=[self.players[seat] for seat in seats],
+                          pot=pot.amount, share=shares[-1])
+        self.pot = 0
 
-            self.winner_determined = True
+    def play_one_round(self):
+        # Every phase of the hand is timed by self.profiler (does nothing unless one was given)
+        self.profiler.start_hand()
+        self.play_round_phases()
+        self.profiler.end_hand()
 
+    def play_round_phases(self):
+        for _ in self.hand_streets():
+            self.play_street()
 
-    
-    def play_one_round(self):
+    def hand_streets(self) -> Iterator[BettingRound]:
+        """
+        One hand from the blinds to the payout, as a generator that stops at
+        every street with betting and yields its BettingRound (also in
+        self.betting); resume it once that street's betting is over.
+        play_round_phases() plays those streets with the providers, server.py
+        steps them itself and awaits its clients between actions.
+        """
     # 1) Set blinds and start round
+        profiler = self.profiler
         self.start_new_round()
+        self.emit('hand_start', players=list(self.players))
         self.use_small_blind()
         self.use_big_blind()
+        profiler.mark('blinds')
 
         # 2) Deal each player 2 hole cards
         for player in self.players:
             self.deal_cards_to_player(player, 2)
+        profiler.mark('deal')
         
         # Flag to decide whether to skip remaining betting rounds
         skip_betting = False
 
-        # 3) Pre-Flop betting
-        self.initial_betting_sequence()
-        self.calculate_all_in_amounts()
+        # 3) Pre-Flop betting: the player after the big blind starts and the big blind (player[1]) acts last
+        yield self.start_betting(2 % len(self.players))
         if self.check_for_all_ins():
             skip_betting = True
+        profiler.mark('preflop')
         if self.if_everyone_folds():
                 return
 
         # 4) Flop
         self.deck.deal_flop()
-        print("Flop:", self.deck.get_community_cards())
+        self.street = FLOP
+        self.emit('flop', cards=list(self.deck.community))
         if not skip_betting:
             self.reset_all_players_last_bets()
             self.reset_current_bet()
-            self.post_betting_sequence()
-            self.calculate_all_in_amounts()
+            yield self.start_betting(0)  # every non-folded player, starting from player[0]
             if self.check_for_all_ins():
                 skip_betting = True
+        profiler.mark('flop')
         if self.if_everyone_folds():
             return
 
         # 5) Turn
         self.deck.deal_turn()
-        print("Community Cards:", self.deck.get_community_cards())
+        self.street = TURN
+        self.emit('turn', cards=list(self.deck.community))
         if not skip_betting:
             self.reset_all_players_last_bets()
             self.reset_current_bet()
-            self.post_betting_sequence()
-            self.calculate_all_in_amounts()
+            yield self.start_betting(0)  # every non-folded player, starting from player[0]
             if self.check_for_all_ins():
                 skip_betting = True
+        profiler.mark('turn')
         if self.if_everyone_folds():
             return
 
         # 6) River
         self.deck.deal_river()
-        print("Community Cards:", self.deck.get_community_cards())
+        self.street = RIVER
+        self.emit('river', cards=list(self.deck.community))
         if not skip_betting:
             self.reset_all_players_last_bets()
             self.reset_current_bet()
-            self.post_betting_sequence()
-            self.calculate_all_in_amounts()
+            yield self.start_betting(0)  # every non-folded player, starting from player[0]
+        profiler.mark('river')
         if self.if_everyone_folds():
             return
 
-        # 7) Sort all-in players if needed
-        self.sort_players_all_in()
+        # 7) Showdown: pay the main pot and any side pots
+        self.showdown()
+        profiler.mark('showdown')
+        self.emit('stacks', players=list(self.players))
+        self.emit('hand_end', players=list(self.players), cards=list(self.deck.community), showdown=True,
+                  actions=self.actions)
+        
+        self.rotate_players()
+
+    def play(self, max_hands: int) -> int:
+        """
+        Play rounds back to back without asking anyone whether to go on, until
+        max_hands have been played or fewer than 2 players have money left.
+        Returns how many hands were played.
+        """
+        hands_played = 0
+        while hands_played < max_hands and len(self.players) >= 2:
+            self.play_one_round()
+            hands_played += 1
+            self.remove_busted_players()
+        return hands_played
 
-        # 8) Determine the winner (showdown)
-        self.determine_winner(self.deck)
+# SNAPSHOTS
 
-        # 9) Award pot
-        self.award_money_to_winner()
+    def snapshot(self, with_rng: bool = False) -> tuple:
+        """
+        The whole state of the hand in progress as one flat tuple, e.g. to try
+        something out (a rollout, "what if he had called") and go back:
+
+            saved = game.snapshot()
+            game.betting.act(call)           # or deal the turn, play it out...
+            game.restore(saved)              # as if nothing happened
+
+        Layout (SNAPSHOT_HEADER fields, then SNAPSHOT_PLAYER fields per player):
+            pot, current_bet, winner_determined, winners, players (in seat order),
+            dealt, deck order (bytes), community (bytes), community mask,
+            the betting round's 6 fields (BettingRound.snapshot, or None each),
+            deck rng state (only with with_rng=True, else None),
+            street, number of actions so far (restore() drops the later ones)
+            per player: money, last_bet, total_contribution, beginning_money,
+                        folded | all_in << 1, hand (bytes), hand mask
+
+        The cards still to come are not fixed by the snapshot: they are picked
+        from the rest of the deck when dealt, so every rollout from the same
+        snapshot sees a fresh runout. with_rng=True saves the deck's random
+        state too, to deal exactly the same cards again after restore()
+        (costs about as much as the rest; only sensible with a Game of its own rng).
+
+        Player objects are referenced, not copied: restore() into the same Game.
+        """
+        deck = self.deck
+        betting = self.betting
+        state = [self.pot, self.current_bet, self.winner_determined, tuple(self.winner), tuple(self.players),
+                 deck.dealt, bytes(deck.cards), bytes(deck.community), deck.community_mask]
+        state += betting.snapshot() if betting is not None else NO_BETTING
+        state += (deck.rng.getstate() if with_rng else None, self.street, len(self.actions))
         for player in self.players:
-            print(player.money)
-        
-        self.rotate_players()
+            state += (player.money, player.last_bet, player.total_contribution, player.beginning_money,
+                      player.is_folded | player.is_all_in << 1, bytes(player.hand), player.hand_mask)
+        return tuple(state)
+
+    def restore(self, state: tuple):
+        # Put back a snapshot() of this Game
+        deck = self.deck
+        (self.pot, self.current_bet, self.winner_determined, winners, players,
+         deck.dealt, cards, community, deck.community_mask) = state[:9]
+        self.winner = list(winners)
+        self.players = list(players)
+        deck.cards[:] = cards
+        deck.community = list(community)
+        betting = state[9:15]
+        self.betting = BettingRound.from_snapshot(self, betting) if betting[0] is not None else None
+        if state[15] is not None:
+            deck.rng.setstate(state[15])
+        self.street = state[16]
+        del self.actions[state[17]:]
+        i = SNAPSHOT_HEADER
+        for player in self.players:
+            (player.money, player.last_bet, player.total_contribution, player.beginning_money,
+             flags, hand, player.hand_mask) = state[i:i + SNAPSHOT_PLAYER]
+            player.is_folded = bool(flags & 1)
+            player.is_all_in = bool(flags & 2)
+            player.hand[:] = hand
+            i += SNAPSHOT_PLAYER
 
 
+NO_BETTING = (None,) * 6
+SNAPSHOT_HEADER = 18  # fields before the first player's in a snapshot
+SNAPSHOT_PLAYER = 7  # fields per player
 
 
-main()
\ No newline at end of file
+if __name__ == "__main__":
+    main()
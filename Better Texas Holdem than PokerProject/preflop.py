@@ -0,0 +1,213 @@
+"""
+Precomputed preflop equity tables.
+
+There are only 169 different starting hands once suits are ignored
+(13 pairs, 78 suited and 78 offsuit hands), so preflop equity is worked out
+once and saved to a small binary file:
+
+    python preflop.py --trials 2000 --workers 8
+
+At runtime PreflopTable opens that file with mmap. Nothing is computed at
+startup, a lookup is one struct.unpack_from() call, and every process that
+opens the file shares the same pages through the OS page cache.
+
+File layout (little endian):
+    header       4s I I I I   magic b'PFEQ', version, classes (169), trials, number of field sizes
+    field sizes  I * n        e.g. 2, 3, ... 10 players
+    heads up     f * 169*169  equity of the row class against the column class
+    field        f * 169*n    equity of each class against (players - 1) random hands
+
+Building the tables uses NumPy (batch_eval.py); reading them does not.
+"""
+import os
+import mmap
+import struct
+import argparse
+from typing import Dict, List, Optional, Sequence, Tuple
+from concurrent.futures import ProcessPoolExecutor
+
+from cards import RANKS, AnyCard, to_card
+
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'preflop_equity.bin')
+MAGIC = b'PFEQ'
+VERSION = 1
+HEADER = struct.Struct('<4sIIII')
+NUM_CLASSES = 169
+FIELD_SIZES = (2, 3, 4, 5, 6, 7, 8, 9, 10)
+
+
+# -----------------------------------------
+# Starting hand classes
+# -----------------------------------------
+# Classes sit on the usual 13x13 grid with aces first: the diagonal holds the
+# pairs, above it the suited hands and below it the offsuit hands.
+# class index = row * 13 + column
+
+def hand_class(card1: AnyCard, card2: AnyCard) -> int:
+    card1 = to_card(card1)
+    card2 = to_card(card2)
+    high = max(card1 % 13, card2 % 13)
+    low = min(card1 % 13, card2 % 13)
+    if high == low or card1 // 13 != card2 // 13:
+        # pairs and offsuit hands: row from the low card
+        return (12 - low) * 13 + (12 - high)
+    return (12 - high) * 13 + (12 - low)
+
+
+def class_name(index: int) -> str:
+    # 0 -> 'AA', 1 -> 'AKs', 13 -> 'AKo'
+    row, column = divmod(index, 13)
+    high = 12 - min(row, column)
+    low = 12 - max(row, column)
+    if row == column:
+        return RANKS[high] * 2
+    return RANKS[high] + RANKS[low] + ('s' if row < column else 'o')
+
+
+def class_combos(index: int) -> List[Tuple[int, int]]:
+    # Every actual 2-card hand (int cards) in a class: 6 for pairs, 4 suited, 12 offsuit
+    row, column = divmod(index, 13)
+    high = 12 - min(row, column)
+    low = 12 - max(row, column)
+    combos = []
+    for suit1 in range(4):
+        for suit2 in range(4):
+            if row == column and suit2 <= suit1:
+                continue
+            if row < column and suit1 != suit2:
+                continue
+            if row > column and suit1 == suit2:
+                continue
+            combos.append((suit1 * 13 + high, suit2 * 13 + low))
+    return combos
+
+
+# -----------------------------------------
+# Building the tables (NumPy, one process per hero class)
+# -----------------------------------------
+
+def _class_rows(hero_class: int, trials: int, field_sizes: Sequence[int], seed: int):
+    """
+    Monte Carlo equity of one class against every class with a bigger index
+    (the rest is filled in by symmetry) and against random fields.
+    Returns (heads_up_row, field_row) as lists of floats.
+    """
+    import numpy as np
+    from batch_eval import evaluate_batch, shuffled_decks
+
+    rng = np.random.default_rng([seed, hero_class])
+    hero_combos = class_combos(hero_class)
+
+    heads_up = [0.0] * NUM_CLASSES
+    for villain_class in range(hero_class, NUM_CLASSES):
+        pairs = np.array([hero + villain for hero in hero_combos for villain in class_combos(villain_class)
+                          if not set(hero) & set(villain)])
+        hole = pairs[rng.integers(len(pairs), size=trials)]
+        # Board: 5 random cards that are not in either hand
+        board = shuffled_decks(trials, 5, rng, dead=hole)
+        hero = evaluate_batch(np.concatenate([hole[:, :2], board], axis=1))
+        villain = evaluate_batch(np.concatenate([hole[:, 2:], board], axis=1))
+        heads_up[villain_class] = float(np.mean((hero > villain) + 0.5 * (hero == villain)))
+
+    field = []
+    hero_choices = np.array(hero_combos)
+    for num_players in field_sizes:
+        hero_hole = hero_choices[rng.integers(len(hero_choices), size=trials)]
+        dealt = shuffled_decks(trials, 2 * (num_players - 1) + 5, rng, dead=hero_hole)
+        board = dealt[:, :5]
+        hero = evaluate_batch(np.concatenate([hero_hole, board], axis=1))
+        opponents = np.stack([evaluate_batch(np.concatenate([dealt[:, 5 + 2 * i:7 + 2 * i], board], axis=1))
+                              for i in range(num_players - 1)], axis=1)
+        best = opponents.max(axis=1)
+        tied = (opponents == best[:, None]).sum(axis=1)
+        share = np.where(hero > best, 1.0, np.where(hero == best, 1.0 / (tied + 1), 0.0))
+        field.append(float(share.mean()))
+    return heads_up, field
+
+
+def build_tables(path: str = DEFAULT_PATH, trials: int = 2000, workers: Optional[int] = None,
+                 field_sizes: Sequence[int] = FIELD_SIZES, seed: int = 0):
+    """
+    Work out every table with a process pool and write the binary file.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_class_rows, hero_class, trials, field_sizes, seed)
+                   for hero_class in range(NUM_CLASSES)]
+        results = [future.result() for future in futures]
+
+    heads_up = [row for row, field in results]
+    # Only hero <= villain was simulated, the other half is 1 - the mirror entry
+    for hero_class in range(NUM_CLASSES):
+        for villain_class in range(hero_class):
+            heads_up[hero_class][villain_class] = 1.0 - heads_up[villain_class][hero_class]
+
+    with open(path + '.tmp', 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, NUM_CLASSES, trials, len(field_sizes)))
+        f.write(struct.pack(f'<{len(field_sizes)}I', *field_sizes))
+        for row in heads_up:
+            f.write(struct.pack(f'<{NUM_CLASSES}f', *row))
+        for row, field in results:
+            f.write(struct.pack(f'<{len(field_sizes)}f', *field))
+    os.replace(path + '.tmp', path)
+
+
+# -----------------------------------------
+# Reading the tables (mmap, no NumPy)
+# -----------------------------------------
+
+class PreflopTable:
+    def __init__(self, path: str = DEFAULT_PATH):
+        with open(path, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, num_classes, self.trials, num_fields = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION or num_classes != NUM_CLASSES:
+            raise ValueError(f"{path} is not a preflop equity table this version can read")
+        self.field_sizes = list(struct.unpack_from(f'<{num_fields}I', self.mm, HEADER.size))
+        self.heads_up_offset = HEADER.size + 4 * num_fields
+        self.field_offset = self.heads_up_offset + 4 * NUM_CLASSES * NUM_CLASSES
+
+    def heads_up(self, hero_class: int, villain_class: int) -> float:
+        # Equity of one starting hand class against another
+        offset = self.heads_up_offset + 4 * (hero_class * NUM_CLASSES + villain_class)
+        return struct.unpack_from('<f', self.mm, offset)[0]
+
+    def vs_field(self, hero_class: int, num_players: int) -> float:
+        # Equity against (num_players - 1) random hands
+        column = self.field_sizes.index(num_players)
+        offset = self.field_offset + 4 * (hero_class * len(self.field_sizes) + column)
+        return struct.unpack_from('<f', self.mm, offset)[0]
+
+    def hand_equity(self, hand: Sequence[AnyCard], num_players: int) -> float:
+        return self.vs_field(hand_class(hand[0], hand[1]), num_players)
+
+    def close(self):
+        self.mm.close()
+
+
+_open_tables: Dict[str, PreflopTable] = {}
+
+
+def load_preflop_table(path: str = DEFAULT_PATH) -> Optional[PreflopTable]:
+    # The table file is optional: without it the game just doesn't show preflop equity.
+    # Every Game in the process shares one PreflopTable (one mmap) per file.
+    if path not in _open_tables:
+        if not os.path.exists(path):
+            return None
+        _open_tables[path] = PreflopTable(path)
+    return _open_tables[path]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the preflop equity table file.")
+    parser.add_argument('--out', default=DEFAULT_PATH, help="where to write the table file")
+    parser.add_argument('--trials', type=int, default=2000, help="random boards per matchup")
+    parser.add_argument('--workers', type=int, default=None, help="processes to use (default: all cores)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    build_tables(args.out, args.trials, args.workers, seed=args.seed)
+    print(f"Wrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
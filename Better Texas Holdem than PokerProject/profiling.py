@@ -0,0 +1,183 @@
+"""
+Per-phase timing and counters for Game.play_one_round().
+
+    profiler = Profiler(PrometheusFileSink('poker.prom'), flush_every=1000)
+    game = Game(6, providers=bots, profiler=profiler)
+    game.play(100_000)
+    profiler.flush()
+    profiler.snapshot()['phases']['preflop']  -> {'count': ..., 'seconds': ..., 'max': ...}
+
+A hand is timed as a row of laps. play_one_round() calls mark(phase) when a
+phase is over and the time since the previous mark goes to that phase:
+
+    blinds, deal, preflop, flop, turn, river, showdown, finish
+
+(finish is paying a hand everyone folded to, the end-of-hand events and
+moving the button). Hands that end early simply have fewer phases.
+
+Counters: hands, bets (accepted bets, calls and raises), raises, reprompts
+(answers bet() turned down) and evaluations (hands scored at showdown).
+
+Game uses a NullProfiler when it isn't given one. Its methods do nothing and
+the per-bet counters are behind a check of profiler.enabled, so leaving the
+hooks in costs a few no-op calls per hand.
+
+A sink gets a snapshot (plain dict) every flush_every hands and on flush():
+MemorySink keeps them, JsonFileSink and PrometheusFileSink rewrite a file.
+"""
+import os
+import json
+import time
+from typing import Dict, List, Optional
+
+
+# ----- sinks -----
+
+class ProfileSink:
+    def write(self, snapshot: Dict):
+        raise NotImplementedError
+
+
+class MemorySink(ProfileSink):
+    # Keeps every snapshot in a list
+    def __init__(self):
+        self.snapshots: List[Dict] = []
+
+    def write(self, snapshot: Dict):
+        self.snapshots.append(snapshot)
+
+
+def _replace_file(path: str, text: str):
+    # Write next to the file and swap it in, so a reader never sees half a file
+    temporary = path + '.tmp'
+    with open(temporary, 'w') as f:
+        f.write(text)
+    os.replace(temporary, path)
+
+
+class JsonFileSink(ProfileSink):
+    # Rewrites 'path' with the latest snapshot as JSON
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, snapshot: Dict):
+        _replace_file(self.path, json.dumps(snapshot, indent=2))
+
+
+class PrometheusFileSink(ProfileSink):
+    """
+    Rewrites 'path' in the Prometheus text exposition format, e.g. for the
+    node exporter's textfile collector.
+    """
+    def __init__(self, path: str, prefix: str = 'poker'):
+        self.path = path
+        self.prefix = prefix
+
+    def write(self, snapshot: Dict):
+        _replace_file(self.path, prometheus_text(snapshot, self.prefix))
+
+
+def prometheus_text(snapshot: Dict, prefix: str = 'poker') -> str:
+    lines = [
+        f"# HELP {prefix}_phase_seconds_total Time spent in each phase of play_one_round.",
+        f"# TYPE {prefix}_phase_seconds_total counter",
+    ]
+    phases = snapshot['phases']
+    for phase, stats in phases.items():
+        lines.append(f'{prefix}_phase_seconds_total{{phase="{phase}"}} {stats["seconds"]:.9f}')
+    lines += [
+        f"# HELP {prefix}_phase_runs_total Times each phase of play_one_round ran.",
+        f"# TYPE {prefix}_phase_runs_total counter",
+    ]
+    for phase, stats in phases.items():
+        lines.append(f'{prefix}_phase_runs_total{{phase="{phase}"}} {stats["count"]}')
+    lines += [
+        f"# HELP {prefix}_phase_max_seconds Longest single run of each phase.",
+        f"# TYPE {prefix}_phase_max_seconds gauge",
+    ]
+    for phase, stats in phases.items():
+        lines.append(f'{prefix}_phase_max_seconds{{phase="{phase}"}} {stats["max"]:.9f}')
+    for name, value in snapshot['counters'].items():
+        lines += [
+            f"# TYPE {prefix}_{name}_total counter",
+            f"{prefix}_{name}_total {value}",
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+# ----- profilers -----
+
+class NullProfiler:
+    # What Game uses when profiling is off: every hook does nothing
+    enabled = False
+
+    def start_hand(self):
+        pass
+
+    def mark(self, phase: str):
+        pass
+
+    def count(self, name: str, amount: int = 1):
+        pass
+
+    def end_hand(self):
+        pass
+
+
+class Profiler(NullProfiler):
+    """
+    Adds up time per phase and counters over every hand, and hands a
+    snapshot to 'sink' every flush_every hands (never if sink is None; read
+    snapshot() yourself then).
+    """
+    enabled = True
+
+    def __init__(self, sink: Optional[ProfileSink] = None, flush_every: int = 1000):
+        self.sink = sink
+        self.flush_every = flush_every
+        self.clock = time.perf_counter
+        self.phase_seconds: Dict[str, float] = {}
+        self.phase_counts: Dict[str, int] = {}
+        self.phase_max: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {'hands': 0, 'bets': 0, 'raises': 0, 'reprompts': 0, 'evaluations': 0}
+        self.last_mark = 0.0
+
+    def start_hand(self):
+        self.last_mark = self.clock()
+
+    def mark(self, phase: str):
+        now = self.clock()
+        elapsed = now - self.last_mark
+        self.last_mark = now
+        if phase in self.phase_seconds:
+            self.phase_seconds[phase] += elapsed
+            self.phase_counts[phase] += 1
+            if elapsed > self.phase_max[phase]:
+                self.phase_max[phase] = elapsed
+        else:
+            self.phase_seconds[phase] = elapsed
+            self.phase_counts[phase] = 1
+            self.phase_max[phase] = elapsed
+
+    def count(self, name: str, amount: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def end_hand(self):
+        self.mark('finish')
+        self.counters['hands'] += 1
+        if self.sink is not None and self.counters['hands'] % self.flush_every == 0:
+            self.flush()
+
+    def snapshot(self) -> Dict:
+        return {
+            'time': time.time(),
+            'phases': {phase: {'count': self.phase_counts[phase],
+                               'seconds': self.phase_seconds[phase],
+                               'max': self.phase_max[phase]}
+                       for phase in self.phase_seconds},
+            'counters': dict(self.counters),
+        }
+
+    def flush(self):
+        if self.sink is not None:
+            self.sink.write(self.snapshot())
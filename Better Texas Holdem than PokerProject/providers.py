@@ -0,0 +1,226 @@
+"""
+Action providers and event listeners for Game.
+
+Game never calls input() or print() itself. Every decision comes from the
+player's action provider and everything that happens is sent to an optional
+listener, so the same engine can run a console game or bots playing each
+other as fast as possible.
+
+An action provider has:
+
+    get_name(seat)                      -> name for a new player
+    get_action(game, player, attempt)   -> how many cents MORE to put in on top
+                                           of player.last_bet (0 = check, or
+                                           fold if there is a bet to match)
+
+'attempt' counts how many answers Game has already turned down for this
+decision, so a bot can fall back to something always legal instead of looping.
+
+A listener has on_event(event, data), where data is a dict; see MESSAGES
+below for every event and what it carries.
+"""
+import random
+from typing import Dict, Iterable, List, Optional
+
+from cards import cards_to_text
+from chips import to_cents, format_chips
+from handeval import CATEGORY_NAMES
+
+
+# -----------------------------------------
+# Action providers
+# -----------------------------------------
+
+class ActionProvider:
+    def get_name(self, seat: int) -> str:
+        return f"Player {seat + 1}"
+
+    def get_action(self, game, player, attempt: int) -> int:
+        raise NotImplementedError
+
+
+class ConsoleProvider(ActionProvider):
+    """
+    A human at the keyboard. Shows the player's hand and the table and reads
+    the amount with input(). Amounts are shown and typed in dollars.
+    """
+    def get_name(self, seat: int) -> str:
+        return input(f"Enter name for Player {seat + 1}: ")
+
+    def get_action(self, game, player, attempt: int) -> int:
+        additional_amount = game.current_bet - player.last_bet
+        if additional_amount > 0:
+            to_call = f'{format_chips(additional_amount)} more to call -> '
+        else:
+            to_call = '0 to check -> '
+        equity = game.preflop_equity_text(player) if not game.deck.community else ''
+        while True:
+            try:
+                prompt_msg = (f'{player.name}: {player.show_hand()}, {equity}money: {format_chips(player.money)}, '
+                              f'pot: {format_chips(game.pot)}, current bet: {format_chips(game.current_bet)}, '
+                              f'{to_call}')
+                return to_cents(input(prompt_msg))
+            except ValueError:
+                print("Invalid input. Please enter a valid number.")
+
+
+class ScriptedProvider(ActionProvider):
+    """
+    Plays back a fixed list of amounts (cents), one per decision, in the order
+    they are asked for. Handy for replays and for reproducing a hand exactly.
+    """
+    def __init__(self, amounts: Iterable[int], names: Optional[List[str]] = None):
+        self.amounts = iter(amounts)
+        self.names = names
+
+    def get_name(self, seat: int) -> str:
+        if self.names is not None:
+            return self.names[seat]
+        return super().get_name(seat)
+
+    def get_action(self, game, player, attempt: int) -> int:
+        try:
+            return next(self.amounts)
+        except StopIteration:
+            raise RuntimeError(f"the script ran out of actions when {player.name} had to act")
+
+
+def call_amount(game, player) -> int:
+    # What a call costs right now (the whole stack if that is all the player has)
+    return min(game.current_bet - player.last_bet, player.money)
+
+
+def min_raise_amount(game, player) -> int:
+    # Smallest legal raise on top of last_bet (the bet rule: at least double the current bet)
+    if game.current_bet == 0:
+        return min(game.big_blind, player.money)
+    return min(2 * game.current_bet - player.last_bet, player.money)
+
+
+class CallingBot(ActionProvider):
+    # Never folds and never raises: checks when it can, otherwise calls
+    def get_name(self, seat: int) -> str:
+        return f"Bot {seat + 1}"
+
+    def get_action(self, game, player, attempt: int) -> int:
+        if attempt:
+            return 0
+        return call_amount(game, player)
+
+
+class RandomBot(ActionProvider):
+    """
+    Picks fold / call / raise / all in at random with the given weights.
+    Takes its own seed so self-play runs can be repeated exactly.
+    """
+    def __init__(self, seed: Optional[int] = None, fold: float = 0.15, call: float = 0.6,
+                 raise_: float = 0.2, all_in: float = 0.05):
+        self.rng = random.Random(seed)
+        # Cumulative cut-offs, so a decision is one rng.random() call
+        total = fold + call + raise_ + all_in
+        self.fold_below = fold / total
+        self.call_below = (fold + call) / total
+        self.raise_below = (fold + call + raise_) / total
+
+    def get_name(self, seat: int) -> str:
+        return f"Bot {seat + 1}"
+
+    def get_action(self, game, player, attempt: int) -> int:
+        if attempt:
+            return 0  # always legal: a check, or a fold if there is a bet to match
+        roll = self.rng.random()
+        if roll < self.fold_below:
+            return 0
+        if roll < self.call_below:
+            return call_amount(game, player)
+        if roll < self.raise_below:
+            return min_raise_amount(game, player)
+        return player.money
+
+
+# -----------------------------------------
+# Listeners
+# -----------------------------------------
+
+# Text ConsoleListener prints for every event Game sends (amounts already in dollars)
+MESSAGES = {
+    'invalid_amount': "Invalid input! Please enter a valid numeric amount.",
+    'check': "{player.name} checks",
+    'fold': "{player.name} folds",
+    'all_in': "{player.name} is all in!",
+    'negative_amount': "{player.name}, negative amounts not allowed",
+    'not_enough_money': "You do not have enough money to bet {amount}, your available money is {money}",
+    'under_call': "{player.name}, not enough to match the current bet. Type 0 to fold.",
+    'raise_too_small': "Raise must be at least double the current bet.",
+    'flop': "Flop: {cards}",
+    'turn': "Community Cards: {cards}",
+    'river': "Community Cards: {cards}",
+    'everyone_folded': "\n** The winner is {player.name} (all other players folded) **",
+    'showdown_winner': ("\n** The winner is {winners[0].name} **\n"
+                        "Winning hand category: {category} ({category_name})\n"
+                        "Tiebreakers: {tiebreakers}"),
+    'showdown_tie': ("\n** It's a tie among: {names} **\n"
+                     "Hand category: {category} ({category_name})\n"
+                     "Tiebreakers: {tiebreakers}"),
+    'pot_won': "{player.name} wins the pot of {pot}!",
+    'pot_split': "{names} split the pot of {pot} (each gets {share})!",
+    'stacks': "{stacks}",
+    'busted': "{player.name} is out of money and removed from the game.",
+}
+
+
+class GameListener:
+    # Base listener, ignores everything.
+    # wants_actions = False skips the check/fold/bet/all_in events (the most
+    # frequent ones) for a listener that only needs 'hand_end', which carries
+    # every action of the hand anyway (see Game.actions).
+    wants_actions = True
+
+    def on_event(self, event: str, data: Dict):
+        pass
+
+
+class ConsoleListener(GameListener):
+    # Prints what happens at the table, the same way the console game always has
+    def on_event(self, event: str, data: Dict):
+        if event not in MESSAGES:
+            return
+        data = dict(data)
+        if 'cards' in data:
+            data['cards'] = cards_to_text(data['cards'])
+        if 'winners' in data:
+            data['names'] = ', '.join(player.name for player in data['winners'])
+        if 'category' in data:
+            data['category_name'] = CATEGORY_NAMES[data['category']]
+        if 'players' in data:
+            data['stacks'] = '\n'.join(format_chips(player.money) for player in data['players'])
+        if 'player' in data:
+            data['money'] = format_chips(data['player'].money)
+        # Chips only turn into dollars here, when they are shown
+        for key in ('amount', 'pot', 'share'):
+            if isinstance(data.get(key), int):
+                data[key] = format_chips(data[key])
+        print(MESSAGES[event].format(**data))
+
+
+class MultiListener(GameListener):
+    # Passes every event on to several listeners, e.g. the console and a hand history writer
+    def __init__(self, listeners: List[GameListener]):
+        self.listeners = listeners
+
+    @property
+    def wants_actions(self) -> bool:
+        return any(listener.wants_actions for listener in self.listeners)
+
+    def on_event(self, event: str, data: Dict):
+        for listener in self.listeners:
+            listener.on_event(event, data)
+
+
+class EventLog(GameListener):
+    # Keeps every (event, data) pair in a list, e.g. to check what a scripted hand did
+    def __init__(self):
+        self.events = []
+
+    def on_event(self, event: str, data: Dict):
+        self.events.append((event, data))
@@ -0,0 +1,481 @@
+"""
+Weighted hand ranges and range-vs-range equity.
+
+    hero = parse_range("top 15%")
+    villain = parse_range("22+, AJs+, KQs:0.5")
+    result = range_equity(hero, villain, board=[card_from_text(c) for c in ('AS', '7D', '2C')])
+    result.equity               -> hero's share of the pot against the whole range
+    result.class_equity()       -> {'AA': 0.93, 'AKs': 0.71, ...}
+
+Range notation (comma separated, case of the suited/offsuit letter ignored):
+
+    AA  AKs  AKo  AK        one class (AK = suited and offsuit)
+    TT+  ATs+  KT+          the pair and every bigger pair / raise the low card up to one below the high card
+    22-55  A2s-A5s  98s-65s everything from one to the other (same high card or same gap)
+    AsKs                    one exact combo
+    15%  top 15%            the best 15% of all 1326 combos (see RANKING)
+    <any of those>:0.5      only half the combos' weight, e.g. as a mixed strategy
+
+A later token sets the weight again for combos an earlier token already
+had, so "AA+:0.5, AA" is AA at full weight.
+
+range_equity() weighs every hero combo against every villain combo that
+shares no card with it (or with the board and dead cards), each pair by
+hero weight * villain weight. mode='exact' goes through every runout of the
+board; mode='sample' deals random (hero, villain, runout) triples. Both
+score whole arrays with batch_eval.evaluate_batch(), there is no Python
+loop per combo or per pair.
+
+Exact mode scores all combos of both ranges on a chunk of runouts at once,
+then counts, for every hero combo, the villain weight below and equal to it
+with one sort and a cumulative sum over the villain strengths. Pairs that
+share a card are taken back out afterwards (there are at most 101 of those
+per hero combo). A flop query between two typical ranges takes a fraction
+of a second. A preflop board has about 1.7 million runouts, which is what
+mode='auto' uses sampling for.
+"""
+import re
+import argparse
+from itertools import combinations
+from math import comb
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from batch_eval import evaluate_batch, shuffled_decks
+from cards import RANKS, AnyCard, card_from_text, cards_to_mask, mask_to_cards, to_card
+from preflop import NUM_CLASSES, class_combos, class_name, hand_class
+
+
+NUM_COMBOS = 1326
+MAX_EXACT_RUNOUTS = 50_000  # more runouts than this (preflop) and mode='auto' samples
+CHUNK_ROWS = 1 << 20  # rows (runouts * combos) scored at once in exact mode
+FILLER_HAND = np.arange(7, dtype=np.int8)
+STRENGTH_BITS = 24  # every strength is below 1 << 24, so row * (1 << 24) + strength sorts by row first
+
+# All 169 classes, best first, by all-in equity against one random hand
+RANKING = (
+    "AA KK QQ JJ TT 99 88 AKs 77 AQs AJs AKo ATs AQo AJo KQs 66 ATo A9s KJs A8s KTs KQo A7s A9o KJo "
+    "QJs 55 A8o K9s A6s A5s KTo QTs A7o A4s K8s QJo A3s K9o K7s Q9s A5o A6o JTs QTo A2s 44 A4o K6s "
+    "Q8s K8o A3o K5s J9s Q9o JTo K7o K4s A2o K6o K3s Q7s J8s T9s 33 Q8o Q6s K5o J9o K2s Q5s J7s K4o "
+    "T8s Q7o Q4s T9o K3o J8o Q6o Q3s 98s T7s K2o J6s 22 J5s Q2s Q5o T8o J7o Q4o 97s J4s T6s 98o Q3o "
+    "J3s T7o 87s J6o 96s J2s Q2o T5s J5o T4s 97o 86s J4o T6o T3s 95s 76s J3o 87o T2s 85s J2o 96o "
+    "T5o 94s T4o 75s 93s 65s 86o 84s 95o T3o 92s 76o 74s T2o 85o 64s 54s 83s 75o 94o 82s 65o 73s "
+    "93o 63s 53s 84o 92o 43s 74o 72s 54o 52s 64o 62s 83o 42s 82o 73o 53o 32s 63o 43o 72o 52o 62o "
+    "42o 32o"
+).split()
+
+CLASS_INDEX = {class_name(index): index for index in range(NUM_CLASSES)}
+
+Combo = Tuple[int, int]  # (higher int card, lower int card)
+
+
+def make_combo(card1: AnyCard, card2: AnyCard) -> Combo:
+    card1 = to_card(card1)
+    card2 = to_card(card2)
+    if card1 == card2:
+        raise ValueError("a combo needs two different cards")
+    return (card1, card2) if card1 > card2 else (card2, card1)
+
+
+# -----------------------------------------
+# Ranges
+# -----------------------------------------
+
+class Range:
+    """
+    A weight between 0 and 1 for every combo in the range (combos that are
+    not in it are simply missing).
+    """
+    def __init__(self, weights: Optional[Dict[Combo, float]] = None):
+        self.weights: Dict[Combo, float] = {}
+        for (card1, card2), weight in (weights or {}).items():
+            self.set(card1, card2, weight)
+
+    def set(self, card1: AnyCard, card2: AnyCard, weight: float = 1.0):
+        if not 0.0 <= weight <= 1.0:
+            raise ValueError(f"a combo weight must be between 0 and 1, got {weight}")
+        combo = make_combo(card1, card2)
+        if weight:
+            self.weights[combo] = weight
+        else:
+            self.weights.pop(combo, None)
+
+    def set_class(self, index: int, weight: float = 1.0):
+        for card1, card2 in class_combos(index):
+            self.set(card1, card2, weight)
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def size(self) -> float:
+        # Weighted number of combos, e.g. AA at weight 0.5 counts 3
+        return sum(self.weights.values())
+
+    def combos(self, dead: Sequence[AnyCard] = ()) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Every combo that shares no card with 'dead' (usually the board), as an
+        (n, 2) int8 array of cards and an (n,) array of weights.
+        """
+        dead_mask = cards_to_mask(dead)
+        live = [(combo, weight) for combo, weight in sorted(self.weights.items())
+                if not (1 << combo[0] | 1 << combo[1]) & dead_mask]
+        cards = np.array([combo for combo, weight in live], dtype=np.int8).reshape(-1, 2)
+        weights = np.array([weight for combo, weight in live], dtype=np.float64)
+        return cards, weights
+
+
+def _class_run(first: str, last: Optional[str]) -> List[int]:
+    """
+    Classes from 'first' up to 'last': both pairs, the same high card
+    (A2s-A5s) or the same gap between the cards (98s-65s). With last=None,
+    up to the top of first's run: AA for a pair, one below the high card
+    otherwise. A plain 'AK' (no s/o) means both.
+    """
+    def split(name: str) -> Tuple[int, int, str]:
+        if len(name) not in (2, 3) or name[0] not in RANKS or name[1] not in RANKS:
+            raise ValueError(f"can't read hand class '{name}'")
+        suffix = name[2:].lower()
+        if suffix not in ('', 's', 'o') or (name[0] == name[1] and suffix):
+            raise ValueError(f"can't read hand class '{name}'")
+        high, low = sorted((RANKS.index(name[0]), RANKS.index(name[1])), reverse=True)
+        return high, low, suffix
+
+    high, low, suffix = split(first)
+    gap = 0  # how much the high card moves along with the low card
+    if last is None:
+        top_low = 12 if high == low else high - 1
+    else:
+        last_high, top_low, last_suffix = split(last)
+        if last_suffix != suffix or (high == low) != (last_high == top_low):
+            raise ValueError(f"can't make a range from {first} to {last}")
+        if high != low and last_high != high:
+            if last_high - top_low != high - low:
+                raise ValueError(f"can't make a range from {first} to {last}")
+            gap = 1
+        if top_low < low:
+            high, low, top_low = last_high, top_low, low
+
+    names = []
+    for rank in range(low, top_low + 1):
+        if high == low:
+            names.append(RANKS[rank] * 2)
+        else:
+            top = high + gap * (rank - low)
+            names += [RANKS[top] + RANKS[rank] + s for s in (suffix or 'so')]
+    return [CLASS_INDEX[name] for name in names]
+
+
+def _top_classes(percent: float) -> List[int]:
+    # The best classes in RANKING order that come closest to 'percent' of all combos
+    if not 0.0 <= percent <= 100.0:
+        raise ValueError(f"a range percentage must be between 0 and 100, got {percent}")
+    target = percent / 100.0 * NUM_COMBOS
+    chosen = []
+    total = 0
+    for name in RANKING:
+        index = CLASS_INDEX[name]
+        size = len(class_combos(index))
+        if abs(total + size - target) > abs(total - target):
+            break
+        chosen.append(index)
+        total += size
+    return chosen
+
+
+def parse_range(text: str) -> Range:
+    """
+    Read range notation (see the top of this file) into a Range.
+    """
+    result = Range()
+    for token in text.split(','):
+        token = token.strip()
+        if not token:
+            continue
+        weight = 1.0
+        if ':' in token:
+            token, weight_text = token.rsplit(':', 1)
+            try:
+                weight = float(weight_text)
+            except ValueError:
+                raise ValueError(f"can't read the weight in '{token}:{weight_text}'") from None
+        token = token.strip()
+        lowered = token.lower()
+
+        if lowered.endswith('%'):
+            number = lowered[3:] if lowered.startswith('top') else lowered
+            try:
+                classes = _top_classes(float(number.strip().rstrip('%')))
+            except ValueError as error:
+                raise ValueError(f"can't read range token '{token}': {error}") from None
+            for index in classes:
+                result.set_class(index, weight)
+        elif len(token) == 4 and token[1].upper() in 'SCHD' and token[3].upper() in 'SCHD':
+            # One exact combo like AsKs
+            result.set(card_from_text(token[:2]), card_from_text(token[2:]), weight)
+        else:
+            name = token[0:2].upper() + token[2:]
+            if name.endswith('+'):
+                classes = _class_run(name[:-1], None)
+            elif '-' in name:
+                first, last = name.split('-', 1)
+                classes = _class_run(first, last[0:2].upper() + last[2:])
+            else:
+                classes = _class_run(name, name)
+            for index in classes:
+                result.set_class(index, weight)
+    return result
+
+
+def as_range(value: Union[str, Range]) -> Range:
+    return parse_range(value) if isinstance(value, str) else value
+
+
+# -----------------------------------------
+# Equity
+# -----------------------------------------
+
+class RangeEquity:
+    """
+    Hero's result against the villain range.
+
+    cards, weights  - hero's live combos ((n, 2) int8) and their weights
+    wins, ties      - villain weight hero beat / tied, summed over runouts, per hero combo
+    totals          - villain weight hero faced, summed over runouts, per hero combo
+    trials          - runouts enumerated (exact) or (hero, villain, runout) samples dealt
+    """
+    def __init__(self, cards: np.ndarray, weights: np.ndarray, exact: bool, trials: int):
+        self.cards = cards
+        self.weights = weights
+        self.exact = exact
+        self.trials = trials
+        self.wins = np.zeros(len(cards))
+        self.ties = np.zeros(len(cards))
+        self.totals = np.zeros(len(cards))
+
+    def _share(self, values: np.ndarray) -> float:
+        total = float(self.weights @ self.totals)
+        return float(self.weights @ values) / total if total else 0.0
+
+    @property
+    def equity(self) -> float:
+        return self._share(self.wins + 0.5 * self.ties)
+
+    @property
+    def win(self) -> float:
+        return self._share(self.wins)
+
+    @property
+    def tie(self) -> float:
+        return self._share(self.ties)
+
+    @property
+    def combo_equity(self) -> np.ndarray:
+        # Equity of every hero combo (nan for a combo that never met a villain combo)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (self.wins + 0.5 * self.ties) / self.totals
+
+    def class_equity(self) -> Dict[str, float]:
+        # Equity per starting hand class, best class first
+        classes: Dict[int, List[float]] = {}
+        for (card1, card2), weight, wins, ties, total in zip(self.cards, self.weights, self.wins,
+                                                             self.ties, self.totals):
+            if total:
+                sums = classes.setdefault(hand_class(int(card1), int(card2)), [0.0, 0.0])
+                sums[0] += weight * (wins + 0.5 * ties)
+                sums[1] += weight * total
+        return {class_name(index): float(share / total) for index, (share, total) in sorted(classes.items())}
+
+
+def _card_masks(cards: np.ndarray) -> np.ndarray:
+    # One int64 card mask per row of an (n, k) card array
+    return np.left_shift(np.int64(1), cards.astype(np.int64)).sum(axis=1) if cards.shape[1] else \
+        np.zeros(len(cards), dtype=np.int64)
+
+
+def _shared_card_pairs(hero: np.ndarray, villain: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # (hero index, villain index) of every pair of combos with a card in common
+    holders = [[] for _ in range(52)]
+    for j, (card1, card2) in enumerate(villain.tolist()):
+        holders[card1].append(j)
+        holders[card2].append(j)
+    hero_index, villain_index = [], []
+    for i, (card1, card2) in enumerate(hero.tolist()):
+        blocked = set(holders[card1]) | set(holders[card2])
+        hero_index += [i] * len(blocked)
+        villain_index += blocked
+    return np.array(hero_index, dtype=np.int64), np.array(villain_index, dtype=np.int64)
+
+
+def _exact(result: RangeEquity, villain: np.ndarray, villain_weights: np.ndarray,
+           board: List[int], remaining: List[int]):
+    hero = result.cards
+    num_hero, num_villain = len(hero), len(villain)
+    runouts = list(combinations(remaining, 5 - len(board)))
+    runouts = np.array(runouts, dtype=np.int8).reshape(len(runouts), 5 - len(board))
+    result.trials = len(runouts)
+
+    # Score each combo once even if both ranges hold it
+    all_cards = np.concatenate([hero, villain])
+    unique, where, lookup = np.unique(all_cards[:, 0].astype(np.int64) * 52 + all_cards[:, 1],
+                                      return_index=True, return_inverse=True)
+    unique_cards = all_cards[where]
+    hero_column, villain_column = lookup[:num_hero], lookup[num_hero:]
+    unique_masks = _card_masks(unique_cards)
+    hero_masks, villain_masks = _card_masks(hero), _card_masks(villain)
+    blocked_hero, blocked_villain = _shared_card_pairs(hero, villain)
+
+    rows = max(1, CHUNK_ROWS // max(len(unique_cards), len(blocked_hero), 1))
+    board_cards = np.array(board, dtype=np.int8)
+    for start in range(0, len(runouts), rows):
+        chunk = runouts[start:start + rows]
+        num_runouts = len(chunk)
+        full_board = np.concatenate([np.broadcast_to(board_cards, (num_runouts, len(board))), chunk], axis=1)
+        seven = np.concatenate([np.broadcast_to(unique_cards[None], (num_runouts,) + unique_cards.shape),
+                                np.broadcast_to(full_board[:, None], (num_runouts, len(unique_cards), 5))], axis=2)
+        runout_masks = _card_masks(chunk)[:, None]
+        # A combo holding a runout card doesn't count on that runout, but it still has to be
+        # a real 7-card hand for evaluate_batch(), so score any 7 different cards instead
+        seven = np.where(((unique_masks[None] & runout_masks) != 0)[:, :, None], FILLER_HAND, seven)
+        strengths = evaluate_batch(seven.reshape(-1, 7)).reshape(num_runouts, -1).astype(np.int64)
+        hero_strength = strengths[:, hero_column]
+        villain_strength = strengths[:, villain_column]
+        hero_live = (hero_masks[None] & runout_masks) == 0
+        villain_weight = np.where((villain_masks[None] & runout_masks) == 0, villain_weights[None], 0.0)
+
+        # Villain weight below / equal to every hero combo: one sort over all runouts of the chunk
+        offsets = (np.arange(num_runouts, dtype=np.int64) << STRENGTH_BITS)[:, None]
+        villain_keys = (villain_strength + offsets).ravel()
+        order = np.argsort(villain_keys, kind='stable')
+        sorted_keys = villain_keys[order]
+        cumulative = np.concatenate([[0.0], np.cumsum(villain_weight.ravel()[order])])
+        hero_keys = (hero_strength + offsets).ravel()
+        below = cumulative[np.searchsorted(sorted_keys, hero_keys, 'left')]
+        up_to = cumulative[np.searchsorted(sorted_keys, hero_keys, 'right')]
+        # Each runout's villain combos fill exactly num_villain slots of the sorted keys
+        row_start = np.repeat(cumulative[np.arange(num_runouts) * num_villain], num_hero)
+        row_total = cumulative[(np.arange(num_runouts) + 1) * num_villain] - cumulative[np.arange(num_runouts) * num_villain]
+        wins = (below - row_start).reshape(num_runouts, num_hero)
+        ties = (up_to - below).reshape(num_runouts, num_hero)
+        result.wins += (wins * hero_live).sum(axis=0)
+        result.ties += (ties * hero_live).sum(axis=0)
+        result.totals += (row_total[:, None] * hero_live).sum(axis=0)
+
+        # Take back out the villain combos that share a card with the hero combo
+        if len(blocked_hero):
+            weight = villain_weight[:, blocked_villain] * hero_live[:, blocked_hero]
+            difference = hero_strength[:, blocked_hero] - villain_strength[:, blocked_villain]
+            result.wins -= np.bincount(blocked_hero, (weight * (difference > 0)).sum(axis=0), num_hero)
+            result.ties -= np.bincount(blocked_hero, (weight * (difference == 0)).sum(axis=0), num_hero)
+            result.totals -= np.bincount(blocked_hero, weight.sum(axis=0), num_hero)
+
+
+def _sample(result: RangeEquity, villain: np.ndarray, villain_weights: np.ndarray,
+            board: List[int], dead_mask: int, trials: int, rng: np.random.Generator):
+    hero = result.cards
+    hero_masks, villain_masks = _card_masks(hero), _card_masks(villain)
+    hero_p = result.weights / result.weights.sum()
+    villain_p = villain_weights / villain_weights.sum()
+
+    # Pick (hero, villain) pairs by weight, dealing again where the two share a card
+    hero_pick = rng.choice(len(hero), size=trials, p=hero_p)
+    villain_pick = rng.choice(len(villain), size=trials, p=villain_p)
+    for _ in range(1000):
+        clash = np.flatnonzero(hero_masks[hero_pick] & villain_masks[villain_pick])
+        if not len(clash):
+            break
+        hero_pick[clash] = rng.choice(len(hero), size=len(clash), p=hero_p)
+        villain_pick[clash] = rng.choice(len(villain), size=len(clash), p=villain_p)
+    else:
+        raise ValueError("every villain combo shares a card with every hero combo")
+
+    # Rest of the board from whatever neither player (nor the board / dead cards) holds
+    dead = np.concatenate([hero[hero_pick], villain[villain_pick],
+                           np.broadcast_to(np.array(mask_to_cards(dead_mask), dtype=np.int8),
+                                           (trials, bin(dead_mask).count('1')))], axis=1)
+    runout = shuffled_decks(trials, 5 - len(board), rng, dead=dead)
+    full_board = np.concatenate([np.broadcast_to(np.array(board, dtype=np.int8), (trials, len(board))), runout], axis=1)
+    hero_strength = evaluate_batch(np.concatenate([hero[hero_pick], full_board], axis=1))
+    villain_strength = evaluate_batch(np.concatenate([villain[villain_pick], full_board], axis=1))
+
+    # Picks already follow the weights, so every sample counts 1 (weights divide back out in _share)
+    scale = 1.0 / result.weights
+    result.wins += np.bincount(hero_pick, hero_strength > villain_strength, len(hero)) * scale
+    result.ties += np.bincount(hero_pick, hero_strength == villain_strength, len(hero)) * scale
+    result.totals += np.bincount(hero_pick, None, len(hero)) * scale
+    result.trials = trials
+
+
+def range_equity(hero: Union[str, Range], villain: Union[str, Range], board: Sequence[AnyCard] = (),
+                 dead: Sequence[AnyCard] = (), mode: str = 'auto', trials: int = 200_000,
+                 seed: Optional[int] = None) -> RangeEquity:
+    """
+    Equity of the hero range against the villain range.
+
+    hero, villain - Range objects or range notation
+    board         - community cards so far (0, 3, 4 or 5)
+    dead          - other cards known to be out of the deck
+    mode          - 'exact' (every runout), 'sample' (trials random deals) or
+                    'auto' (exact unless there are more than MAX_EXACT_RUNOUTS runouts)
+    seed          - for mode='sample', same seed => same answer
+    """
+    board = [to_card(card) for card in board]
+    if len(board) not in (0, 3, 4, 5):
+        raise ValueError("the board must have 0, 3, 4 or 5 cards")
+    known = board + [to_card(card) for card in dead]
+    dead_mask = cards_to_mask(known)
+    if bin(dead_mask).count('1') != len(known):
+        raise ValueError("the same card was given more than once")
+    if mode not in ('auto', 'exact', 'sample'):
+        raise ValueError(f"mode must be 'auto', 'exact' or 'sample', not {mode!r}")
+
+    hero_cards, hero_weights = as_range(hero).combos(known)
+    villain_cards, villain_weights = as_range(villain).combos(known)
+    if not len(hero_cards) or not len(villain_cards):
+        raise ValueError("a range has no combos left once the board and dead cards are taken out")
+
+    remaining = mask_to_cards(((1 << 52) - 1) & ~dead_mask)
+    runouts = comb(len(remaining), 5 - len(board))
+    if mode == 'auto':
+        mode = 'exact' if runouts <= MAX_EXACT_RUNOUTS else 'sample'
+    result = RangeEquity(hero_cards, hero_weights, mode == 'exact', 0)
+    if mode == 'exact':
+        _exact(result, villain_cards, villain_weights, board, remaining)
+    else:
+        _sample(result, villain_cards, villain_weights, board, dead_mask, trials, np.random.default_rng(seed))
+    if not result.totals.any():
+        raise ValueError("every villain combo shares a card with every hero combo")
+    return result
+
+
+def parse_cards(text: str) -> List[int]:
+    # 'AsKd7h' or 'As Kd 7h' -> int cards
+    text = re.sub(r'[\s,]', '', text)
+    if len(text) % 2:
+        raise ValueError(f"can't read cards '{text}'")
+    return [card_from_text(text[i:i + 2]) for i in range(0, len(text), 2)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Equity of one hand range against another.")
+    parser.add_argument('hero', help="hero's range, e.g. 'top 15%%'")
+    parser.add_argument('villain', help="villain's range, e.g. '22+, AJs+'")
+    parser.add_argument('--board', default='', help="community cards, e.g. AsKd7h")
+    parser.add_argument('--dead', default='', help="other cards out of the deck")
+    parser.add_argument('--mode', choices=('auto', 'exact', 'sample'), default='auto')
+    parser.add_argument('--trials', type=int, default=200_000, help="deals for --mode sample")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--classes', action='store_true', help="also print hero's equity per hand class")
+    args = parser.parse_args()
+
+    result = range_equity(args.hero, args.villain, parse_cards(args.board), parse_cards(args.dead),
+                          args.mode, args.trials, args.seed)
+    kind = 'runouts' if result.exact else 'samples'
+    print(f"hero {result.equity:.2%} (win {result.win:.2%}, tie {result.tie:.2%}) over {result.trials:,} {kind}")
+    if args.classes:
+        for name, equity in result.class_equity().items():
+            print(f"  {name:<4} {equity:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Multi-table self-play runner.
+
+Runs many independent headless Game tables of bots across a process pool:
+
+    python selfplay.py --tables 1000 --hands 200 --players 6 --workers 8
+
+Every table gets its own seed worked out from --seed and the table number,
+so a table plays exactly the same hands no matter which worker runs it.
+Each worker writes one line per table (final stacks in cents, hands played, showdowns)
+to its own shard file, shard-000.jsonl, shard-001.jsonl, ... so workers never
+share a file. When all workers are done merge_shards() combines the shards
+into results.json.
+"""
+import os
+import json
+import glob
+import time
+import random
+import argparse
+from typing import Dict, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+
+from pokergame import Game
+from providers import GameListener, RandomBot
+
+
+class ShowdownCounter(GameListener):
+    # Counts how hands ended, without keeping anything else
+    def __init__(self):
+        self.showdowns = 0
+        self.folded_out = 0
+
+    def on_event(self, event: str, data: Dict):
+        # 'stacks' is sent once at the end of every hand that went to showdown
+        # (the showdown_* events can come several times when players are all in)
+        if event == 'stacks':
+            self.showdowns += 1
+        elif event == 'everyone_folded':
+            self.folded_out += 1
+
+
+def table_seed(base_seed: int, table: int) -> int:
+    return base_seed * 1_000_003 + table
+
+
+def play_table(table: int, hands: int, num_players: int, base_seed: int) -> Dict:
+    """
+    Play one table of RandomBots and return its results.
+    """
+    seed = table_seed(base_seed, table)
+    counter = ShowdownCounter()
+    bots = [RandomBot(seed * 16 + seat) for seat in range(num_players)]
+    game = Game(num_players, names=[f"Bot {seat + 1}" for seat in range(num_players)],
+                providers=bots, listener=counter, rng=random.Random(seed))
+    # Busted players leave game.players, so keep our own list for the final stacks
+    seats = list(game.players)
+    hands_played = game.play(hands)
+    return {
+        'table': table,
+        'seed': seed,
+        'hands_played': hands_played,
+        'showdowns': counter.showdowns,
+        'folded_out': counter.folded_out,
+        'stacks': {player.name: player.money for player in seats},
+    }
+
+
+def run_worker(worker: int, tables: List[int], hands: int, num_players: int,
+               base_seed: int, out_dir: str) -> str:
+    # Play a slice of the tables and write them to this worker's own shard
+    path = os.path.join(out_dir, f"shard-{worker:03d}.jsonl")
+    with open(path, 'w') as f:
+        for table in tables:
+            f.write(json.dumps(play_table(table, hands, num_players, base_seed)) + '\n')
+    return path
+
+
+def merge_shards(out_dir: str) -> Dict:
+    """
+    Combine every shard in out_dir into one results.json (tables in order plus totals).
+    """
+    tables = []
+    for path in sorted(glob.glob(os.path.join(out_dir, "shard-*.jsonl"))):
+        with open(path) as f:
+            tables.extend(json.loads(line) for line in f if line.strip())
+    tables.sort(key=lambda result: result['table'])
+
+    merged = {
+        'tables': len(tables),
+        'hands_played': sum(result['hands_played'] for result in tables),
+        'showdowns': sum(result['showdowns'] for result in tables),
+        'folded_out': sum(result['folded_out'] for result in tables),
+        'total_chips': sum(sum(result['stacks'].values()) for result in tables),
+        'results': tables,
+    }
+    with open(os.path.join(out_dir, "results.json"), 'w') as f:
+        json.dump(merged, f)
+    return merged
+
+
+def run(tables: int, hands: int, num_players: int, workers: Optional[int] = None,
+        base_seed: int = 0, out_dir: str = "selfplay_results") -> Dict:
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, tables))
+    os.makedirs(out_dir, exist_ok=True)
+    for old_shard in glob.glob(os.path.join(out_dir, "shard-*.jsonl")):
+        os.remove(old_shard)
+
+    # Table i goes to worker i % workers, so every worker gets about the same load
+    slices = [list(range(worker, tables, workers)) for worker in range(workers)]
+    if workers == 1:
+        run_worker(0, slices[0], hands, num_players, base_seed, out_dir)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_worker, worker, slices[worker], hands, num_players, base_seed, out_dir)
+                       for worker in range(workers)]
+            for future in futures:
+                future.result()
+    return merge_shards(out_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many bot-only tables in parallel.")
+    parser.add_argument('--tables', type=int, default=100, help="number of tables")
+    parser.add_argument('--hands', type=int, default=100, help="hands per table")
+    parser.add_argument('--players', type=int, default=6, help="players per table")
+    parser.add_argument('--workers', type=int, default=None, help="processes to use (default: all cores)")
+    parser.add_argument('--seed', type=int, default=0, help="base seed for every table")
+    parser.add_argument('--out', default="selfplay_results", help="folder for the shards and results.json")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    merged = run(args.tables, args.hands, args.players, args.workers, args.seed, args.out)
+    elapsed = time.perf_counter() - start
+    print(f"{merged['tables']} tables, {merged['hands_played']} hands, {merged['showdowns']} showdowns "
+          f"in {elapsed:.1f}s ({merged['hands_played'] / elapsed:.0f} hands/s)")
+    print(f"Results written to {os.path.join(args.out, 'results.json')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+"""
+Asyncio game server: many tables in one process, every player a TCP client.
+
+    python server.py --port 9000 --players 6 --hands 100 --timeout 5
+
+Clients speak newline-delimited JSON. A client sends
+
+    {"type": "join", "name": "Alice"}
+    {"type": "action", "id": 17, "amount": 50}    amount = cents MORE to put in
+                                                  on top of what they already bet
+                                                  this street (0 = check/fold)
+
+and gets back
+
+    {"type": "seated", "table": 3, "seat": 2}
+    {"type": "event", "event": "bet", "player": "Bob", "amount": 50}   (every Game event)
+    {"type": "act", "id": 17, "hand": ["AS", "KD"], "board": [...], "to_call": 25, ...}
+    {"type": "timeout", "id": 17}                 too slow, the server answered 0 for you
+    {"type": "game_over", "stacks": {"Alice": 1250, ...}}
+
+A table starts as soon as --players clients have joined. Every table is a
+coroutine on the one event loop that also owns every socket, so there are
+no threads and nothing to lock. A table steps each hand through
+Game.hand_streets() and each street's BettingRound, and for the seat to act
+awaits an "act" message's answer from its client (RemoteProvider). If no
+answer comes within --timeout seconds, the player gives 0 (check if they
+can, otherwise fold). Writes never wait on a client. A client that lets
+more than MAX_BUFFERED bytes pile up unread is disconnected, and from then
+on every answer for it is 0.
+
+client.py has bots and a load test that runs everything on one machine.
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+from typing import Dict, List, Optional, Set
+
+from cards import card_to_text
+from pokergame import Game
+from providers import GameListener, call_amount, min_raise_amount
+
+
+MAX_BUFFERED = 1 << 20  # bytes waiting to go out to one client before it is dropped
+MAX_ATTEMPTS = 3  # answers bet() may turn down in a row before the seat gives 0
+
+
+def encode(message: Dict) -> bytes:
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+def event_message(event: str, data: Dict) -> Dict:
+    # A Game event with Player objects and int cards turned into names and text
+    message = {'type': 'event', 'event': event}
+    for key, value in data.items():
+        if key == 'player':
+            message[key] = value.name
+        elif key in ('players', 'winners'):
+            message[key] = [player.name for player in value]
+        elif key == 'cards':
+            message[key] = [card_to_text(card) for card in value]
+        elif key == 'actions':
+            continue  # 'hand_end' carries the hand's actions, which went out one event at a time
+        else:
+            message[key] = value
+    return message
+
+
+# -----------------------------------------
+# One connected client
+# -----------------------------------------
+
+class Session:
+    # One client's connection; like the tables, everything here runs on the event loop
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.name = None
+        self.closed = False
+        self.next_id = 0
+        self.answer: Optional[asyncio.Future] = None  # what a pending ask() waits on
+
+    def send(self, message: Dict):
+        self.send_bytes(encode(message))
+
+    def send_bytes(self, data: bytes):
+        if self.closed:
+            return
+        self.writer.write(data)
+        if self.writer.transport.get_write_buffer_size() > MAX_BUFFERED:
+            self.close()  # not reading what we send, don't buffer forever
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.writer.close()
+            self._answer(None)  # wakes up a pending ask()
+
+    def _answer(self, amount: Optional[int]):
+        if self.answer is not None and not self.answer.done():
+            self.answer.set_result(amount)
+
+    async def ask(self, message: Dict, timeout: float) -> Optional[int]:
+        """
+        Send an 'act' message and wait for the matching answer.
+        Returns the amount, or None when the client was too slow or is gone.
+        """
+        self.next_id += 1
+        message_id = message['id'] = self.next_id
+        self.send(message)
+        if not self.closed:
+            loop = asyncio.get_running_loop()
+            self.answer = loop.create_future()
+            timer = loop.call_later(timeout, self._answer, None)
+            try:
+                amount = await self.answer
+            finally:
+                timer.cancel()
+                self.answer = None
+            if amount is not None:
+                return amount
+        self.send({'type': 'timeout', 'id': message_id})
+        return None
+
+    async def read_messages(self):
+        # Reads until the client disconnects; answers go to the pending ask()
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    self.send({'type': 'error', 'message': 'not JSON'})
+                    continue
+                # Answers to an earlier, timed out question are dropped
+                if (isinstance(message, dict) and message.get('type') == 'action'
+                        and message.get('id') == self.next_id):
+                    amount = message.get('amount', 0)
+                    # Anything but a whole number of cents (JSON true is a bool, which is an int) counts as 0
+                    self._answer(amount if isinstance(amount, int) and not isinstance(amount, bool) else 0)
+        except ConnectionError:
+            pass
+        self.close()
+
+
+# -----------------------------------------
+# What a table uses to reach its sessions
+# -----------------------------------------
+
+class TableListener(GameListener):
+    """
+    Sends every Game event to everyone at the table. Messages are collected
+    and written in one go when a player is asked to act and at the end of
+    each hand, instead of one write per event and client.
+    """
+    def __init__(self, sessions: List[Session]):
+        self.sessions = sessions
+        self.pending = []
+
+    def on_event(self, event: str, data: Dict):
+        self.pending.append(encode(event_message(event, data)))
+        if event == 'hand_end':
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            data = b''.join(self.pending)
+            self.pending = []
+            for session in self.sessions:
+                session.send_bytes(data)
+
+
+class RemoteProvider:
+    """
+    Gets a seat's actions from its client. Like an ActionProvider, except
+    that get_action() is a coroutine, awaited by GameServer.play_hand()
+    (Game.play() can't use it).
+    """
+    def __init__(self, server, session: Session, listener: TableListener):
+        self.server = server
+        self.session = session
+        self.listener = listener
+
+    async def get_action(self, game, player, attempt: int) -> int:
+        if self.session.closed or attempt >= MAX_ATTEMPTS:
+            return 0
+        self.listener.flush()  # the client sees everything up to now first
+        message = {
+            'type': 'act',
+            'attempt': attempt,
+            'hand': [card_to_text(card) for card in player.hand],
+            'board': [card_to_text(card) for card in game.deck.community],
+            'money': player.money,
+            'last_bet': player.last_bet,
+            'current_bet': game.current_bet,
+            'pot': game.pot,
+            'to_call': call_amount(game, player),
+            'min_raise': min_raise_amount(game, player),
+        }
+        start = time.perf_counter()
+        amount = await self.session.ask(message, self.server.action_timeout)
+        self.server.record_action(time.perf_counter() - start, amount is None)
+        return 0 if amount is None else amount
+
+
+# -----------------------------------------
+# Server
+# -----------------------------------------
+
+class GameServer:
+    def __init__(self, players_per_table: int = 6, hands: int = 100, action_timeout: float = 5.0,
+                 starting_stack: int = 1000, seed: Optional[int] = None):
+        self.players_per_table = players_per_table
+        self.hands = hands
+        self.action_timeout = action_timeout
+        self.starting_stack = starting_stack
+        self.seed = seed
+        self.server = None
+        self.waiting: List[Session] = []
+        self.tables: Set[asyncio.Task] = set()  # the run_table() of every running table
+        self.tables_started = 0
+        self.tables_finished = 0
+        self.hands_played = 0
+        self.all_finished = None  # asyncio.Event, set when no table is running
+        # Stats
+        self.actions = 0
+        self.timeouts = 0
+        self.latencies: List[float] = []
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> int:
+        # Start listening; returns the port (port 0 picks a free one)
+        self.all_finished = asyncio.Event()
+        self.all_finished.set()
+        self.server = await asyncio.start_server(self.handle_client, host, port, limit=1 << 16)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def record_action(self, seconds: float, timed_out: bool):
+        self.actions += 1
+        self.timeouts += timed_out
+        self.latencies.append(seconds)
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = Session(reader, writer)
+        try:
+            line = await asyncio.wait_for(reader.readline(), self.action_timeout)
+            message = json.loads(line)
+            if not isinstance(message, dict) or message.get('type') != 'join':
+                raise ValueError("first message must be a join")
+        except (asyncio.TimeoutError, ValueError, ConnectionError):
+            session.close()
+            return
+        session.name = str(message.get('name') or f"Player {id(session) % 10000}")
+        self.waiting.append(session)
+        if len(self.waiting) >= self.players_per_table:
+            sessions = self.waiting[:self.players_per_table]
+            del self.waiting[:self.players_per_table]
+            self.start_table(sessions)
+        await session.read_messages()
+        if session in self.waiting:
+            self.waiting.remove(session)  # left before a table started, don't seat it
+
+    def start_table(self, sessions: List[Session]):
+        table = self.tables_started
+        self.tables_started += 1
+        self.all_finished.clear()
+        for seat, session in enumerate(sessions):
+            session.send({'type': 'seated', 'table': table, 'seat': seat})
+        task = asyncio.create_task(self.run_table(table, sessions), name=f"table-{table}")
+        self.tables.add(task)
+        task.add_done_callback(self.tables.discard)
+
+    async def run_table(self, table: int, sessions: List[Session]):
+        # Game.play(), with the hands played by play_hand()
+        listener = TableListener(sessions)
+        rng = None if self.seed is None else random.Random(self.seed * 1_000_003 + table)
+        game = Game(len(sessions), names=[session.name for session in sessions],
+                    providers=[RemoteProvider(self, session, listener) for session in sessions],
+                    listener=listener, rng=rng)
+        for player in game.players:
+            player.money = self.starting_stack
+        seats = list(game.players)
+        hands = 0
+        try:
+            while hands < self.hands and len(game.players) >= 2:
+                await self.play_hand(game)
+                hands += 1
+                game.remove_busted_players()
+        finally:
+            listener.flush()
+            self.finish_table(sessions, {player.name: player.money for player in seats}, hands)
+
+    async def play_hand(self, game: Game):
+        # Game.play_one_round(), asking the clients without blocking the loop
+        game.profiler.start_hand()
+        for betting in game.hand_streets():
+            seat = betting.current_seat()
+            while seat is not None:
+                player = game.players[seat]
+                attempt = 0
+                # RemoteProvider answers 0 (always accepted) once MAX_ATTEMPTS were turned down
+                while not betting.act(await player.provider.get_action(game, player, attempt) + player.last_bet):
+                    attempt += 1
+                seat = betting.current_seat()
+        game.profiler.end_hand()
+
+    def finish_table(self, sessions: List[Session], stacks: Dict[str, int], hands: int):
+        self.hands_played += hands
+        for session in sessions:
+            session.send({'type': 'game_over', 'stacks': stacks})
+            session.close()
+        self.tables_finished += 1
+        if self.tables_finished == self.tables_started:
+            self.all_finished.set()
+
+
+async def serve(host: str, port: int, players_per_table: int, hands: int, timeout: float):
+    server = GameServer(players_per_table, hands, timeout)
+    port = await server.start(host, port)
+    print(f"Listening on {host}:{port}, {players_per_table} players per table, {hands} hands per table")
+    await server.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Host poker tables for TCP clients.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9000)
+    parser.add_argument('--players', type=int, default=6, help="players per table")
+    parser.add_argument('--hands', type=int, default=100, help="hands per table")
+    parser.add_argument('--timeout', type=float, default=5.0, help="seconds to act before an automatic check/fold")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.players, args.hands, args.timeout))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
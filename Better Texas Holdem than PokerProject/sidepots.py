@@ -0,0 +1,81 @@
+"""
+Main pot and side pots.
+
+Game records how much each player puts in over the whole hand
+(player.total_contribution). At showdown build_pots() turns those totals into
+layered pots in one go, and award_pots() pays every pot from one list of hand
+strengths (each live hand is scored exactly once).
+
+Everything here works on seat numbers (0..n-1) and plain lists so it does not
+depend on Player or Game:
+
+    contributions[i] - chips (cents) seat i put in this hand
+    live[i]          - True if seat i is still in the hand (not folded)
+    strengths[i]     - seat i's hand strength (bigger is better), only read for live seats
+
+Example: A is all in for 2, B and C put in 5 each, D put in 1 and folded.
+    main pot  = 2 + 2 + 2 + 1 = 7   A, B and C can win it
+    side pot  = 3 + 3         = 6   only B and C can win it
+"""
+from typing import List, Tuple
+
+from chips import split_amount
+
+
+class Pot:
+    def __init__(self, amount: int, eligible: List[int]):
+        self.amount = amount
+        self.eligible = eligible  # seats that can win this pot
+
+    def __repr__(self):
+        return f"Pot({self.amount}, {self.eligible})"
+
+
+def build_pots(contributions: List[int], live: List[bool]) -> List[Pot]:
+    """
+    Split everything that was put in into the main pot (first) and side pots.
+
+    Each live player's total is a "level". A pot holds what everyone put in
+    between the previous level and this one, and only live players who put in
+    at least this level can win it.
+    """
+    num_seats = len(contributions)
+    levels = sorted(set(contributions[i] for i in range(num_seats) if live[i] and contributions[i] > 0))
+
+    pots = []
+    previous = 0
+    for level in levels:
+        amount = 0
+        eligible = []
+        for i in range(num_seats):
+            amount += min(contributions[i], level) - min(contributions[i], previous)
+            if live[i] and contributions[i] >= level:
+                eligible.append(i)
+        pots.append(Pot(amount, eligible))
+        previous = level
+
+    # Chips a folded player put in above every live player's total still belong in the last pot
+    leftover = sum(contribution - previous for contribution in contributions if contribution > previous)
+    if leftover and pots:
+        pots[-1].amount += leftover
+    return pots
+
+
+def pot_winners(pot: Pot, strengths: List[int]) -> List[int]:
+    # Every eligible seat with the best hand (more than one means the pot is split)
+    best = max(strengths[i] for i in pot.eligible)
+    return [i for i in pot.eligible if strengths[i] == best]
+
+
+def award_pots(pots: List[Pot], strengths: List[int]) -> List[Tuple[Pot, List[int], List[int]]]:
+    """
+    Decide every pot from the same strengths.
+    Returns (pot, winning seats, what each of those seats gets) for every pot.
+    A split pot that doesn't divide evenly gives the odd cents to the winners
+    in seat order, starting from seat 0 (first seat after the button).
+    """
+    awards = []
+    for pot in pots:
+        winners = pot_winners(pot, strengths)
+        awards.append((pot, winners, split_amount(pot.amount, len(winners))))
+    return awards
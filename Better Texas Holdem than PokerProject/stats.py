@@ -0,0 +1,254 @@
+"""
+Player statistics over recorded hand histories (see handhistory.py).
+
+    stats = PlayerStats()
+    stats.update('hands.bin')       # reads every hand
+    ...                             # more hands get appended to the file
+    stats.update('hands.bin')       # only reads the new ones
+    for row in stats.table():
+        print(row['name'], row['vpip'], row['net'])
+
+or from the command line:
+
+    python stats.py hands.bin
+
+Hands are read in chunks. For each chunk the hand headers, seats and actions
+are gathered straight out of the memory-mapped file into NumPy arrays (one
+row per seat and one row per action), and every statistic is a handful of
+array operations and np.bincount group-bys over player ids. The only Python
+loop is HandHistoryReader.records() stepping from one record to the next.
+
+Statistics per player:
+    vpip               share of hands where the player put money in preflop
+                       on their own (call, bet, raise or all in; blinds don't count)
+    pfr                share of hands where the player bet, raised or went all
+                       in preflop
+    showdown_win_rate  share of the hands that reached showdown with the player
+                       still in that they won chips in
+    net                chips won or lost in total (cents)
+    net_by_position    chips won or lost from each position, counted in seats
+                       after the button: 0 = button, 1 = small blind, 2 = big blind, ...
+"""
+import argparse
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from chips import format_chips
+from handhistory import (HandHistoryReader, MAGIC, HAND_RECORD, HAND, SEAT, ACTION, PREFLOP,
+                         FOLD, CALL, BET, RAISE, ALL_IN)
+
+
+MAX_SEATS = 10
+
+# The same layouts as the struct formats in handhistory.py, for NumPy
+HAND_DTYPE = np.dtype([('type', 'u1'), ('hand_id', '<u8'), ('seats', 'u1'), ('board', 'u1', 5),
+                       ('showdown', 'u1'), ('actions', '<u2')])
+SEAT_DTYPE = np.dtype([('player_id', '<u4'), ('card1', 'u1'), ('card2', 'u1'),
+                       ('start_stack', '<i8'), ('net', '<i8')])
+ACTION_DTYPE = np.dtype([('street', 'u1'), ('seat', 'u1'), ('kind', 'u1'), ('amount', '<i8')])
+
+assert HAND_DTYPE.itemsize == HAND.size
+assert SEAT_DTYPE.itemsize == SEAT.size
+assert ACTION_DTYPE.itemsize == ACTION.size
+
+
+def _gather(data: np.ndarray, offsets: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    # Copy the fixed-size records that start at each offset into one structured array
+    rows = data[offsets[:, None] + np.arange(dtype.itemsize)]
+    return np.ascontiguousarray(rows).view(dtype).reshape(-1)
+
+
+def _group_starts(sizes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # For groups of the given sizes laid end to end: each group's first row,
+    # and for every row the group it belongs to and its index inside the group
+    starts = np.zeros(len(sizes), dtype=np.int64)
+    np.cumsum(sizes[:-1], out=starts[1:])
+    group = np.repeat(np.arange(len(sizes)), sizes)
+    return starts, group, np.arange(len(group)) - starts[group]
+
+
+def read_columns(data: np.ndarray, hand_offsets: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Decode the hands starting at hand_offsets (byte offsets of HAND records in
+    data, a uint8 array over the file) into columns with one row per seat:
+
+        player_id, position, net   - from the SEAT records
+        vpip, pfr, showdown, won   - booleans worked out from the actions
+    """
+    hands = _gather(data, hand_offsets, HAND_DTYPE)
+    num_seats = hands['seats'].astype(np.int64)
+    num_actions = hands['actions'].astype(np.int64)
+
+    # 1) One row per seat
+    seat_start, seat_hand, seat = _group_starts(num_seats)
+    seat_offsets = hand_offsets[seat_hand] + HAND.size + seat * SEAT.size
+    seats = _gather(data, seat_offsets, SEAT_DTYPE)
+
+    # 2) One row per action (the actions come right after a hand's seats)
+    if num_actions.sum():
+        _, action_hand, action = _group_starts(num_actions)
+        action_offsets = (hand_offsets[action_hand] + HAND.size + num_seats[action_hand] * SEAT.size
+                          + action * ACTION.size)
+        actions = _gather(data, action_offsets, ACTION_DTYPE)
+    else:
+        action_hand = np.zeros(0, dtype=np.int64)
+        actions = np.zeros(0, dtype=ACTION_DTYPE)
+
+    # 3) Mark the seat row of every action that counts for a statistic
+    action_row = seat_start[action_hand] + actions['seat']
+    kind = actions['kind']
+    preflop = actions['street'] == PREFLOP
+    num_rows = len(seats)
+    vpip = np.zeros(num_rows, dtype=bool)
+    vpip[action_row[preflop & np.isin(kind, (CALL, BET, RAISE, ALL_IN))]] = True
+    pfr = np.zeros(num_rows, dtype=bool)
+    pfr[action_row[preflop & np.isin(kind, (BET, RAISE, ALL_IN))]] = True
+    folded = np.zeros(num_rows, dtype=bool)
+    folded[action_row[kind == FOLD]] = True
+
+    net = seats['net']
+    return {
+        'player_id': seats['player_id'].astype(np.int64),
+        # Game's last seat is the button, so seat i is (i + 1) seats after it
+        'position': (seat + 1) % num_seats[seat_hand],
+        'net': net,
+        'vpip': vpip,
+        'pfr': pfr,
+        'showdown': (hands['showdown'][seat_hand] != 0) & ~folded,
+        'won': net > 0,
+    }
+
+
+class PlayerStats:
+    """
+    Running totals per player id, kept in NumPy arrays that grow when new
+    players show up. update() remembers how far into the file it got, so
+    calling it again after more hands were appended only reads those.
+    """
+    def __init__(self, chunk_size: int = 100_000):
+        self.chunk_size = chunk_size
+        self.offset = len(MAGIC)  # where the next update() starts reading
+        self.num_hands = 0
+        self.names = {}
+        self.hands = np.zeros(0, dtype=np.int64)
+        self.vpip_hands = np.zeros(0, dtype=np.int64)
+        self.pfr_hands = np.zeros(0, dtype=np.int64)
+        self.showdowns = np.zeros(0, dtype=np.int64)
+        self.showdown_wins = np.zeros(0, dtype=np.int64)
+        self.net = np.zeros(0, dtype=np.int64)
+        self.net_by_position = np.zeros((0, MAX_SEATS), dtype=np.int64)
+        self.hands_by_position = np.zeros((0, MAX_SEATS), dtype=np.int64)
+
+    def _grow(self, num_players: int):
+        extra = num_players - len(self.hands)
+        if extra <= 0:
+            return
+        for name in ('hands', 'vpip_hands', 'pfr_hands', 'showdowns', 'showdown_wins', 'net'):
+            setattr(self, name, np.concatenate([getattr(self, name), np.zeros(extra, dtype=np.int64)]))
+        for name in ('net_by_position', 'hands_by_position'):
+            setattr(self, name, np.vstack([getattr(self, name), np.zeros((extra, MAX_SEATS), dtype=np.int64)]))
+
+    def add_columns(self, columns: Dict[str, np.ndarray]):
+        # Add one chunk of read_columns() output to the totals
+        player_id = columns['player_id']
+        if len(player_id) == 0:
+            return
+        num_players = max(int(player_id.max()) + 1, len(self.hands))
+        self._grow(num_players)
+
+        def count(mask: np.ndarray) -> np.ndarray:
+            return np.bincount(player_id[mask], minlength=num_players)
+
+        everyone = np.ones(len(player_id), dtype=bool)
+        self.hands += count(everyone)
+        self.vpip_hands += count(columns['vpip'])
+        self.pfr_hands += count(columns['pfr'])
+        self.showdowns += count(columns['showdown'])
+        self.showdown_wins += count(columns['showdown'] & columns['won'])
+        # Sums of whole cents come out of bincount exactly (float64 holds every int below 2**53)
+        net = columns['net']
+        self.net += np.rint(np.bincount(player_id, weights=net, minlength=num_players)).astype(np.int64)
+
+        cell = player_id * MAX_SEATS + columns['position']
+        size = num_players * MAX_SEATS
+        self.hands_by_position += np.bincount(cell, minlength=size).reshape(num_players, MAX_SEATS)
+        self.net_by_position += np.rint(np.bincount(cell, weights=net, minlength=size)).astype(
+            np.int64).reshape(num_players, MAX_SEATS)
+
+    def update(self, path: str) -> int:
+        """
+        Read every hand in 'path' that this object has not seen yet.
+        Returns how many new hands were added.
+        """
+        new_hands = 0
+        with HandHistoryReader(path) as reader:
+            data = np.frombuffer(reader.mm, dtype=np.uint8)
+            offsets = []
+            for offset, record_type in reader.records(self.offset):
+                if record_type == HAND_RECORD:
+                    offsets.append(offset)
+                    if len(offsets) == self.chunk_size:
+                        self.add_columns(read_columns(data, np.array(offsets, dtype=np.int64)))
+                        new_hands += len(offsets)
+                        offsets = []
+            if offsets:
+                self.add_columns(read_columns(data, np.array(offsets, dtype=np.int64)))
+                new_hands += len(offsets)
+            self.offset = reader.position
+            self.names.update(reader.names)
+            del data  # the mmap can't close while NumPy still looks at it
+        self.num_hands += new_hands
+        return new_hands
+
+    # ----- results -----
+
+    @staticmethod
+    def _rate(count: np.ndarray, total: np.ndarray) -> np.ndarray:
+        return np.divide(count, total, out=np.zeros(len(total)), where=total > 0)
+
+    @property
+    def vpip(self) -> np.ndarray:
+        return self._rate(self.vpip_hands, self.hands)
+
+    @property
+    def pfr(self) -> np.ndarray:
+        return self._rate(self.pfr_hands, self.hands)
+
+    @property
+    def showdown_win_rate(self) -> np.ndarray:
+        return self._rate(self.showdown_wins, self.showdowns)
+
+    def table(self) -> List[Dict]:
+        # One dict per player (by player id) with every statistic
+        vpip, pfr, showdown_win_rate = self.vpip, self.pfr, self.showdown_win_rate
+        return [{
+            'player_id': player_id,
+            'name': self.names.get(player_id, ''),
+            'hands': int(self.hands[player_id]),
+            'vpip': float(vpip[player_id]),
+            'pfr': float(pfr[player_id]),
+            'showdowns': int(self.showdowns[player_id]),
+            'showdown_win_rate': float(showdown_win_rate[player_id]),
+            'net': int(self.net[player_id]),
+            'net_by_position': self.net_by_position[player_id].tolist(),
+        } for player_id in range(len(self.hands))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print player statistics from a hand history file.")
+    parser.add_argument('path', help="hand history file written by HandHistoryWriter")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="hands read at a time")
+    args = parser.parse_args()
+
+    stats = PlayerStats(args.chunk_size)
+    stats.update(args.path)
+    print(f"{stats.num_hands} hands")
+    print(f"{'player':<16}{'hands':>8}{'vpip':>7}{'pfr':>7}{'sd win':>8}{'net':>14}")
+    for row in stats.table():
+        print(f"{row['name']:<16}{row['hands']:>8}{row['vpip']:>7.1%}{row['pfr']:>7.1%}"
+              f"{row['showdown_win_rate']:>8.1%}{format_chips(row['net']):>14}")
+
+
+if __name__ == "__main__":
+    main()
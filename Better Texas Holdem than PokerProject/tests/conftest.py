@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules live one level up, side by side (run the game from that folder)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,56 @@
+"""
+Hand strength pieces of buckets.py checked against plain evaluation.
+"""
+import random
+from itertools import combinations
+
+import numpy as np
+
+from batch_eval import ALL_COMBOS
+from buckets import board_histograms, combo_index, river_strengths
+from handeval import evaluate_mask
+
+
+def brute_strength(hole, board):
+    # Share of the other live hands this one beats on a full board, ties counting half
+    used = set(board) | set(hole)
+    board_mask = sum(1 << card for card in board)
+    mine = evaluate_mask(board_mask | sum(1 << card for card in hole))
+    score = count = 0
+    for other in combinations([card for card in range(52) if card not in used], 2):
+        theirs = evaluate_mask(board_mask | (1 << other[0]) | (1 << other[1]))
+        score += (mine > theirs) + 0.5 * (mine == theirs)
+        count += 1
+    return score / count
+
+
+def test_combo_index_matches_all_combos():
+    for i, (card1, card2) in enumerate(ALL_COMBOS.tolist()):
+        assert combo_index(card1, card2) == i == combo_index(card2, card1)
+
+
+def test_river_strengths_on_its_own():
+    rng = random.Random(6)
+    boards = np.array([rng.sample(range(52), 5) for _ in range(3)], dtype=np.int8)
+    strengths = river_strengths(boards[:1])  # a single board works without anything set up first
+    assert strengths.shape == (1, 1326)
+    strengths = river_strengths(boards)
+    for row, board in enumerate(boards.tolist()):
+        for combo in rng.sample(range(1326), 40):
+            hole = ALL_COMBOS[combo].tolist()
+            if set(hole) & set(board):
+                assert np.isnan(strengths[row, combo])
+            else:
+                assert abs(strengths[row, combo] - brute_strength(hole, board)) < 1e-12
+
+
+def test_turn_histograms_average_out_to_ehs():
+    board = [0, 14, 27, 40]
+    histograms, ehs, live = board_histograms(board, 20)
+    assert live.sum() == 1128
+    assert np.allclose(histograms[live].sum(axis=1), 1.0)
+    assert not histograms[~live].any()
+    hole = [5, 18]
+    rivers = [card for card in range(52) if card not in board + hole]
+    expected = sum(brute_strength(hole, board + [river]) for river in rivers) / len(rivers)
+    assert abs(ehs[combo_index(*hole)] - expected) < 1e-12
@@ -0,0 +1,61 @@
+"""
+Differential tests: the table-driven evaluator against the original one.
+
+The original scores 5 cards with evaluate_5card_hand_detailed and 7 cards by
+trying all 21 five-card subsets. It is called unwrapped here (no cache) so
+every hand really goes through it.
+"""
+import random
+from itertools import combinations
+
+from handeval import evaluate_detailed, evaluate_strength, make_strength
+from pokergame import evaluate_5card_hand_detailed
+
+baseline_5card = evaluate_5card_hand_detailed.evaluate  # without the cache
+
+SEVEN_CARD_SAMPLE = 50_000
+
+
+def baseline_7card(seven_cards):
+    # The 21-combination loop evaluate_7card_hand_detailed used to be
+    best = (9, [-1, -1, -1, -1, -1])
+    for combo in combinations(seven_cards, 5):
+        category, tiebreakers = baseline_5card(list(combo))
+        if category < best[0] or (category == best[0] and tiebreakers > best[1]):
+            best = (category, tiebreakers)
+    return best
+
+
+def test_every_5card_hand():
+    mismatches = []
+    for cards in combinations(range(52), 5):
+        expected = baseline_5card(list(cards))
+        if evaluate_strength(cards) != make_strength(*expected):
+            mismatches.append(cards)
+    assert not mismatches, f"{len(mismatches)} hands differ, e.g. {mismatches[:5]}"
+
+
+def test_7card_sample():
+    rng = random.Random(2024)
+    for _ in range(SEVEN_CARD_SAMPLE):
+        cards = rng.sample(range(52), 7)
+        expected = baseline_7card(cards)
+        assert evaluate_detailed(cards) == expected, cards
+        assert evaluate_strength(cards) == make_strength(*expected), cards
+
+
+def test_strength_order_matches_tuple_order():
+    # Bigger strength <=> better (category, tiebreakers), ties included
+    rng = random.Random(7)
+    for _ in range(5_000):
+        first, second = rng.sample(range(52), 7), rng.sample(range(52), 7)
+        a, b = baseline_7card(first), baseline_7card(second)
+        better = (-a[0], a[1]) > (-b[0], b[1])
+        same = a == b
+        assert (evaluate_strength(first) > evaluate_strength(second)) == better
+        assert (evaluate_strength(first) == evaluate_strength(second)) == same
+
+
+def test_tuple_cards_still_work():
+    hand = [('A', 'S'), ('K', 'S'), ('Q', 'S'), ('J', 'S'), ('T', 'S'), ('2', 'D'), ('3', 'C')]
+    assert evaluate_detailed(hand) == (1, [14])
@@ -0,0 +1,95 @@
+"""
+Hand history files: what is written reads back, also after a writer was
+stopped in the middle of a record and another one carries on.
+"""
+import os
+import random
+
+from handhistory import HandHistoryReader, HandHistoryWriter, MAGIC
+from pokergame import Game
+from providers import RandomBot
+
+
+def play_hands(path: str, hands: int, seed: int):
+    bots = [RandomBot(seed * 16 + seat, all_in=0) for seat in range(4)]
+    with HandHistoryWriter(path) as writer:
+        game = Game(4, names=["Ann", "Bob", "Cy", "Dee"], providers=bots, listener=writer,
+                    rng=random.Random(seed))
+        for player in game.players:
+            player.money = 10 ** 9
+        game.play(hands)
+
+
+def read_hands(path: str):
+    with HandHistoryReader(path) as reader:
+        return list(reader)
+
+
+def index_offset(path: str) -> int:
+    # Where the INDEX record the writer left on close() starts
+    with HandHistoryReader(path) as reader:
+        return reader.read_index()[0]
+
+
+def check_hands(path: str, count: int):
+    hands = read_hands(path)
+    assert [hand.hand_id for hand in hands] == list(range(count))
+    for hand in hands:
+        assert sorted(seat.name for seat in hand.seats) == ["Ann", "Bob", "Cy", "Dee"]
+        assert sum(seat.net for seat in hand.seats) == 0
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'hands.bin')
+    play_hands(path, 50, seed=1)
+    hands = read_hands(path)
+    assert [hand.hand_id for hand in hands] == list(range(50))
+    for hand in hands:
+        assert sorted(seat.name for seat in hand.seats) == ["Ann", "Bob", "Cy", "Dee"]
+        assert sum(seat.net for seat in hand.seats) == 0
+
+
+def test_resume_after_partial_hand(tmp_path):
+    path = str(tmp_path / 'hands.bin')
+    play_hands(path, 20, seed=2)
+    # The writer died in the middle of the last hand (so before writing its index)
+    os.truncate(path, index_offset(path) - 7)
+    assert len(read_hands(path)) == 19
+
+    play_hands(path, 20, seed=3)
+    check_hands(path, 39)
+
+
+def test_resume_from_index(tmp_path, monkeypatch):
+    path = str(tmp_path / 'hands.bin')
+    play_hands(path, 10, seed=5)
+    # A writer that was closed properly is carried on from its index, without reading any hand
+    with monkeypatch.context() as patch:
+        for method in ('records', 'read_hand'):
+            patch.setattr(HandHistoryReader, method, None)
+        play_hands(path, 10, seed=6)
+    # The first writer's index is still in the middle of the file, and skipped
+    check_hands(path, 20)
+
+
+def test_resume_after_partial_index(tmp_path):
+    path = str(tmp_path / 'hands.bin')
+    play_hands(path, 10, seed=7)
+    play_hands(path, 10, seed=8)
+    # The tail of the last index never made it to the disk
+    os.truncate(path, os.path.getsize(path) - 3)
+    assert len(read_hands(path)) == 20
+
+    play_hands(path, 5, seed=9)
+    check_hands(path, 25)
+
+
+def test_resume_after_partial_player_record(tmp_path):
+    path = str(tmp_path / 'hands.bin')
+    with open(path, 'wb') as f:
+        f.write(MAGIC + bytes([1, 0, 0]))  # the start of a PLAYER record, nothing else
+    assert read_hands(path) == []
+    play_hands(path, 5, seed=4)
+    hands = read_hands(path)
+    assert [hand.hand_id for hand in hands] == list(range(5))
+    assert all(seat.name for hand in hands for seat in hand.seats)
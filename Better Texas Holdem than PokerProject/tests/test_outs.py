@@ -0,0 +1,71 @@
+"""
+outs.py checked against dealing every unseen card and evaluating all 6 or 7 cards.
+"""
+import random
+
+import pytest
+
+from handeval import evaluate_mask
+from outs import BoardIndex, analyze_outs, category_of
+
+
+def brute_outs(hands, board, dead):
+    # (strength now, outs, split outs, category -> cards) for every hand, one next card at a time
+    used = set(board) | set(dead) | {card for hand in hands for card in hand}
+    masks = [sum(1 << card for card in list(hand) + list(board)) for hand in hands]
+    now = [evaluate_mask(mask) for mask in masks]
+    results = [([], [], {}) for _ in hands]
+    for card in range(52):
+        if card in used:
+            continue
+        after = [evaluate_mask(mask | 1 << card) for mask in masks]
+        best = max(after)
+        for i, strength in enumerate(after):
+            outs, split_outs, improvements = results[i]
+            if strength == best:
+                (outs if after.count(best) == 1 else split_outs).append(card)
+            if category_of(strength) < category_of(now[i]):
+                improvements.setdefault(category_of(strength), []).append(card)
+    return now, results
+
+
+def test_outs_match_brute_force():
+    rng = random.Random(25)
+    for num_players in range(1, 7):
+        for board_size in (3, 4):
+            for _ in range(40):
+                cards = rng.sample(range(52), 2 * num_players + board_size + 2)
+                hands = [cards[2 * i:2 * i + 2] for i in range(num_players)]
+                board = cards[2 * num_players:2 * num_players + board_size]
+                dead = cards[-2:] if rng.random() < 0.5 else []
+                now, expected = brute_outs(hands, board, dead)
+                best = max(now)
+                for i, result in enumerate(BoardIndex(board).outs(hands, dead)):
+                    outs, split_outs, improvements = expected[i]
+                    assert result.strength == now[i]
+                    assert result.ahead == (now[i] == best and now.count(best) == 1)
+                    assert result.outs == outs
+                    assert result.split_outs == split_outs
+                    assert result.improvements == improvements
+
+
+def test_draws_on_a_known_board():
+    # 3S 7S QC: AS KS has the nine other spades to a flush, 5C 6D the four 4s to a straight
+    board = [1, 5, 13 + 10]
+    flush_draw, gutshot = analyze_outs([[12, 11], [13 + 3, 39 + 4]], board)
+    assert flush_draw.flush_cards == [card for card in range(13) if card not in (1, 5, 11, 12)]
+    assert flush_draw.improves_to(4) == flush_draw.flush_cards
+    assert flush_draw.straight_cards == [] and not gutshot.flush_cards
+    assert gutshot.straight_cards == [2, 13 + 2, 26 + 2, 39 + 2]
+    assert gutshot.improves_to(5) == gutshot.straight_cards
+
+
+def test_repeated_cards_are_refused():
+    with pytest.raises(ValueError):
+        BoardIndex([0, 1, 1])
+    with pytest.raises(ValueError):
+        analyze_outs([[0, 2], [2, 3]], [10, 11, 12])
+    with pytest.raises(ValueError):
+        analyze_outs([[0, 2]], [10, 11, 12], dead=[0])
+    with pytest.raises(ValueError):
+        BoardIndex([0, 1])
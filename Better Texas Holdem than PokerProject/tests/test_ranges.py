@@ -0,0 +1,77 @@
+"""
+Range parsing and range-vs-range equity, checked against equity.exact_equity()
+summed over every pair of combos.
+"""
+import pytest
+
+from cards import card_from_text
+from equity import exact_equity
+from ranges import parse_range, range_equity
+
+
+def cards(text: str):
+    return [card_from_text(card) for card in text.split()]
+
+
+def pair_loop_equity(hero, villain, board, dead):
+    # Hero's equity with every (hero, villain) pair that shares no card weighted hero weight * villain weight
+    hero_cards, hero_weights = hero.combos(board + dead)
+    villain_cards, villain_weights = villain.combos(board + dead)
+    share = total = 0.0
+    for hero_combo, hero_weight in zip(hero_cards.tolist(), hero_weights):
+        for villain_combo, villain_weight in zip(villain_cards.tolist(), villain_weights):
+            if set(hero_combo) & set(villain_combo):
+                continue
+            weight = hero_weight * villain_weight
+            share += weight * exact_equity([hero_combo, villain_combo], board, dead).equity[0]
+            total += weight
+    return share / total
+
+
+@pytest.mark.parametrize('text, count', [
+    ('KT+', 48), ('98s-65s', 16), ('22-55', 24), ('A2s-A5s', 16), ('AsKs', 1),
+    ('AA, KK:0.5', 12), ('AA+:0.5, AA', 6),
+])
+def test_combo_counts(text, count):
+    assert len(parse_range(text)) == count
+
+
+def test_weights_and_dead_cards():
+    villain = parse_range('QQ+, AKs:0.5')
+    assert villain.size() == 18 + 2
+    combos, weights = villain.combos(cards('AS QD'))
+    assert len(combos) == 3 + 3 + 6 + 3  # AA and QQ lose the pairs holding AS / QD, AKs loses AsKs
+    assert sorted(weights.tolist()).count(0.5) == 3
+
+
+def test_exact_matches_pair_loop():
+    hero = parse_range('AKs, QQ, 98s-87s')
+    villain = parse_range('JJ+, AQs, KQ:0.5')
+    board = cards('QS 9H 2S')
+    dead = cards('3C')
+    expected = pair_loop_equity(hero, villain, board, dead)
+    result = range_equity(hero, villain, board, dead, mode='exact')
+    assert result.exact
+    assert abs(result.equity - expected) < 1e-9
+
+
+def test_sample_is_close_to_exact():
+    board = cards('QS 9H 2S')
+    exact = range_equity('AKs, QQ, 98s-87s', 'JJ+, AQs, KQ:0.5', board, mode='exact')
+    sample = range_equity('AKs, QQ, 98s-87s', 'JJ+, AQs, KQ:0.5', board, mode='sample',
+                          trials=200_000, seed=21)
+    assert not sample.exact
+    assert abs(sample.equity - exact.equity) < 0.01
+    assert abs(sample.tie - exact.tie) < 0.01
+    again = range_equity('AKs, QQ, 98s-87s', 'JJ+, AQs, KQ:0.5', board, mode='sample',
+                         trials=200_000, seed=21)
+    assert again.equity == sample.equity
+
+
+def test_bad_input_is_refused():
+    with pytest.raises(ValueError):
+        parse_range('AKx')
+    with pytest.raises(ValueError):
+        range_equity('AA', 'KK', cards('QS 9H'))
+    with pytest.raises(ValueError):
+        range_equity('AsKs', 'AsQs', mode='exact', board=cards('2C 3C 4C'))
@@ -0,0 +1,102 @@
+"""
+The server with misbehaving clients: every table still finishes.
+"""
+import json
+import asyncio
+
+from client import BotClient, run_bots
+from server import GameServer, encode
+
+
+class BadClient:
+    # Joins like a bot but answers every 'act' with 'amount'
+    def __init__(self, name: str, amount):
+        self.name = name
+        self.amount = amount
+        self.stacks = None
+
+    async def play(self, port: int):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(encode({'type': 'join', 'name': self.name}))
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if message['type'] == 'act':
+                writer.write(encode({'type': 'action', 'id': message['id'], 'amount': self.amount}))
+            elif message['type'] == 'game_over':
+                self.stacks = message['stacks']
+                break
+        writer.close()
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 30))
+
+
+def test_bad_amounts_count_as_zero():
+    async def main():
+        for amount in ("abc", None, 2.5, True, [1], {"x": 1}):
+            server = GameServer(players_per_table=2, hands=3, action_timeout=1.0, seed=1)
+            port = await server.start()
+            bad = BadClient("Bad", amount)
+            bot = BotClient("Bot", seed=2)
+            await asyncio.gather(bad.play(port), run_bots('127.0.0.1', port, [bot], 1.0))
+            await server.all_finished.wait()
+            await server.close()
+            assert server.tables_finished == 1
+            assert bad.stacks is not None and sum(bad.stacks.values()) == 2 * server.starting_stack
+    run(main())
+
+
+def test_join_must_be_an_object():
+    async def main():
+        server = GameServer(players_per_table=2, hands=1, action_timeout=1.0)
+        port = await server.start()
+        for line in (b'[1, 2]\n', b'"join"\n', b'42\n'):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(line)
+            assert await reader.read() == b''  # dropped, nothing seated
+            writer.close()
+        assert server.waiting == [] and server.tables_started == 0
+        await server.close()
+    run(main())
+
+
+def test_client_leaving_before_the_table_starts_is_not_seated():
+    async def main():
+        server = GameServer(players_per_table=2, hands=2, action_timeout=1.0, seed=3)
+        port = await server.start()
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(encode({'type': 'join', 'name': "Gone"}))
+        await writer.drain()
+        while not server.waiting:
+            await asyncio.sleep(0.01)
+        writer.close()
+        while server.waiting:
+            await asyncio.sleep(0.01)
+
+        bots = [BotClient(f"Bot {i}", seed=i) for i in range(2)]
+        await run_bots('127.0.0.1', port, bots, 1.0)
+        await server.all_finished.wait()
+        await server.close()
+        assert server.tables_finished == 1
+        assert sorted(bots[0].stacks) == ["Bot 0", "Bot 1"]
+    run(main())
+
+
+def test_slow_client_gets_timeouts_and_late_answers_are_dropped():
+    async def main():
+        server = GameServer(players_per_table=2, hands=3, action_timeout=0.1, seed=4)
+        port = await server.start()
+        slow = BotClient("Slow", seed=5, slow=1.0)  # answers every question after the timeout
+        bot = BotClient("Bot", seed=6)
+        await run_bots('127.0.0.1', port, [slow, bot], 0.1)
+        await server.all_finished.wait()
+        await server.close()
+        assert server.tables_finished == 1 and not server.tables
+        assert slow.timeouts == slow.actions > 0 and bot.timeouts == 0
+        assert server.timeouts == slow.timeouts
+        assert sum(slow.stacks.values()) == 2 * server.starting_stack
+    run(main())
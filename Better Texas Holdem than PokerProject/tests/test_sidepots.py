@@ -0,0 +1,119 @@
+"""
+Chip conservation: however a hand ends, every cent put in comes back out.
+
+Thousands of seeded random cases (all ins for different amounts, folds
+above and below the all-in levels, splits with odd cents) go through
+build_pots() / award_pots() and through Game.showdown() and whole hands.
+"""
+import random
+
+from chips import split_amount
+from sidepots import build_pots, award_pots
+from pokergame import Game
+from providers import RandomBot, CallingBot
+
+CASES = 5_000
+
+
+def random_case(rng: random.Random):
+    # (contributions, live, strengths) with at least one live seat that put something in
+    num_seats = rng.randint(2, 10)
+    levels = [rng.randint(1, 2_000) for _ in range(rng.randint(1, 4))]  # few levels, so totals repeat
+    contributions = [rng.choice(levels + [0, rng.randint(0, 3_000)]) for _ in range(num_seats)]
+    live = [rng.random() < 0.6 for _ in range(num_seats)]
+    seat = rng.randrange(num_seats)
+    live[seat] = True
+    contributions[seat] = max(contributions[seat], 1)
+    strengths = [rng.randint(0, 3) for _ in range(num_seats)]  # few values, so ties are common
+    return contributions, live, strengths
+
+
+def test_build_pots_holds_every_chip():
+    rng = random.Random(9)
+    for _ in range(CASES):
+        contributions, live, _ = random_case(rng)
+        pots = build_pots(contributions, live)
+        assert sum(pot.amount for pot in pots) == sum(contributions)
+        for pot in pots:
+            assert pot.eligible
+            assert all(live[seat] for seat in pot.eligible)
+        # Later pots are open to fewer (or the same) players
+        for earlier, later in zip(pots, pots[1:]):
+            assert set(later.eligible) <= set(earlier.eligible)
+
+
+def test_award_pots_pays_out_every_chip():
+    rng = random.Random(10)
+    for _ in range(CASES):
+        contributions, live, strengths = random_case(rng)
+        awards = award_pots(build_pots(contributions, live), strengths)
+        paid = [0] * len(contributions)
+        for pot, winners, shares in awards:
+            assert sum(shares) == pot.amount
+            assert max(shares) - min(shares) <= 1
+            best = max(strengths[seat] for seat in pot.eligible)
+            assert winners == [seat for seat in pot.eligible if strengths[seat] == best]
+            for seat, share in zip(winners, shares):
+                paid[seat] += share
+        assert sum(paid) == sum(contributions)
+        assert all(paid[seat] == 0 for seat in range(len(live)) if not live[seat])
+
+
+def test_split_amount_odd_cents():
+    rng = random.Random(11)
+    for _ in range(CASES):
+        amount, ways = rng.randint(0, 10_000), rng.randint(1, 10)
+        shares = split_amount(amount, ways)
+        assert sum(shares) == amount
+        assert shares == sorted(shares, reverse=True)
+        assert shares[0] - shares[-1] <= 1
+
+
+def test_showdown_conserves_chips():
+    rng = random.Random(12)
+    for _ in range(2_000):
+        num_players = rng.randint(2, 10)
+        game = Game(num_players, names=[f"P{seat}" for seat in range(num_players)],
+                    providers=CallingBot(), rng=random.Random(rng.random()))
+        game.start_new_round()
+        for player in game.players:
+            game.deal_cards_to_player(player, 2)
+        game.deck.add_community_cards(5)
+
+        total_before = 0
+        for player in game.players:
+            stack = rng.randint(1, 5_000)
+            total_before += stack
+            put_in = rng.choice([stack, rng.randint(0, stack)])  # all in, or part of the stack
+            player.money = stack - put_in
+            player.total_contribution = put_in
+            game.pot += put_in
+            if player.money == 0:
+                player.all_in()
+            elif rng.random() < 0.3:
+                player.fold()
+        if all(player.is_folded and not player.is_all_in for player in game.players):
+            game.players[0].is_folded = False
+
+        game.showdown()
+        assert game.pot == 0
+        assert sum(player.money for player in game.players) == total_before
+
+
+def test_whole_hands_conserve_chips():
+    rng = random.Random(13)
+    for _ in range(200):
+        num_players = rng.randint(2, 9)
+        bots = [RandomBot(rng.randrange(1 << 30), all_in=0.3) for _ in range(num_players)]
+        game = Game(num_players, names=[f"Bot {seat}" for seat in range(num_players)],
+                    providers=bots, rng=random.Random(rng.random()))
+        players = list(game.players)
+        for player in players:
+            player.money = rng.randint(30, 3_000)
+        total = sum(player.money for player in players)
+        for _ in range(10):
+            if len(game.players) < 2:
+                break
+            game.play_one_round()
+            assert sum(player.money for player in players) == total
+            game.remove_busted_players()
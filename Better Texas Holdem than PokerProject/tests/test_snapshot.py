@@ -0,0 +1,44 @@
+"""
+Game.snapshot() / restore(): going back to a snapshot undoes everything.
+"""
+import random
+
+from pokergame import Game
+from providers import CallingBot, RandomBot
+
+
+def test_snapshot_of_a_new_game():
+    game = Game(3, names=["A", "B", "C"], providers=CallingBot())
+    saved = game.snapshot()
+    game.start_new_round()
+    game.use_small_blind()
+    game.restore(saved)
+    assert game.snapshot() == saved
+
+
+def test_restore_undoes_a_played_out_hand():
+    rng = random.Random(5)
+    for _ in range(200):
+        num_players = rng.randint(2, 6)
+        bots = [RandomBot(rng.randrange(1 << 30)) for _ in range(num_players)]
+        game = Game(num_players, names=[f"P{seat}" for seat in range(num_players)], providers=bots,
+                    rng=random.Random(rng.random()))
+        game.start_new_round()
+        game.use_small_blind()
+        game.use_big_blind()
+        for player in game.players:
+            game.deal_cards_to_player(player, 2)
+        game.deck.deal_flop()
+        saved = game.snapshot(with_rng=True)
+
+        game.run_betting_round(0)
+        game.deck.deal_turn()
+        game.deck.deal_river()
+        after = game.snapshot(with_rng=True)
+        game.restore(saved)
+        assert game.snapshot(with_rng=True) == saved
+
+        # With the rng saved, the same cards come again (the bots' choices are their own)
+        game.deck.deal_turn()
+        game.deck.deal_river()
+        assert game.deck.community[3:] == list(after[7][3:])